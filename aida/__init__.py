@@ -1,4 +1,10 @@
-from .core import Aida
-
 __version__ = "0.1.0"
-__all__ = ["Aida"] 
\ No newline at end of file
+__all__ = ["Aida"]
+
+def __getattr__(name):
+    # Import the agent stack only when Aida is actually used, so that
+    # `python -m aida.cli --help` and config tooling start instantly
+    if name == "Aida":
+        from .core import Aida
+        return Aida
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
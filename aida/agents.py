@@ -0,0 +1,90 @@
+from typing import Any, List, Optional, Tuple
+from langchain.agents import AgentExecutor, AgentType, create_tool_calling_agent, initialize_agent
+from langchain.agents import Tool
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Agent engines
+REACT = "react"
+TOOL_CALLING = "tool_calling"
+AUTO = "auto"
+AGENT_MODES = [AUTO, REACT, TOOL_CALLING]
+
+# Appended to the instructions in tool calling mode, where there is no text format to follow
+TOOL_CALLING_INSTRUCTIONS = """
+Call tools through function calls; never write Action or Observation lines yourself.
+When you have the answer, reply with it directly instead of calling another tool. That reply is your Final Answer."""
+
+def resolve_agent_mode(mode: str, provider: Any) -> str:
+    """Pick the agent engine for a provider
+
+    Args:
+        mode: "auto", "react" or "tool_calling"
+        provider: LLMProvider whose model will run the agent
+
+    Returns:
+        REACT or TOOL_CALLING. "auto" and "tool_calling" fall back to REACT
+        for models without structured tool calls
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    mode = mode.lower()
+    if mode not in AGENT_MODES:
+        raise ValueError(f"Unknown agent mode '{mode}'. Available modes: {AGENT_MODES}")
+    if mode == REACT:
+        return REACT
+    try:
+        supported = provider.supports_tool_calling()
+    except Exception as e:
+        logger.warning("Could not check tool calling support, using ReAct: %s", str(e))
+        supported = False
+    if not supported and mode == TOOL_CALLING:
+        logger.warning("Model '%s' does not support tool calling, using ReAct", getattr(provider, "model", "?"))
+    return TOOL_CALLING if supported else REACT
+
+def build_agent(llm: Any, tools: List[Tool], mode: str, prefix: str, human_template: str,
+                react_kwargs: Optional[dict] = None, react_instructions: str = "",
+                **executor_kwargs) -> Tuple[AgentExecutor, str]:
+    """Build an agent executor with the ReAct text engine or native tool calling
+
+    Both engines take the same instructions and inputs. With tool calling the
+    model gets the tools as structured definitions and returns structured calls,
+    so there is no text format to drift from and no parsing retries.
+
+    Args:
+        llm: LangChain chat model
+        tools: Agent tools
+        mode: REACT or TOOL_CALLING (see resolve_agent_mode)
+        prefix: Instructions placed before everything else
+        human_template: Prompt template for the user turn in tool calling mode
+        react_kwargs: Extra ZeroShotAgent options (format_instructions, suffix, input_variables)
+        react_instructions: Appended to the prefix in ReAct mode only, e.g. rules about its text format
+        **executor_kwargs: AgentExecutor options such as max_iterations
+
+    Returns:
+        (AgentExecutor, mode actually used): REACT if the model cannot bind tools
+    """
+    if mode == TOOL_CALLING:
+        prompt = ChatPromptTemplate.from_messages([
+            # A message instance is sent as is, so braces in the instructions need no escaping
+            SystemMessage(content=prefix + TOOL_CALLING_INSTRUCTIONS),
+            ("human", human_template),
+            MessagesPlaceholder("agent_scratchpad"),
+        ])
+        try:
+            agent = create_tool_calling_agent(llm, tools, prompt)
+        except (NotImplementedError, ValueError):
+            logger.warning("%s cannot bind tools, using ReAct", type(llm).__name__)
+        else:
+            return AgentExecutor(agent=agent, tools=tools, **executor_kwargs), TOOL_CALLING
+    return initialize_agent(
+        tools=tools,
+        llm=llm,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        agent_kwargs={"prefix": prefix + react_instructions, **(react_kwargs or {})},
+        **executor_kwargs
+    ), REACT
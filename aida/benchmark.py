@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+from .config import AidaConfig
+from .core import Aida
+from .tools.fake_shell import FakeShell
+
+# Queries cycled through by the benchmarks. The scripted provider ignores them,
+# but they drive example selection, recall and the conversation history
+BENCHMARK_QUERIES = [
+    "How long has the server been running?",
+    "Which process is using the most memory?",
+    "Is the disk getting full? What is using the space?",
+    "Who is logged in right now?",
+    "What was the load average?",
+    "Did anything change since my last question?",
+]
+
+# Metrics where a higher value is a regression, and the ones where a lower value is
+LOWER_IS_BETTER = [
+    "construction_ms.p50", "query_latency_ms.p50", "query_latency_ms.p95", "query_latency_ms.p99",
+    "step_overhead_ms", "memory.growth_per_query_bytes", "concurrency.latency_ms.p95",
+]
+HIGHER_IS_BETTER = ["concurrency.queries_per_second"]
+
+@dataclass
+class BenchmarkSettings:
+    """Sizes and simulated latencies of a benchmark run"""
+    constructions: int = 20
+    queries: int = 200
+    conversation_length: int = 300
+    sessions: int = 8
+    queries_per_session: int = 25
+    # Seconds every model call and every shell command take
+    llm_latency: float = 0.0
+    shell_latency: float = 0.0
+
+class BenchmarkAida(Aida):
+    """Aida on the scripted provider, running commands on a FakeShell without confirmation"""
+
+    def __init__(self, config: AidaConfig, shell: FakeShell, llm_latency: float = 0.0):
+        self.fake_shell = shell
+        super().__init__(config=config)
+        # A session replayed from a cassette (see LLMProviderFactory.use_cassette) has no scripted model
+        if llm_latency:
+            self.llm.set_latency(llm_latency)
+            self.preprocessor.llm.set_latency(llm_latency)
+
+    def _setup_agent(self):
+        agent = super()._setup_agent()
+        # The agent prints every step when verbose; console output is not what is measured
+        agent.verbose = False
+        return agent
+    
+    def _build_executor(self) -> FakeShell:
+        return self.fake_shell
+
+    def command_validator(self, command: str) -> str:
+        return command
+
+def benchmark_config(**overrides) -> AidaConfig:
+    """Config for benchmark sessions: scripted models, no relevance check, nothing persisted
+
+    Host facts are off so no benchmark result depends on the machine's files.
+    """
+    options = dict(
+        core_provider="scripted",
+        core_model="scripted",
+        preprocessor_provider="scripted",
+        preprocessor_model="scripted",
+        relevance_check=False,
+        host_facts=False,
+        agent_mode="react",
+        persist_sessions=False,
+        cache_enabled=False,
+        pool_providers=False,
+    )
+    options.update(overrides)
+    return AidaConfig(**options)
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Count, mean, p50, p95, p99 and max of durations in seconds, reported in milliseconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered) * 1000,
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "max": ordered[-1] * 1000,
+    }
+
+def make_session(settings: BenchmarkSettings, **config) -> BenchmarkAida:
+    return BenchmarkAida(benchmark_config(**config), FakeShell(latency=settings.shell_latency), settings.llm_latency)
+
+def bench_construction(settings: BenchmarkSettings) -> Dict[str, float]:
+    """Time Aida construction, after one warm-up that pays the imports"""
+    make_session(settings)
+    durations = []
+    for _ in range(settings.constructions):
+        started = time.perf_counter()
+        make_session(settings)
+        durations.append(time.perf_counter() - started)
+    return summarize(durations)
+
+def bench_queries(settings: BenchmarkSettings) -> dict:
+    """Time process_query and split out AIDA's own time per agent step
+
+    Step overhead is the query time not spent inside model calls or shell
+    commands, divided by the number of model calls (one per agent step).
+    """
+    aida = make_session(settings)
+    durations = []
+    for i in range(settings.queries):
+        started = time.perf_counter()
+        aida.process_query(BENCHMARK_QUERIES[i % len(BENCHMARK_QUERIES)])
+        durations.append(time.perf_counter() - started)
+
+    steps = aida.llm.llm.calls
+    outside = sum(durations) - aida.llm.llm.busy_seconds - aida.fake_shell.busy_seconds
+    return {
+        "query_latency_ms": summarize(durations),
+        "agent_steps": steps,
+        "shell_commands": len(aida.fake_shell.commands),
+        "step_overhead_ms": outside / steps * 1000 if steps else None,
+    }
+
+def bench_memory(settings: BenchmarkSettings, samples: int = 10) -> dict:
+    """Measure traced Python memory over a long conversation
+
+    growth_per_query_bytes compares the middle and the end of the conversation,
+    after the history window has filled, so it shows growth that never levels off.
+    """
+    tracemalloc.start()
+    try:
+        aida = make_session(settings)
+        baseline = tracemalloc.get_traced_memory()[0]
+        every = max(1, settings.conversation_length // samples)
+        points = []
+        for i in range(settings.conversation_length):
+            aida.process_query(BENCHMARK_QUERIES[i % len(BENCHMARK_QUERIES)])
+            if (i + 1) % every == 0 or i + 1 == settings.conversation_length:
+                points.append((i + 1, tracemalloc.get_traced_memory()[0] - baseline))
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    middle = points[(len(points) - 1) // 2]
+    end = points[-1]
+    growth = (end[1] - middle[1]) / (end[0] - middle[0]) if end[0] > middle[0] else 0.0
+    return {
+        "queries": settings.conversation_length,
+        "baseline_kb": baseline / 1024,
+        "end_kb": end[1] / 1024,
+        "peak_kb": peak / 1024,
+        "growth_per_query_bytes": growth,
+        "samples_kb": [[queries, used / 1024] for queries, used in points],
+    }
+
+def bench_concurrency(settings: BenchmarkSettings) -> dict:
+    """Run sessions concurrently on one event loop with aprocess_query and measure throughput"""
+    sessions = [make_session(settings) for _ in range(settings.sessions)]
+    durations: List[float] = []
+
+    async def converse(aida: Aida, offset: int) -> None:
+        for i in range(settings.queries_per_session):
+            started = time.perf_counter()
+            await aida.aprocess_query(BENCHMARK_QUERIES[(offset + i) % len(BENCHMARK_QUERIES)])
+            durations.append(time.perf_counter() - started)
+
+    async def main() -> None:
+        await asyncio.gather(*(converse(aida, offset) for offset, aida in enumerate(sessions)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    wall = time.perf_counter() - started
+    return {
+        "sessions": settings.sessions,
+        "queries": len(durations),
+        "wall_seconds": wall,
+        "queries_per_second": len(durations) / wall if wall else None,
+        "latency_ms": summarize(durations),
+    }
+
+def run_benchmarks(settings: Optional[BenchmarkSettings] = None) -> dict:
+    """Run every benchmark and return the results as a JSON-serializable dict"""
+    settings = settings or BenchmarkSettings()
+    queries = bench_queries(settings)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": asdict(settings),
+        "construction_ms": bench_construction(settings),
+        **queries,
+        "memory": bench_memory(settings),
+        "concurrency": bench_concurrency(settings),
+    }
+
+def _metric(results: dict, path: str) -> Optional[float]:
+    value = results
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.2) -> List[str]:
+    """List the metrics that got worse by more than `tolerance` (a fraction) since the baseline
+
+    Args:
+        baseline: Results of an earlier run
+        current: Results of this run
+        tolerance: Allowed relative change before a metric counts as a regression
+
+    Returns:
+        One line per regressed metric, empty if there is none
+    """
+    regressions = []
+    for path in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+        before, after = _metric(baseline, path), _metric(current, path)
+        if before is None or after is None or before <= 0:
+            continue
+        change = (after - before) / before
+        if path in HIGHER_IS_BETTER:
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{path}: {before:.3f} -> {after:.3f} ({change:+.0%} worse)")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the offline benchmarks and print (or write) the results as JSON
+
+    Returns:
+        Exit status: 1 if --compare found regressions, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(description="Benchmark AIDA's own overhead with a scripted model and a fake shell")
+    defaults = BenchmarkSettings()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown with --compare")
+    args = parser.parse_args(argv)
+
+    # Per-query info logging would be measured along with everything else
+    logging.getLogger("aida").setLevel(logging.WARNING)
+    settings = BenchmarkSettings(**{name: getattr(args, name) for name in asdict(defaults)})
+    results = run_benchmarks(settings)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
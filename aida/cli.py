@@ -1,9 +1,7 @@
 import argparse
 import logging
 from pathlib import Path
-from .core import Aida
 from .config import AidaConfig
-from .gui import main as gui_main
 
 def main():
     parser = argparse.ArgumentParser(description="AIDA - AI Server Management Assistant")
@@ -13,10 +11,26 @@ def main():
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
     parser.add_argument("--config", type=Path, help="Path to config file")
     parser.add_argument("--gui", action="store_true", help="Launch the GUI interface")
+    parser.add_argument("--startup-profile", action="store_true", help="Report import time per module and exit")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Benchmark AIDA's overhead offline (scripted model, fake shell), print JSON and exit")
+    parser.add_argument("--resume", metavar="SESSION", help="Resume a stored conversation session")
+    parser.add_argument("--list-sessions", action="store_true", help="List stored conversation sessions and exit")
     args = parser.parse_args()
 
-    # If GUI mode is requested, launch it
+    if args.startup_profile:
+        from .startup_profile import main as profile_main
+        profile_main()
+        return
+
+    if args.benchmark:
+        from .benchmark import main as benchmark_main
+        benchmark_main([])
+        return
+
+    # If GUI mode is requested, launch it. PyQt6 is only imported here.
     if args.gui:
+        from .gui import main as gui_main
         gui_main()
         return
 
@@ -24,6 +38,22 @@ def main():
     config = AidaConfig.from_file(args.config)
     config.update_from_args(args)
 
+    if args.list_sessions:
+        from datetime import datetime
+        from .session_store import SessionStore
+        if not Path(config.session_store_path).expanduser().exists():
+            print("No stored sessions.")
+            return
+        store = SessionStore(config.session_store_path)
+        for session_id, updated, turns in store.list_sessions():
+            print(f"{session_id}  {datetime.fromtimestamp(updated):%Y-%m-%d %H:%M}  {turns} turns")
+        store.close()
+        return
+
+    # The agent stack is heavy, so it is loaded only once we know we need it
+    from .core import Aida
+    from .streaming import TOKEN, ACTION, FINAL_ANSWER, ERROR
+
     if config.debug:
         logging.basicConfig(level=logging.DEBUG)
     else:
@@ -34,7 +64,9 @@ def main():
     print(f"  Preprocessor model: {config.preprocessor_model}")
     print(f"  Debug mode: {'enabled' if config.debug else 'disabled'}")
     
-    aida = Aida(config=config)
+    aida = Aida(config=config, session_id=args.resume)
+    if aida.session_id:
+        print(f"  Session: {aida.session_id} (resume with: aida --resume {aida.session_id})")
     print("\nAIDA is ready! Type 'exit' to quit.")
     print("Type 'debug' to toggle debug mode.")
     print("Type 'config' to show current configuration.")
@@ -61,14 +93,21 @@ def main():
                 continue
             
             print("\nProcessing your request...")
-            response = aida.process_query(query)
-            print("\nAIDA:", response)
+            for event in aida.process_query_stream(query):
+                if event.type == TOKEN:
+                    print(event.content, end="", flush=True)
+                elif event.type == ACTION:
+                    print(f"\n[{event.tool}] {event.content}", flush=True)
+                elif event.type in (FINAL_ANSWER, ERROR):
+                    print("\n\nAIDA:", event.content)
             
         except KeyboardInterrupt:
             break
         except Exception as e:
             print(f"\nError: {str(e)}")
     
+    # Completes a cassette being recorded
+    aida.close()
     print("\nGoodbye!")
 
 if __name__ == "__main__":
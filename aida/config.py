@@ -1,8 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import os
 import yaml
-from typing import Optional
+from typing import Optional, List, Union
+from .session_store import DEFAULT_SESSION_STORE_PATH
 
 @dataclass
 class AidaConfig:
@@ -16,9 +17,80 @@ class AidaConfig:
     preprocessor_provider: str = "gemini"
     preprocessor_model: str = "gemini-1.5-flash"
     
+    # Refuse queries unrelated to server management. Clear cases are decided locally,
+    # only ambiguous ones cost a preprocessor LLM call
+    relevance_check: bool = True
+    # Start the agent while the preprocessor LLM decides ambiguous queries; tool calls
+    # wait for its verdict and the run is cancelled if the query is refused
+    speculative_relevance_check: bool = True
+    
+    # Tokens of conversation history sent with each query. None picks a budget for the core model
+    history_token_budget: Optional[int] = None
+    
+    # Earlier snippets (older turns and tool output) recalled per query. 0 disables recall
+    recall_snippets: int = 3
+    
+    # Persist conversations so they can be resumed with `aida --resume <session>`
+    persist_sessions: bool = False
+    session_store_path: str = DEFAULT_SESSION_STORE_PATH
+    
+    # Give the agent facts about the host (OS, package manager, CPUs, memory, init system)
+    # with every query, collected without running commands and refreshed after the TTL
+    host_facts: bool = True
+    host_facts_ttl: float = 3600.0
+    
+    # Agent engine: "tool_calling" (structured tool calls), "react" (plain text
+    # Thought/Action format) or "auto" (tool calling when the model supports it)
+    agent_mode: str = "auto"
+    
+    # Worked examples sent with each query, picked by similarity to it
+    example_count: int = 2
+    example_token_budget: int = 600
+    
+    # Agent tools. None enables every tool; tools are only built when first used
+    enabled_tools: Optional[List[str]] = None
+    disabled_tools: List[str] = field(default_factory=list)
+    
+    # Answer repeated read-only tool calls within a query from memory, and stop
+    # agent runs before an action is taken more than loop_max_repeats times (0 never stops them)
+    tool_memo: bool = True
+    loop_max_repeats: int = 3
+    
+    # Shell commands run by the agent: wall-clock limit in seconds, and output bytes
+    # returned before the rest is spilled to a temporary file
+    command_timeout: float = 120.0
+    command_output_limit: int = 64 * 1024
+    # Run the agent's commands in one long-lived bash per session instead of a new shell each
+    persistent_shell: bool = True
+    # Tool outputs over this many bytes are replaced by a digest the agent can page
+    # through with the read_output tool. 0 puts outputs in the prompt verbatim
+    output_digest_threshold: int = 4000
+    
+    # Share one provider instance per provider/model/temperature across sessions
+    pool_providers: bool = False
+    
+    # Check that models exist on first use instead of at startup
+    defer_model_validation: bool = False
+    
+    # Keep Ollama models loaded between requests so prompt prefixes are reused from the KV cache
+    ollama_keep_alive: Optional[Union[int, str]] = "30m"
+    ollama_num_ctx: Optional[int] = None
+    
     # Debug mode
     debug: bool = False
     
+    # LLM response cache (opt-in)
+    cache_enabled: bool = False
+    cache_path: Optional[str] = None  # SQLite file for the persistent tier, memory only if unset
+    cache_max_entries: int = 1000
+    cache_ttl: float = 24 * 60 * 60
+    
+    # Record every model call to a cassette file ("record"), or answer from one without
+    # a model server ("replay"). cassette_timing replays calls as slowly as they were recorded
+    cassette_mode: Optional[str] = None
+    cassette_path: Optional[str] = None
+    cassette_timing: bool = False
+    
     @classmethod
     def from_file(cls, config_path: Optional[Path] = None) -> 'AidaConfig':
         """Load configuration from a YAML file
@@ -60,9 +132,53 @@ class AidaConfig:
             core_model=config_data.get("core_model", cls.core_model),
             preprocessor_provider=config_data.get("preprocessor_provider", cls.preprocessor_provider),
             preprocessor_model=config_data.get("preprocessor_model", cls.preprocessor_model),
-            debug=config_data.get("debug", cls.debug)
+            relevance_check=config_data.get("relevance_check", cls.relevance_check),
+            speculative_relevance_check=config_data.get("speculative_relevance_check", cls.speculative_relevance_check),
+            history_token_budget=config_data.get("history_token_budget", cls.history_token_budget),
+            recall_snippets=config_data.get("recall_snippets", cls.recall_snippets),
+            persist_sessions=config_data.get("persist_sessions", cls.persist_sessions),
+            session_store_path=config_data.get("session_store_path", cls.session_store_path),
+            host_facts=config_data.get("host_facts", cls.host_facts),
+            host_facts_ttl=config_data.get("host_facts_ttl", cls.host_facts_ttl),
+            agent_mode=config_data.get("agent_mode", cls.agent_mode),
+            example_count=config_data.get("example_count", cls.example_count),
+            example_token_budget=config_data.get("example_token_budget", cls.example_token_budget),
+            enabled_tools=config_data.get("enabled_tools", cls.enabled_tools),
+            disabled_tools=config_data.get("disabled_tools", []),
+            tool_memo=config_data.get("tool_memo", cls.tool_memo),
+            loop_max_repeats=config_data.get("loop_max_repeats", cls.loop_max_repeats),
+            command_timeout=config_data.get("command_timeout", cls.command_timeout),
+            command_output_limit=config_data.get("command_output_limit", cls.command_output_limit),
+            persistent_shell=config_data.get("persistent_shell", cls.persistent_shell),
+            output_digest_threshold=config_data.get("output_digest_threshold", cls.output_digest_threshold),
+            pool_providers=config_data.get("pool_providers", cls.pool_providers),
+            defer_model_validation=config_data.get("defer_model_validation", cls.defer_model_validation),
+            ollama_keep_alive=config_data.get("ollama_keep_alive", cls.ollama_keep_alive),
+            ollama_num_ctx=config_data.get("ollama_num_ctx", cls.ollama_num_ctx),
+            debug=config_data.get("debug", cls.debug),
+            cache_enabled=config_data.get("cache_enabled", cls.cache_enabled),
+            cache_path=config_data.get("cache_path", cls.cache_path),
+            cache_max_entries=config_data.get("cache_max_entries", cls.cache_max_entries),
+            cache_ttl=config_data.get("cache_ttl", cls.cache_ttl),
+            cassette_mode=config_data.get("cassette_mode", cls.cassette_mode),
+            cassette_path=config_data.get("cassette_path", cls.cassette_path),
+            cassette_timing=config_data.get("cassette_timing", cls.cassette_timing)
         )
     
+    def provider_options(self, provider_type: str) -> dict:
+        """Get the extra constructor options for a provider type
+        
+        Args:
+            provider_type: Provider name, e.g. "ollama"
+            
+        Returns:
+            Keyword arguments for LLMProviderFactory.get_provider
+        """
+        options = {"defer_validation": self.defer_model_validation}
+        if provider_type.lower() == "ollama":
+            options.update(keep_alive=self.ollama_keep_alive, num_ctx=self.ollama_num_ctx)
+        return options
+    
     def update_from_args(self, args) -> None:
         """Update config from command line arguments
         
@@ -87,6 +203,8 @@ class AidaConfig:
         self.core_model = os.getenv("AIDA_CORE_MODEL", self.core_model)
         self.preprocessor_provider = os.getenv("AIDA_PREPROCESSOR_PROVIDER", self.preprocessor_provider)
         self.preprocessor_model = os.getenv("AIDA_PREPROCESSOR_MODEL", self.preprocessor_model)
+        self.cassette_path = os.getenv("AIDA_CASSETTE", self.cassette_path)
+        self.cassette_mode = os.getenv("AIDA_CASSETTE_MODE", self.cassette_mode)
         
         if not hasattr(args, "provider") or not args.provider:
             self.core_provider = os.getenv("AIDA_PROVIDER", self.core_provider)
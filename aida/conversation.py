@@ -0,0 +1,247 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, List, Optional
+from langchain_core.messages import HumanMessage, AIMessage
+from .recall import RecallIndex
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Prompt budget for conversation history, by model name prefix. Small local
+# models get a tight window; hosted models with long contexts get more.
+HISTORY_TOKEN_BUDGETS = {
+    "gemini": 8000,
+    "qwen2.5-coder:32b": 4000,
+    "qwen2.5": 3000,
+    "llama3.2": 1500,
+}
+DEFAULT_HISTORY_TOKEN_BUDGET = 2000
+
+ROLE_LABELS = {
+    "user": "User",
+    "assistant": "Assistant",
+    "system": "System"
+}
+
+# Hard cap on stored messages, independent of their size
+MAX_WINDOW_MESSAGES = 64
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text (about four characters per token)"""
+    return max(1, (len(text) + 3) // 4)
+
+def history_token_budget(model: str) -> int:
+    """Get the history token budget for a model, using the longest matching name prefix"""
+    matches = [prefix for prefix in HISTORY_TOKEN_BUDGETS if model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_HISTORY_TOKEN_BUDGET
+    return HISTORY_TOKEN_BUDGETS[max(matches, key=len)]
+
+def _truncate_to_tokens(text: str, tokens: int) -> str:
+    """Keep the head and tail of a text so it fits in roughly `tokens` tokens"""
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    half = limit // 2
+    return f"{text[:half]}\n... [truncated] ...\n{text[-half:]}"
+
+@dataclass
+class Message:
+    """A conversation message with its token count computed once"""
+    role: str
+    content: str
+    tokens: int
+
+class ConversationManager:
+    """Manages conversation history for both preprocessor and core model
+
+    Messages are kept in a bounded window whose total size stays within a
+    token budget. Messages pushed out of the window are folded into a rolling
+    summary by the `summarizer` callable, if one is set, so long sessions keep
+    their context while the prompt size stays predictable.
+    """
+    def __init__(self, token_budget: int = DEFAULT_HISTORY_TOKEN_BUDGET,
+                 summarizer: Optional[Callable[[str, List[Message]], str]] = None,
+                 store=None, session_id: Optional[str] = None, recall_snippets: int = 0,
+                 asummarizer: Optional[Callable[[str, List[Message]], Awaitable[str]]] = None):
+        """Initialize the conversation manager
+
+        Args:
+            token_budget: Maximum tokens of history included in prompts
+            summarizer: Callable taking the current summary and the messages that
+                left the window, returning the new summary
+            store: Optional SessionStore every turn is persisted to
+            session_id: Session in the store this conversation belongs to
+            recall_snippets: Number of relevant earlier snippets (turns that left
+                the window and tool observations) added for each query. 0 disables recall
+            asummarizer: asyncio version of `summarizer`, used by acompact
+        """
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.asummarizer = asummarizer
+        self.store = store
+        self.session_id = session_id
+        self.summary = ""
+        self.messages: Deque[Message] = deque(maxlen=MAX_WINDOW_MESSAGES)
+        self._window_tokens = 0
+        self._evicted: List[Message] = []
+        self.recall_snippets = recall_snippets
+        self.recall = RecallIndex() if recall_snippets > 0 else None
+        # Set by restore: the recall index is built from the store on the first search
+        self._recall_pending = False
+
+    def restore(self):
+        """Load the summary and the newest turns that fit the window from the store
+
+        Only the window is read here. The recall index over the whole history is
+        built on the first search, so resuming stays independent of history length.
+        """
+        if self.store is None:
+            return
+        self._recall_pending = self.recall is not None
+        self.summary = self.store.load_summary(self.session_id)
+        for role, content in self.store.recent_turns(self.session_id, self.token_budget):
+            self._add(role, content, persist=False)
+        # Turns that did not fit are already covered by the stored summary
+        self._evicted = []
+
+    def _build_recall(self):
+        """Index the stored history of a restored session, which includes every turn added since"""
+        self._recall_pending = False
+        # Snippets still in the window are skipped when recalled
+        for role, tool, content, _ in self.store.iter_turns(self.session_id):
+            if role == "observation":
+                tool_input, _, output = content.partition("\n")
+                self._index_observation(tool, tool_input, output)
+            else:
+                self.recall.add(ROLE_LABELS.get(role, role), content)
+
+    def _add(self, role: str, content: str, persist: bool = True):
+        if persist and self.store is not None:
+            self.store.add_turn(self.session_id, role, content)
+        # A single message may use at most half the budget in the window
+        content = _truncate_to_tokens(content, max(1, self.token_budget // 2))
+        if len(self.messages) == self.messages.maxlen:
+            self._evict()
+        message = Message(role=role, content=content, tokens=estimate_tokens(content))
+        self.messages.append(message)
+        self._window_tokens += message.tokens
+        while self._window_tokens > self.token_budget and len(self.messages) > 1:
+            self._evict()
+
+    def _evict(self):
+        message = self.messages.popleft()
+        self._window_tokens -= message.tokens
+        self._evicted.append(message)
+        if self.recall is not None and not self._recall_pending:
+            self.recall.add(ROLE_LABELS.get(message.role, message.role), message.content)
+
+    def _index_observation(self, tool: str, tool_input: str, output: str):
+        self.recall.add(f"{tool}: {tool_input}", output)
+
+    def add_user_message(self, message: str):
+        self._add("user", message)
+
+    def add_assistant_message(self, message: str):
+        self._add("assistant", message)
+
+    def add_preprocessor_result(self, is_relevant: bool, reason: str):
+        self._add("system", f"Preprocessor: {'Relevant' if is_relevant else 'Not relevant'} - {reason}")
+
+    def add_observation(self, tool: str, tool_input: str, output: str):
+        """Keep a tool observation for recall. Observations are not added to the prompt window"""
+        if self.store is not None:
+            self.store.add_observation(self.session_id, tool, tool_input, output)
+        if self.recall is not None and not self._recall_pending:
+            self._index_observation(tool, tool_input, output)
+
+    def _take_evicted(self) -> List[Message]:
+        """Take the messages waiting to be summarized, or none if there is no summarizer"""
+        evicted, self._evicted = self._evicted, []
+        if self.summarizer is None and self.asummarizer is None:
+            return []
+        return evicted
+    
+    def _set_summary(self, summary: str):
+        # The summary shares the budget with the window, so keep it small
+        self.summary = _truncate_to_tokens(summary.strip(), max(1, self.token_budget // 4))
+        if self.store is not None:
+            self.store.save_summary(self.session_id, self.summary)
+    
+    def compact(self):
+        """Fold messages that left the window into the rolling summary"""
+        if self.summarizer is None and self.asummarizer is not None:
+            # Only acompact can summarize them
+            return
+        evicted = self._take_evicted()
+        if not evicted:
+            return
+        try:
+            self._set_summary(self.summarizer(self.summary, evicted))
+        except Exception as e:
+            logger.warning("Failed to summarize conversation history: %s", str(e))
+    
+    async def acompact(self):
+        """asyncio version of compact, which never blocks the event loop on the summarizer
+        
+        Uses asummarizer, or runs summarizer in a worker thread if there is none.
+        """
+        evicted = self._take_evicted()
+        if not evicted:
+            return
+        try:
+            if self.asummarizer is None:
+                summary = await asyncio.to_thread(self.summarizer, self.summary, evicted)
+            else:
+                summary = await self.asummarizer(self.summary, evicted)
+            self._set_summary(summary)
+        except Exception as e:
+            logger.warning("Failed to summarize conversation history: %s", str(e))
+
+    def get_recent_messages(self, count: Optional[int] = None, query: Optional[str] = None) -> str:
+        """Get the conversation summary and the messages in the window formatted as a string
+
+        Messages still waiting to be summarized are summarized first, blocking on
+        the summarizer; asyncio callers await acompact before calling this.
+        
+        Args:
+            count: Only include this many of the most recent messages
+            query: Current query, used to recall relevant earlier snippets
+
+        Returns:
+            The formatted history
+        """
+        self.compact()
+        recent = list(self.messages)
+        if count is not None:
+            recent = recent[-count:] if count > 0 else []
+        formatted = []
+        if self.summary:
+            formatted.append(f"Summary of earlier conversation: {self.summary}")
+        for msg in recent:
+            prefix = ROLE_LABELS.get(msg.role, msg.role)
+            formatted.append(f"{prefix}: {msg.content}")
+        # Query-specific snippets go last so the history before them stays a stable prompt prefix
+        if query and self.recall is not None:
+            if self._recall_pending:
+                self._build_recall()
+            in_window = {msg.content for msg in self.messages}
+            snippets = [snippet for snippet in self.recall.search(query, k=self.recall_snippets + len(in_window))
+                        if snippet.text not in in_window][:self.recall_snippets]
+            if snippets:
+                # Recalled snippets get a small slice of the budget each
+                limit = max(1, self.token_budget // (4 * self.recall_snippets))
+                formatted.append("Relevant earlier context:")
+                formatted.extend(f"- {snippet.label}: {_truncate_to_tokens(snippet.text, limit)}" for snippet in snippets)
+        return "\n".join(formatted)
+
+    def get_memory_messages(self) -> List[HumanMessage | AIMessage]:
+        """Convert messages to LangChain message format"""
+        memory_messages = []
+        for msg in self.messages:
+            if msg.role == "user":
+                memory_messages.append(HumanMessage(content=msg.content))
+            elif msg.role == "assistant":
+                memory_messages.append(AIMessage(content=msg.content))
+        return memory_messages
@@ -1,92 +1,216 @@
-from typing import Optional, List, Dict
-from langchain.agents import initialize_agent, AgentType
+from typing import Optional, List, Dict, Iterator
 from langchain.agents import Tool
-from langchain_community.tools import ShellTool,DuckDuckGoSearchRun
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.schema import HumanMessage, AIMessage
 from .preprocessor import QueryPreprocessor
+from .conversation import ConversationManager, history_token_budget
+from .session_store import SessionStore
+from .host_facts import get_host_facts
+from .examples import ExampleLibrary, AGENT_EXAMPLES
 from .config import AidaConfig
 from .providers import LLMProviderFactory
+from .streaming import AidaEvent, StreamingEventHandler, TOKEN, FINAL_ANSWER, ERROR
+from .speculation import SpeculativeGate, AsyncSpeculativeGate, QueryCancelled
+from .agents import build_agent, resolve_agent_mode, REACT
+from .loop_guard import ToolMemo, LoopDetector, AgentLoopDetected
+from .final_answer import extract_final_answer, format_run, strip_final_answer
+import asyncio
 import logging
 import re
-from .tools.coder_tool import PythonCoder
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 # from .tools.coder_tool import WriteCodeAndExecute
-from .tools.validated_shelltool import shell_tool
+from .tools.validated_shelltool import ValidatedShellTool, make_shell_tool
+from .tools.executor import CommandExecutor
+from .tools.shell_session import ShellSession
+from .tools.output_store import OutputStore, READ_OUTPUT_DESCRIPTION
+from .tools.system_metrics import metrics_tools
+from .tools.log_search import LogSearch, LOG_SEARCH_DESCRIPTION
+from .tools.registry import ToolRegistry, ToolSpec
 
-class ConversationManager:
-    """Manages conversation history for both preprocessor and core model"""
-    def __init__(self):
-        self.messages: List[Dict[str, str]] = []
-    
-    def add_user_message(self, message: str):
-        self.messages.append({"role": "user", "content": message})
-    
-    def add_assistant_message(self, message: str):
-        self.messages.append({"role": "assistant", "content": message})
-    
-    def add_preprocessor_result(self, is_relevant: bool, reason: str):
-        self.messages.append({"role": "system", "content": f"Preprocessor: {'Relevant' if is_relevant else 'Not relevant'} - {reason}"})
-    
-    def get_recent_messages(self, count: int = 5) -> str:
-        """Get the most recent messages formatted as a string"""
-        recent = self.messages[-count:] if len(self.messages) > count else self.messages
-        formatted = []
-        for msg in recent:
-            prefix = {
-                "user": "User",
-                "assistant": "Assistant",
-                "system": "System"
-            }.get(msg["role"], msg["role"])
-            formatted.append(f"{prefix}: {msg['content']}")
-        return "\n".join(formatted)
-    
-    def get_memory_messages(self) -> List[HumanMessage | AIMessage]:
-        """Convert messages to LangChain message format"""
-        memory_messages = []
-        for msg in self.messages:
-            if msg["role"] == "user":
-                memory_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                memory_messages.append(AIMessage(content=msg["content"]))
-        return memory_messages
+TOOL_CALLING_HUMAN_TEMPLATE = """{context}
+
+Question: {input}"""
+
+AGENT_PROMPT_SUFFIX = """Begin!
+
+{context}
+
+{examples}
+
+Question: {input}
+Thought:{agent_scratchpad}"""
 
 class Aida:
-    def __init__(self, config: Optional[AidaConfig] = None, gui_validator=None):
+    # Callable deciding whether the shell tool runs a command (see ValidatedShellTool).
+    # None asks on the terminal
+    command_validator = None
+    
+    def __init__(self, config: Optional[AidaConfig] = None, gui_validator=None, session_id: Optional[str] = None):
+        """Initialize AIDA
+        
+        Args:
+            config: AidaConfig instance. Defaults to AidaConfig()
+            gui_validator: Optional GUI callback used to confirm commands
+            session_id: Stored session to resume. Implies session persistence
+            
+        Raises:
+            ValueError: If a model is unavailable, the session does not exist or the
+                cassette has no recording of a model
+        """
         self.config = config or AidaConfig()
         
-        # Initialize conversation manager
-        self.conversation = ConversationManager()
+        # Open the session store when sessions are persisted or one is resumed
+        self.session_store = None
+        self.session_id = session_id
+        if self.config.persist_sessions or session_id:
+            self.session_store = SessionStore(self.config.session_store_path)
+            if session_id is None:
+                self.session_id = self.session_store.create_session()
+            elif not self.session_store.session_exists(session_id):
+                raise ValueError(f"Session '{session_id}' not found in {self.config.session_store_path}")
+        
+        # Initialize conversation manager with a history budget sized for the core model
+        self.conversation = ConversationManager(
+            token_budget=self.config.history_token_budget or history_token_budget(self.config.core_model),
+            store=self.session_store,
+            session_id=self.session_id,
+            recall_snippets=self.config.recall_snippets
+        )
+        if session_id:
+            self.conversation.restore()
+        
+        # Enable the shared LLM response cache before any provider is created
+        if self.config.cache_enabled:
+            LLMProviderFactory.enable_cache(
+                max_entries=self.config.cache_max_entries,
+                ttl=self.config.cache_ttl,
+                path=self.config.cache_path
+            )
+        
+        # Record model calls to a cassette, or replay them, before any provider is created.
+        # The session that opens the cassette closes it (see close)
+        self._cassette = None
+        if self.config.cassette_mode:
+            if not self.config.cassette_path:
+                raise ValueError("cassette_mode needs a cassette_path")
+            opened = LLMProviderFactory.current_cassette() is None
+            cassette = LLMProviderFactory.use_cassette(
+                self.config.cassette_path,
+                self.config.cassette_mode,
+                timing=self.config.cassette_timing
+            )
+            self._cassette = cassette if opened else None
         
         # Initialize core LLM provider
         self.llm = LLMProviderFactory.get_provider(
             provider_type=self.config.core_provider,
             model=self.config.core_model,
-            temperature=0
+            temperature=0,
+            pooled=self.config.pool_providers,
+            **self.config.provider_options(self.config.core_provider)
         )
         
         self.gui_validator = gui_validator
         self.tools = self._setup_tools()
-        self.agent = self._setup_agent()
+        # Picking the agent mode may ask the model server what the model supports. With
+        # deferred validation startup stays offline, so the agent is built on the first query
+        self.agent = None
+        self.agent_mode = None
+        if not (self.config.defer_model_validation and self.config.agent_mode.lower() != REACT):
+            self.agent = self._setup_agent()
+        
+        # Only the worked examples closest to each query are sent, not all of them on every step
+        self.examples = ExampleLibrary(
+            AGENT_EXAMPLES,
+            k=self.config.example_count,
+            token_budget=self.config.example_token_budget
+        )
         
         # Initialize preprocessor with conversation manager
         self.preprocessor = QueryPreprocessor(
             config=self.config,
             conversation=self.conversation
         )
+        
+        # History that leaves the window is summarized by the preprocessor model
+        self.conversation.summarizer = self.preprocessor.summarize_history
+        self.conversation.asummarizer = self.preprocessor.asummarize_history
+        
+        # Runs preprocessor LLM calls alongside the agent (threads start on first use)
+        self._relevance_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="aida-relevance")
+    
+    def close(self) -> None:
+        """Release the session's resources: its shell and spill files, stored outputs, mapped logs,
+        the relevance threads and the cassette it opened
+        
+        A cassette being recorded is only complete once it is closed.
+        """
+        self._relevance_executor.shutdown(wait=False)
+        self.executor.close()
+        self.output_store.close()
+        self.log_search.close()
+        if self._cassette is not None and LLMProviderFactory.current_cassette() is self._cassette:
+            LLMProviderFactory.stop_cassette()
+        self._cassette = None
+    
+    def _build_executor(self) -> CommandExecutor:
+        # A persistent shell keeps `cd` and `export` between agent steps
+        executor_class = ShellSession if self.config.persistent_shell else CommandExecutor
+        return executor_class(
+            timeout=self.config.command_timeout,
+            max_output_bytes=self.config.command_output_limit
+        )
+    
+    def _build_search_tool(self):
+        # Imported on first use so sessions that never search skip the client
+        from langchain_community.tools import DuckDuckGoSearchRun
+        return DuckDuckGoSearchRun()
+    
+    def _build_coder_tool(self):
+        # The coder runs its own agent and provider, so only build it when called
+        from .tools.coder_tool import PythonCoder
+        # The coder runs its commands through the agent's shell tool: same shell, confirmation,
+        # output digests and memo. If the agent has no shell tool, one is made on the same shell
+        shell_tool = next((tool for tool in self.tools if tool.name == "shell"), None)
+        return PythonCoder(llm=self.llm.llm, pooled=self.config.pool_providers, agent_mode=self.config.agent_mode,
+                           provider_options=self.config.provider_options("gemini"),
+                           shell_tool=shell_tool or make_shell_tool(self.shell))
     
     def _setup_tools(self) -> list[Tool]:
-        return [
-            shell_tool,
-            Tool(name="duckduckgo",
-                 func = DuckDuckGoSearchRun().run,
-                 description="Use this to search for information when you need it or cant get a job done."),
-            Tool(name="python_coder",
-                 func=PythonCoder(llm=self.llm.llm).process_query,
-                 description="""This code will use an agent to write the code and execute it. You only need to pass in the query. The generated code will be in generated_code.py
+        self.tool_registry = ToolRegistry()
+        self.executor = self._build_executor()
+        # Large outputs are digested and paged in with read_output instead of filling the scratchpad
+        self.output_store = OutputStore(threshold=self.config.output_digest_threshold)
+        self.shell = ValidatedShellTool(self.executor, self.output_store, validator=self.command_validator)
+        self.tool_registry.add(make_shell_tool(self.shell))
+        # Structured metrics read /proc directly: no process spawn and compact JSON for the model
+        for tool in metrics_tools():
+            self.tool_registry.add(tool)
+        # Log files are indexed by timestamp once and searched in place, never read into the prompt
+        self.log_search = LogSearch()
+        self.tool_registry.add(Tool(
+            name="log_search",
+            func=self.log_search.run,
+            description=LOG_SEARCH_DESCRIPTION
+        ))
+        if self.output_store.threshold:
+            self.tool_registry.add(Tool(
+                name="read_output",
+                func=self.output_store.read_tool,
+                description=READ_OUTPUT_DESCRIPTION
+            ))
+        self.tool_registry.register(ToolSpec(
+            name="duckduckgo",
+            description="Use this to search for information when you need it or cant get a job done.",
+            build=self._build_search_tool
+        ))
+        self.tool_registry.register(ToolSpec(
+            name="python_coder",
+            description="""This code will use an agent to write the code and execute it. You only need to pass in the query. The generated code will be in generated_code.py
                  This tool can handle installing packages and executing code. 
 
                  You must provide a very detailed description of the code you want to write.
@@ -99,22 +223,34 @@ class Aida:
                  Action Input: python generated_code.py
                  Observation: The 7th prime number is 17
                  Final Answer: The 7th prime number is 17
-                 """)
-        ]
+                 """,
+            build=self._build_coder_tool,
+            func_name="process_query",
+            coroutine_name="aprocess_query"
+        ))
+        # Repeated read-only calls within one agent run are answered from a memo table
+        self.tool_memo = ToolMemo()
+        return self.tool_registry.build_tools(
+            enabled=self.config.enabled_tools,
+            disabled=self.config.disabled_tools,
+            output_filter=self.output_store.observe,
+            memo=self.tool_memo if self.config.tool_memo else None
+        )
     
     def _setup_agent(self):
-        # Using ZERO_SHOT_REACT_DESCRIPTION which follows a thought-action-observation pattern
-        return initialize_agent(
-            tools=self.tools,
+        # Native tool calling when the model supports it; otherwise ZERO_SHOT_REACT_DESCRIPTION,
+        # which follows a thought-action-observation pattern in plain text
+        agent, self.agent_mode = build_agent(
             llm=self.llm.llm,  # Access the underlying LangChain LLM
-            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            tools=self.tools,
+            mode=resolve_agent_mode(self.config.agent_mode, self.llm),
+            human_template=TOOL_CALLING_HUMAN_TEMPLATE,
             verbose=True,
             handle_parsing_errors=True,
             max_iterations=20,
             early_stopping_method="force",
             return_intermediate_steps=True,
-            agent_kwargs={
-                "prefix": """You are AIDA, a helpful AI assistant.
+            prefix="""You are AIDA, a helpful AI assistant.
                 When asked a question, you MUST use the available tools to help the user.
                 NEVER make up or hallucinate command outputs.
                 ALWAYS use the shell tool to execute commands and get real output.
@@ -135,54 +271,16 @@ class Aida:
                 10. You can install a new package if required. But always follow these below rlules:
                      - Before you install anything, verify that the package does not exist on the system and 
                      - Always find out which OS is running on the server to use the correct package manager.
+                       When the context above the question has "Host facts:", they already tell you the OS and package manager, so do not run commands to find them out.
+                11. For uptime, load, CPU, memory, disk usage, open ports and logged in users, use the system_load, cpu_usage,
+                    memory_usage, disk_usage, open_ports and logged_in_users tools instead of the shell. They return JSON.
+                12. To look for errors or events in log files, use the log_search tool instead of cat, grep or tail on the log.
+                """,
+            # Worked examples are only sent to the ReAct agent (see _build_inputs)
+            react_instructions="""13. Worked examples of similar questions may be given before the question. Follow their format, not their data.
 
-                Example interaction:
-                Example 1:
-                    Question: How many users are logged in?
-                    Thought: I need to use the shell tool with 'who | wc -l' command to check logged in users
-                    Action: shell
-                    Action Input: who | wc -l
-                    Observation: 3
-                    Final Answer: There are 3 users currently logged in.
-                    
-                Example 2:
-                    Question: Who are the currently logged in users?
-                    Thought: I need to use the shell tool with 'who' command to check logged in users
-                    Action: shell
-                    Action Input: who
-                    Observation: user1    pts/0    2024-01-31 10:00 (:0)
-                    user2    pts/1    2024-01-31 10:05 (:0)
-                    user3    pts/2    2024-01-31 10:10 (:0)
-                    Final Answer: There are 3 users currently logged in: user1, user2, and user3. Each is connected through a pseudo-terminal (pts).
-                    
-                Example 3 (Follow-up):
-                    Question: When did they log in?
-                    Thought: From the previous 'who' command output, I can see the login times
-                    Final Answer: Looking at the previous information: user1 logged in at 10:00, user2 at 10:05, and user3 at 10:10 on January 31st, 2024.
-                
-                Example 4:
-                    Question: Plot the iris dataset
-                    Thought: I need to use the python_coder tool to write the code to plot the iris dataset
-                    Action: python_coder
-                    Action Input: Plot the iris dataset
-                    Observation: Code written to file generated_code.py
-                    Action: shell
-                    Action Input: python generated_code.py
-                    Observation: The iris dataset has been plotted
-                    Final Answer: The iris dataset has been plotted
-                
-                Example 5:
-                    Question: Write the code to find the 7th prime number
-                    Thought: I need to use the python_coder tool to write the code to find the 7th prime number
-                    Action: python_coder
-                    Action Input: Find the 7th prime number
-                    Observation: Code written to file generated_code.py
-                    Action: shell
-                    Action Input: python generated_code.py
-                    Observation: The 7th prime number is 17
-                    Final Answer: The 7th prime number is 17
-                 
                    """,
+            react_kwargs={
                 "format_instructions": """To use a tool, please use the following format:
                 Thought: I need to use X tool because...
                 Action: the action to take, should be one of [{tool_names}]
@@ -190,21 +288,197 @@ class Aida:
                 Observation: the result of the action
                 ... (this Thought/Action/Action Input/Observation can repeat N times). It always has to follow this format.
                 Thought: I now know what to respond
-                Final Answer: the final response to the human"""
+                Final Answer: the final response to the human""",
+                # Everything before {context} is identical on every call, so local
+                # servers reuse its KV cache; only context, examples and question are evaluated
+                "suffix": AGENT_PROMPT_SUFFIX,
+                "input_variables": ["context", "examples", "input", "agent_scratchpad"]
             }
         )
+        logger.info("Agent mode: %s", self.agent_mode)
+        return agent
     
-    def _validate_response(self, response: str) -> bool:
+    def _needs_final_answer_check(self) -> bool:
+        """Weak models in ReAct mode may end a run without a Final Answer line
+        
+        Tool calling runs end with the model's reply, which is the answer.
         """
-        Validate that the response contains a Final Answer
+        return self.agent_mode == REACT and not self.llm.is_strong()
+    
+    def _local_answer(self, response: dict) -> Optional[str]:
+        """Get the answer of an agent run without another LLM call, or None if there is none
         
         Args:
-            response: The response from the agent
+            response: The agent response
             
         Returns:
-            bool: True if response contains Final Answer, False otherwise
+            The run's output, or for weak ReAct models the answer extract_final_answer
+            recovers from its steps
+        """
+        if not self._needs_final_answer_check():
+            return response["output"]
+        answer = extract_final_answer(response)
+        if answer is None:
+            logger.info("No answer in the agent run, asking the LLM for a Final Answer")
+        return answer
+    
+    def _record_observations(self, response) -> None:
+        """Persist the tool observations of an agent run to the session store"""
+        for action, observation in response.get("intermediate_steps", []):
+            self.conversation.add_observation(action.tool, str(action.tool_input), str(observation))
+    
+    def _final_answer_prompt(self, query: str, response) -> str:
+        """Build the prompt asking the LLM to turn an agent run into a Final Answer"""
+        return f"""Based on this conversation and output, please provide a Final Answer that directly answers the user's question: "{query}"
+                        
+                        Previous output:
+                        {format_run(response)}
+                        
+                        Remember to start with "Final Answer:" and provide a clear, direct response. Don't say anything about agent."""
+    
+    def _loop_detectors(self) -> list:
+        if self.config.loop_max_repeats <= 0:
+            return []
+        return [LoopDetector(max_repeats=self.config.loop_max_repeats)]
+    
+    def _stopped_response(self, inputs: Dict[str, str], detector: LoopDetector, reason: Exception) -> dict:
+        """Agent response for a run stopped by the loop detector, without an output yet"""
+        logger.warning("Stopped the agent early because %s", reason)
+        return {**inputs, "output": "", "intermediate_steps": detector.steps}
+    
+    def _invoke_agent(self, query: str, inputs: Dict[str, str], callbacks: list) -> dict:
+        """Run the agent once, with a fresh tool memo and a loop detector
+        
+        A run stopped by the loop detector gets a forced Final Answer based on
+        the observations gathered so far instead of running to max_iterations.
+        """
+        detectors = self._loop_detectors()
+        with self.tool_memo.run():
+            try:
+                return self.agent.invoke(inputs, config={"callbacks": callbacks + detectors})
+            except AgentLoopDetected as e:
+                response = self._stopped_response(inputs, detectors[0], e)
+        answer = self.llm.invoke(self._final_answer_prompt(query, response)).content
+        response["output"] = strip_final_answer(answer)
+        return response
+    
+    async def _ainvoke_agent(self, query: str, inputs: Dict[str, str], callbacks: list) -> dict:
+        """asyncio version of _invoke_agent"""
+        detectors = self._loop_detectors()
+        with self.tool_memo.run():
+            try:
+                return await self.agent.ainvoke(inputs, config={"callbacks": callbacks + detectors})
+            except AgentLoopDetected as e:
+                response = self._stopped_response(inputs, detectors[0], e)
+        answer = (await self.llm.ainvoke(self._final_answer_prompt(query, response))).content
+        response["output"] = strip_final_answer(answer)
+        return response
+    
+    def _build_inputs(self, query: str) -> Dict[str, str]:
+        """Build the agent inputs: the query, its context (host facts and conversation history) and examples
+        
+        The context goes after the static instructions and changes slowly (host
+        facts are cached, history is appended to), so consecutive prompts share
+        as long a prefix as possible. The worked examples depend on the query and
+        go last.
         """
-        return "Final Answer:" in response
+        if self.agent is None:
+            self.agent = self._setup_agent()
+        context = self.conversation.get_recent_messages(query=query)
+        if self.config.host_facts:
+            # Saves the agent the uname/os-release round trips on every query
+            context = get_host_facts(self.config.host_facts_ttl).format() + "\n" + context
+        # Examples show the ReAct text format, which tool calling does not use
+        examples = self.examples.format(query) if self.agent_mode == REACT else ""
+        return {"context": context, "examples": examples, "input": query}
+    
+    def prompt_cache_stats(self) -> Optional[dict]:
+        """Prompt prefix reuse measured on the core model, or None if its provider does not report it"""
+        stats = self.llm.prompt_stats
+        return stats.summary() if stats is not None else None
+    
+    def _refuse(self, preprocessor_result) -> str:
+        response = preprocessor_result.response or "This query is not related to server management."
+        self.conversation.add_assistant_message(response)
+        return response
+    
+    def _run_gated(self, query: str, run_agent):
+        """Run the agent behind the relevance check
+        
+        Clear-cut queries are decided locally before the agent starts. Ambiguous
+        ones start the agent and the preprocessor LLM together: tool calls wait
+        for the verdict, and a refused query cancels the agent run.
+        
+        Args:
+            query: The user query
+            run_agent: Callable taking a list of extra callbacks and running the agent
+            
+        Returns:
+            (agent response, None), or (None, refusal message) if the query is not relevant
+        """
+        if not self.config.relevance_check:
+            return run_agent([]), None
+        
+        preprocessor_result = self.preprocessor.check_locally(query)
+        if preprocessor_result is None and not self.config.speculative_relevance_check:
+            preprocessor_result = self.preprocessor.process_query(query)
+        if preprocessor_result is not None:
+            if not preprocessor_result.is_relevant:
+                return None, self._refuse(preprocessor_result)
+            return run_agent([]), None
+        
+        gate = SpeculativeGate()
+        check = self._relevance_executor.submit(self.preprocessor.process_query, query)
+        check.add_done_callback(lambda future: gate.decide(future.exception() is None and future.result().is_relevant))
+        response = error = None
+        try:
+            response = run_agent([gate])
+        except QueryCancelled:
+            pass
+        except Exception as e:
+            error = e
+        
+        preprocessor_result = check.result()
+        if not preprocessor_result.is_relevant:
+            return None, self._refuse(preprocessor_result)
+        if error is not None:
+            raise error
+        return response, None
+    
+    async def _arun_gated(self, query: str, run_agent):
+        """asyncio version of _run_gated; run_agent returns an awaitable
+        
+        Returns:
+            (agent response, None), or (None, refusal message) if the query is not relevant
+        """
+        if not self.config.relevance_check:
+            return await run_agent([]), None
+        
+        preprocessor_result = self.preprocessor.check_locally(query)
+        if preprocessor_result is None and not self.config.speculative_relevance_check:
+            preprocessor_result = await self.preprocessor.aprocess_query(query)
+        if preprocessor_result is not None:
+            if not preprocessor_result.is_relevant:
+                return None, self._refuse(preprocessor_result)
+            return await run_agent([]), None
+        
+        gate = AsyncSpeculativeGate()
+        agent_task = asyncio.ensure_future(run_agent([gate]))
+        try:
+            preprocessor_result = await self.preprocessor.aprocess_query(query)
+        except BaseException:
+            agent_task.cancel()
+            raise
+        gate.decide(preprocessor_result.is_relevant)
+        if not preprocessor_result.is_relevant:
+            # Cancelling the task also cancels any tool call it is waiting on
+            agent_task.cancel()
+            try:
+                await agent_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            return None, self._refuse(preprocessor_result)
+        return await agent_task, None
     
     def process_query(self, query: str) -> str:
         """Process a user query and return a response"""
@@ -214,52 +488,140 @@ class Aida:
         # Add user query to conversation history
         self.conversation.add_user_message(query)
         
-        # Construct the prompt for the query using conversation history
-        prompt = self.conversation.get_recent_messages() + f"\nUser: {query}"
+        # Construct the agent inputs for the query using host facts and conversation history
+        inputs = self._build_inputs(query)
+        
+        try:
+            # Run the agent to process the query, gated by the relevance check
+            response, refusal = self._run_gated(
+                query, lambda callbacks: self._invoke_agent(query, inputs, callbacks)
+            )
+            if refusal is not None:
+                return refusal
+            logger.info(f"Response: {response}")
+            self._record_observations(response)
+            
+            answer = self._local_answer(response)
+            if answer is None:
+                answer = strip_final_answer(self.llm.invoke(self._final_answer_prompt(query, response)).content)
+            
+            # Add assistant response to conversation history
+            self.conversation.add_assistant_message(answer)
+            return answer
+        except Exception as e:
+            logger.error("Error processing query: %s", str(e))
+            error_response = f"Error processing query: {str(e)}"
+            self.conversation.add_assistant_message(error_response)
+            return error_response
+    
+    async def aprocess_query(self, query: str) -> str:
+        """Asynchronously process a user query and return a response
+        
+        Uses the providers' and tools' asyncio implementations, so a single event
+        loop can drive many Aida sessions concurrently.
         
-        # First check if query is relevant using preprocessor
-        #TODO: We need to move the preprocessor check out of AIDA. Its too restrictive.
-        # preprocessor_result = self.preprocessor.process_query(query)
-        # if not preprocessor_result.is_relevant:
-        #     response = preprocessor_result.response or "This query is not related to server management."
-        #     self.conversation.add_assistant_message(response)
-        #     return response
+        Args:
+            query: The query to process
             
+        Returns:
+            The response to the query
+        """
+        if not query:
+            return "Empty query. Please ask a question."
+        
+        self.conversation.add_user_message(query)
+        # Summarize evicted history without blocking the event loop (other sessions keep running)
+        await self.conversation.acompact()
+        inputs = self._build_inputs(query)
+        
         try:
-            # Run the agent to process the query
-            response = self.agent.invoke({"input": prompt})  # Use constructed prompt
+            response, refusal = await self._arun_gated(
+                query, lambda callbacks: self._ainvoke_agent(query, inputs, callbacks)
+            )
+            if refusal is not None:
+                return refusal
             logger.info(f"Response: {response}")
+            self._record_observations(response)
             
-            # Skip validation for strong models
-            if not self.llm.is_strong():
-                # Validate response has Final Answer
-                if not self._validate_response(response):
-                    # Print the response variable for debugging
-                    print(f"Response before validation: {response}")
-                    
-                    # If no Final Answer, try to get one
-                    final_response = self.llm.invoke(
-                        f"""Based on this conversation and output, please provide a Final Answer that directly answers the user's question: "{query}"
-                        
-                        Previous output:
-                        {response}
-                        
-                        Remember to start with "Final Answer:" and provide a clear, direct response. Don't say anything about agent."""
-                    ).content
-                    response = final_response.lstrip("Final Answer:").strip()
-                
-                # Add assistant response to conversation history
-                self.conversation.add_assistant_message(response)
-                return response
-            else:
-                # Add assistant response to conversation history
-                self.conversation.add_assistant_message(response["output"])
-                return response["output"]
+            answer = self._local_answer(response)
+            if answer is None:
+                answer = strip_final_answer((await self.llm.ainvoke(self._final_answer_prompt(query, response))).content)
+            
+            self.conversation.add_assistant_message(answer)
+            return answer
         except Exception as e:
             logger.error("Error processing query: %s", str(e))
             error_response = f"Error processing query: {str(e)}"
             self.conversation.add_assistant_message(error_response)
             return error_response
+    
+    def process_query_stream(self, query: str) -> Iterator[AidaEvent]:
+        """Process a user query and yield events as the agent produces them
+        
+        The agent runs in a background thread; LLM tokens, thoughts, actions and
+        observations are yielded as soon as they happen, followed by a single
+        final_answer (or error) event.
+        
+        Args:
+            query: The query to process
+            
+        Yields:
+            AidaEvent instances
+        """
+        if not query:
+            yield AidaEvent(FINAL_ANSWER, "Empty query. Please ask a question.")
+            return
+        
+        self.conversation.add_user_message(query)
+        inputs = self._build_inputs(query)
+        
+        events: Queue = Queue()
+        result = {}
+        
+        def run_agent():
+            try:
+                result["response"], result["refusal"] = self._run_gated(
+                    query,
+                    lambda callbacks: self._invoke_agent(query, inputs, callbacks + [StreamingEventHandler(events)])
+                )
+            except Exception as e:
+                result["error"] = e
+            finally:
+                events.put(None)
+        
+        worker = threading.Thread(target=run_agent, daemon=True)
+        worker.start()
+        while (event := events.get()) is not None:
+            yield event
+        worker.join()
+        
+        try:
+            if "error" in result:
+                raise result["error"]
+            if result["refusal"] is not None:
+                yield AidaEvent(FINAL_ANSWER, result["refusal"])
+                return
+            response = result["response"]
+            logger.info(f"Response: {response}")
+            self._record_observations(response)
+            
+            answer = self._local_answer(response)
+            if answer is None:
+                # Stream the recovered Final Answer instead of blocking on it
+                chunks = []
+                for chunk in self.llm.stream(self._final_answer_prompt(query, response)):
+                    chunks.append(chunk)
+                    yield AidaEvent(TOKEN, chunk)
+                answer = strip_final_answer("".join(chunks))
+        except Exception as e:
+            logger.error("Error processing query: %s", str(e))
+            error_response = f"Error processing query: {str(e)}"
+            self.conversation.add_assistant_message(error_response)
+            yield AidaEvent(ERROR, error_response)
+            return
+        
+        self.conversation.add_assistant_message(answer)
+        yield AidaEvent(FINAL_ANSWER, answer)
 
 if __name__ == "__main__":
     aida = Aida()
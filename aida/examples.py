@@ -0,0 +1,236 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+from .conversation import estimate_tokens
+from .recall import RecallIndex
+
+# Worked examples sent per query, and the most prompt tokens they may take together
+DEFAULT_EXAMPLE_COUNT = 2
+DEFAULT_EXAMPLE_TOKEN_BUDGET = 600
+
+EXAMPLES_HEADER = "Worked examples of similar questions:"
+
+@dataclass
+class Example:
+    """A worked Thought/Action/Observation example for the agent prompt"""
+    question: str
+    text: str
+    # Extra search terms for queries that word the same task differently
+    tags: str = ""
+
+AGENT_EXAMPLES = [
+    Example(
+        question="How many users are logged in?",
+        tags="who sessions login logged in when tty",
+        text="""Question: How many users are logged in?
+Thought: I need to use the logged_in_users tool to check logged in users
+Action: logged_in_users
+Action Input: now
+Observation: {"count":3,"users":["user1","user2","user3"],"sessions":[{"user":"user1","tty":"pts/0","from":null,"login_time":"2024-01-31 10:00:00","pid":811},{"user":"user2","tty":"pts/1","from":null,"login_time":"2024-01-31 10:05:00","pid":902},{"user":"user3","tty":"pts/2","from":null,"login_time":"2024-01-31 10:10:00","pid":977}]}
+Final Answer: There are 3 users currently logged in: user1, user2, and user3.
+Question (follow-up): When did they log in?
+Thought: From the previous logged_in_users output, I can see the login times
+Final Answer: Looking at the previous information: user1 logged in at 10:00, user2 at 10:05, and user3 at 10:10 on January 31st, 2024."""
+    ),
+    Example(
+        question="Which process is using the most memory?",
+        tags="ps top ram cpu heaviest process hog",
+        text="""Question: Which process is using the most memory?
+Thought: I need to use the shell tool with 'ps' sorted by memory usage
+Action: shell
+Action Input: ps aux --sort=-%mem | head -2
+Observation: USER  PID %CPU %MEM    VSZ   RSS TTY STAT START TIME COMMAND
+mysql 1201  2.1 18.4 2381740 754320 ? Ssl 10:00 5:12 /usr/sbin/mysqld
+Final Answer: mysqld (PID 1201, user mysql) is using the most memory: 18.4% (about 737 MB resident)."""
+    ),
+    Example(
+        question="Is the disk getting full?",
+        tags="disk space free storage filesystem df usage full partition",
+        text="""Question: Is the disk getting full?
+Thought: I need to use the disk_usage tool to check every filesystem
+Action: disk_usage
+Action Input: all
+Observation: [{"mount":"/","device":"/dev/sda1","fs":"ext4","size_gb":48.0,"used_gb":45.1,"available_gb":2.9,"used_percent":94.0,"inodes_used_percent":12.1},{"mount":"/boot","device":"/dev/sda2","fs":"ext4","size_gb":0.5,"used_gb":0.1,"available_gb":0.4,"used_percent":20.0,"inodes_used_percent":1.0}]
+Final Answer: Yes, the root filesystem (/) is 94% full with only 2.9 GB free. /boot is fine at 20%."""
+    ),
+    Example(
+        question="Were there any errors in the nginx log in the last hour?",
+        tags="log logs errors warnings syslog journal failed recent",
+        text="""Question: Were there any errors in the nginx log in the last hour?
+Thought: I need to use the log_search tool on the nginx error log for the last hour
+Action: log_search
+Action Input: path=/var/log/nginx/error.log since=1h pattern=error
+Observation: {"matches":12,"levels":{"error":12},"top_messages":[{"count":12,"message":"[error] #: *# connect() failed (111: Connection refused) while connecting to upstream"}],"samples":["2024-01-31T10:02:11 [error] 811#0: *52 connect() failed (111: Connection refused) while connecting to upstream"]}
+Final Answer: Yes, 12 errors in the last hour, all "connect() failed (Connection refused) while connecting to upstream": nginx cannot reach its backend, which is probably down."""
+    ),
+    Example(
+        question="Install htop",
+        tags="install package apt dnf yum missing program",
+        text="""Question: Install htop
+Thought: The host facts say the package manager is apt. I need to check whether htop is already installed
+Action: shell
+Action Input: command -v htop
+Observation: [exit code 1]
+Thought: htop is not installed, so I will install it with apt
+Action: shell
+Action Input: sudo apt-get install -y htop
+Observation: Setting up htop (3.0.5-7build2) ...
+Final Answer: htop was not installed, so I installed it with apt (version 3.0.5)."""
+    ),
+    Example(
+        question="Plot the iris dataset",
+        tags="python code script plot chart program write",
+        text="""Question: Plot the iris dataset
+Thought: I need to use the python_coder tool to write the code to plot the iris dataset
+Action: python_coder
+Action Input: Plot the iris dataset
+Observation: Code written to file generated_code.py
+Action: shell
+Action Input: python generated_code.py
+Observation: The iris dataset has been plotted
+Final Answer: The iris dataset has been plotted"""
+    ),
+    Example(
+        question="Write the code to find the 7th prime number",
+        tags="python code script calculate compute program write",
+        text="""Question: Write the code to find the 7th prime number
+Thought: I need to use the python_coder tool to write the code to find the 7th prime number
+Action: python_coder
+Action Input: Find the 7th prime number
+Observation: Code written to file generated_code.py
+Action: shell
+Action Input: python generated_code.py
+Observation: The 7th prime number is 17
+Final Answer: The 7th prime number is 17"""
+    ),
+]
+
+CODER_EXAMPLES = [
+    Example(
+        question="Write the code to print hello world",
+        tags="print fix syntax error",
+        text="""Question: Write the code to print hello world
+Thought: I need to write the code to print hello world
+Action: write_code_to_file
+Action Input: print("Hello World)
+Observation: The code has been written and saved to generated_code.py
+Thought: I need to execute the code to see if it works
+Action: shell
+Action Input: python generated_code.py
+Observation: SyntaxError: unterminated string literal (detected at line 1)
+Thought: I need to fix the code to print hello world
+Action: write_code_to_file
+Action Input: print("Hello World")
+Observation: The code has been written and saved to generated_code.py
+Thought: I need to execute the code to see if it works
+Action: shell
+Action Input: python generated_code.py
+Observation: Hello World
+Final Answer: The code has been written and executed successfully"""
+    ),
+    Example(
+        question="Write the code to show the scatterplot for the iris dataset",
+        tags="plot chart graph install package module missing seaborn matplotlib pip",
+        text="""Question: Write the code to show the scatterplot for the iris dataset
+Thought: I need to write the code to show the scatterplot for the iris dataset
+Action: write_code_to_file
+Action Input: import matplotlib.pyplot as plt
+import seaborn as sns
+iris = sns.load_dataset('iris')
+sns.scatterplot(x='sepal_length', y='sepal_width', data=iris)
+plt.show()
+Observation: The code has been written and saved to generated_code.py
+Thought: I need to execute the code to see if it works
+Action: shell
+Action Input: python generated_code.py
+Observation: No module named 'seaborn'
+Thought: I need to install the seaborn package
+Action: shell
+Action Input: pip install seaborn
+Observation: The seaborn package has been installed
+Thought: I need to execute the code to see if it works
+Action: shell
+Action Input: python generated_code.py
+Observation: The scatterplot has been shown
+Final Answer: The scatterplot has been shown"""
+    ),
+    Example(
+        question="Write the code to show a random cat image",
+        tags="image picture download http api requests file",
+        text="""Question: Write the code to show a random cat image
+Thought: I need to write the code to show a random cat image
+Action: write_code_to_file
+Action Input: import requests
+response = requests.get('https://api.thecatapi.com/v1/images/search')
+image_url = response.json()[0]['url']
+# write the image to a file
+with open('cat_image.jpg', 'wb') as file:
+    file.write(requests.get(image_url).content)
+print('Saved cat_image.jpg')
+Observation: The code has been written and saved to generated_code.py
+Thought: I need to execute the code to see if it works
+Action: shell
+Action Input: python generated_code.py
+Observation: Saved cat_image.jpg
+Final Answer: A random cat image was downloaded to cat_image.jpg"""
+    ),
+]
+
+class ExampleLibrary:
+    """Picks the worked examples most similar to a query
+
+    Examples are indexed by question and tags in a BM25 RecallIndex, so picking
+    them costs a few posting-list lookups. Only the best matches that fit the
+    token budget are sent, instead of every example on every agent step.
+    """
+
+    def __init__(self, examples: Sequence[Example], k: int = DEFAULT_EXAMPLE_COUNT,
+                 token_budget: int = DEFAULT_EXAMPLE_TOKEN_BUDGET, fallback: bool = True):
+        """Index the examples
+
+        Args:
+            examples: Examples to choose from
+            k: Most examples returned per query. 0 disables examples
+            token_budget: Most estimated tokens the returned examples may take together
+            fallback: Return the first example when nothing matches, so the model still sees the format
+        """
+        self.examples = list(examples)
+        self.k = k
+        self.token_budget = token_budget
+        self.fallback = fallback
+        self._by_question = {example.question: example for example in self.examples}
+        self._index = RecallIndex(max_snippets=max(1, len(self.examples)))
+        for example in self.examples:
+            self._index.add(example.question, example.tags)
+
+    def select(self, query: str, k: Optional[int] = None) -> List[Example]:
+        """Get the examples most similar to a query, best first, within the token budget
+
+        Args:
+            query: The user query
+            k: Most examples returned. Defaults to the library's k
+
+        Returns:
+            The selected examples
+        """
+        k = self.k if k is None else k
+        if k <= 0 or not self.examples:
+            return []
+        matches = [self._by_question[snippet.label] for snippet in self._index.search(query, k=k)]
+        if not matches and self.fallback:
+            matches = self.examples[:1]
+
+        selected, used = [], 0
+        for example in matches:
+            tokens = estimate_tokens(example.text)
+            if used + tokens > self.token_budget:
+                continue
+            selected.append(example)
+            used += tokens
+        return selected
+
+    def format(self, query: str) -> str:
+        """Format the examples selected for a query for the agent prompt, or "" if there are none"""
+        selected = self.select(query)
+        if not selected:
+            return ""
+        return "\n\n".join([EXAMPLES_HEADER] + [example.text for example in selected])
@@ -0,0 +1,108 @@
+import re
+from typing import Any, List, Optional, Tuple
+from .loop_guard import ToolMemo
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+# Outputs AgentExecutor returns when a run ends without an answer
+STOPPED_OUTPUTS = {
+    "Agent stopped due to iteration limit or time limit.",
+    "Agent stopped due to max iterations.",
+}
+
+# Pseudo-tool AgentExecutor records for output it could not parse; its log is the model's raw text
+PARSE_ERROR_TOOL = "_Exception"
+
+# Most characters of a tool observation quoted in an extracted answer
+MAX_OBSERVATION_CHARS = 2000
+
+# A ReAct line that starts the next step, ending the text of a Final Answer
+_NEXT_STEP = re.compile(r"^\s*(Thought|Action|Action Input|Observation|Question)\s*:", re.MULTILINE)
+_INVALID_TOOL = re.compile(r"is not a valid tool, try one of")
+
+def strip_final_answer(text: str) -> str:
+    """Return the text after the last "Final Answer:" label (the whole text if there is none)"""
+    if FINAL_ANSWER_MARKER in text:
+        text = text.rsplit(FINAL_ANSWER_MARKER, 1)[1]
+        next_step = _NEXT_STEP.search(text)
+        if next_step:
+            text = text[:next_step.start()]
+    return text.strip()
+
+def _thought(log: str) -> str:
+    """The free text of a ReAct step: everything before its Action line, without the Thought label"""
+    text = re.split(r"^\s*Action\s*:", log, maxsplit=1, flags=re.MULTILINE)[0].strip()
+    if text.startswith("Thought:"):
+        text = text[len("Thought:"):].strip()
+    return text
+
+def _observation(observation: Any) -> str:
+    text = str(observation)
+    if text.startswith(ToolMemo.REPEAT_NOTE):
+        text = text[len(ToolMemo.REPEAT_NOTE):]
+    text = text.strip()
+    if len(text) > MAX_OBSERVATION_CHARS:
+        text = text[:MAX_OBSERVATION_CHARS] + f"\n... [{len(text) - MAX_OBSERVATION_CHARS} more characters]"
+    return text
+
+def extract_final_answer(response: dict) -> Optional[str]:
+    """Get the answer of a ReAct agent run without asking the LLM again
+
+    In order of preference:
+    1. The run's output, unless the executor stopped without one
+    2. The text after a "Final Answer:" label in any step the executor could not
+       parse (e.g. a reply with both an Action and a Final Answer)
+    3. The model's last thought and the last tool observation, formatted together.
+       The last thought is the text of an unparsable step after the last tool
+       call (typically an answer missing its label), else the thought that led
+       to the last tool call
+
+    Args:
+        response: AgentExecutor result with "output" and "intermediate_steps"
+
+    Returns:
+        The answer, or None if the run produced nothing to answer with
+    """
+    output = response.get("output")
+    if isinstance(output, str):
+        output = strip_final_answer(output)
+        if output and output not in STOPPED_OUTPUTS:
+            return output
+
+    steps: List[Tuple[Any, Any]] = response.get("intermediate_steps") or []
+    for action, _ in reversed(steps):
+        if FINAL_ANSWER_MARKER in action.log:
+            answer = strip_final_answer(action.log)
+            if answer:
+                return answer
+
+    thought, tool, observation = "", None, ""
+    for action, step_observation in reversed(steps):
+        if action.tool == PARSE_ERROR_TOOL or _INVALID_TOOL.search(str(step_observation)):
+            # Only model text after the last real tool call counts as its conclusion
+            if tool is None and not thought:
+                thought = _thought(action.log)
+            continue
+        tool, observation = action.tool, _observation(step_observation)
+        thought = thought or _thought(action.log)
+        break
+
+    parts = []
+    if thought:
+        parts.append(thought)
+    if observation:
+        parts.append(f"Output of {tool}:\n{observation}")
+    return "\n\n".join(parts) or None
+
+def format_run(response: dict) -> str:
+    """Format the steps and output of an agent run as a transcript for a follow-up prompt"""
+    lines = []
+    for action, observation in response.get("intermediate_steps") or []:
+        if action.tool == PARSE_ERROR_TOOL:
+            lines.append(action.log.strip())
+            continue
+        lines.append(f"Action: {action.tool}\nAction Input: {action.tool_input}\nObservation: {_observation(observation)}")
+    output = response.get("output")
+    if output:
+        lines.append(str(output))
+    return "\n".join(lines)
@@ -9,6 +9,7 @@ from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize, QTimer, QPropertyAnimat
 from PyQt6.QtGui import QTextCursor, QPalette, QColor, QFont, QIcon
 from .core import Aida
 from .config import AidaConfig
+from .streaming import TOKEN, THOUGHT, ACTION, OBSERVATION, FINAL_ANSWER, ERROR
 
 class LoadingDots(QLabel):
     def __init__(self, parent=None):
@@ -42,6 +43,7 @@ class CommandBubble(QFrame):
         self.setup_ui()
         self.is_finished = False
         self.worker = None
+        self.sudo_check = None
     
     def setup_ui(self):
         self.setFrameShape(QFrame.Shape.StyledPanel)
@@ -157,27 +159,42 @@ class CommandBubble(QFrame):
         self.accept_btn.setEnabled(False)
         self.reject_btn.setEnabled(False)
         
-        # Check if it's a sudo command
+        # Check if it's a sudo command. The shared shell keeps sudo credentials,
+        # so only ask for the password when sudo would prompt for it. The check waits
+        # for any command running in that shell, so it runs off the UI thread
         if self.command.strip().startswith("sudo "):
-            password, ok = QInputDialog.getText(
-                self, "Sudo Password", "Enter sudo password:", 
-                QLineEdit.EchoMode.Password
-            )
-            if ok:
-                self.worker = CommandExecutionWorker(f"SUDO_PASSWORD={password}\n{self.command}")
-            else:
-                self.loading.stop()
-                if not self.is_finished:
-                    self.modify_btn.setEnabled(True)
-                    self.accept_btn.setEnabled(True)
-                    self.reject_btn.setEnabled(True)
-                return
+            self.sudo_check = SudoCheckWorker()
+            self.sudo_check.checked.connect(self._handle_sudo_check)
+            self.sudo_check.start()
         else:
-            self.worker = CommandExecutionWorker(self.command)
+            self._start_worker(self.command)
+    
+    def _handle_sudo_check(self, has_credentials):
+        self.sudo_check.deleteLater()
+        self.sudo_check = None
+        if self.is_finished:
+            return
+        if has_credentials:
+            self._start_worker(self.command)
+            return
         
-        if self.worker:
-            self.worker.finished.connect(self._handle_execution_result)
-            self.worker.start()
+        password, ok = QInputDialog.getText(
+            self, "Sudo Password", "Enter sudo password:", 
+            QLineEdit.EchoMode.Password
+        )
+        if ok:
+            self._start_worker(f"SUDO_PASSWORD={password}\n{self.command}")
+        else:
+            self.loading.stop()
+            if not self.is_finished:
+                self.modify_btn.setEnabled(True)
+                self.accept_btn.setEnabled(True)
+                self.reject_btn.setEnabled(True)
+    
+    def _start_worker(self, command):
+        self.worker = CommandExecutionWorker(command)
+        self.worker.finished.connect(self._handle_execution_result)
+        self.worker.start()
     
     def _handle_execution_result(self, success, result):
         if self.worker:
@@ -306,6 +323,19 @@ class MessageBubble(QFrame):
         if hasattr(self, 'thought_content'):
             self.thought_content.setPlainText(text)
     
+    def append_text(self, text):
+        """Append streamed text to the message in place"""
+        if not hasattr(self, '_streamed_text'):
+            self._streamed_text = ""
+        self._streamed_text += text
+        self.content.setPlainText(self._streamed_text)
+        self.content.moveCursor(QTextCursor.MoveOperation.End)
+    
+    def append_thought_process(self, text):
+        """Append a step to the thought process in place"""
+        if hasattr(self, 'thought_content'):
+            self.thought_content.append(text)
+    
     def toggle_thought_process(self):
         if hasattr(self, 'thought_content'):
             if self.thought_content.isHidden():
@@ -389,15 +419,41 @@ class ChatWidget(QWidget):
     def clear_input(self):
         self.input_field.clear()
 
-from langchain_community.tools import ShellTool
+from .tools.shell_session import ShellSession
+
+_shell_session = None
+
+def gui_shell_session() -> ShellSession:
+    """Get the shell shared by commands run from the GUI, so sudo credentials are cached"""
+    global _shell_session
+    if _shell_session is None:
+        _shell_session = ShellSession()
+    return _shell_session
+
+def close_gui_shell_session() -> None:
+    """Stop the GUI's shell, if it was started, and remove its spill files"""
+    global _shell_session
+    if _shell_session is not None:
+        _shell_session.close()
+        _shell_session = None
+
+class SudoCheckWorker(QThread):
+    """Checks whether the GUI shell has cached sudo credentials, off the UI thread"""
+    checked = pyqtSignal(bool)
+    
+    def run(self):
+        try:
+            self.checked.emit(gui_shell_session().has_sudo_credentials())
+        except Exception:
+            self.checked.emit(False)
 
 class CommandExecutionWorker(QThread):
     finished = pyqtSignal(bool, str)
     
-    def __init__(self, command):
+    def __init__(self, command, executor=None):
         super().__init__()
         self.command = command
-        self.shell_tool = ShellTool()
+        self.executor = executor or gui_shell_session()
     
     def run(self):
         try:
@@ -407,14 +463,14 @@ class CommandExecutionWorker(QThread):
                 if len(parts) == 2:
                     sudo_password = parts[0].split("=", 1)[1]
                     command = parts[1]
-                    result = self.shell_tool.run(f"echo {sudo_password} | sudo -S {command}")
+                    result = self.executor.run(f"echo {sudo_password} | sudo -S {command}")
                 else:
                     result = "Invalid sudo command format"
                     self.finished.emit(False, result)
                     return
             else:
-                result = self.shell_tool.run(self.command)
-            self.finished.emit(True, result)
+                result = self.executor.run(self.command)
+            self.finished.emit(not result.timed_out, result.format())
         except Exception as e:
             self.finished.emit(False, str(e))
 
@@ -456,6 +512,8 @@ class ApiKeyDialog(QDialog):
 class AidaWorker(QThread):
     """Worker thread to handle AIDA processing"""
     finished = pyqtSignal(str, str)  # Response, Thought process
+    token = pyqtSignal(str)  # Streamed LLM text
+    step = pyqtSignal(str)  # Thought, action or observation
     
     def __init__(self, aida, query):
         super().__init__()
@@ -464,17 +522,24 @@ class AidaWorker(QThread):
     
     def run(self):
         try:
-            response = self.aida.process_query(self.query)
+            response = ""
+            thought_process = []
+            for event in self.aida.process_query_stream(self.query):
+                if event.type == TOKEN:
+                    self.token.emit(event.content)
+                elif event.type in (THOUGHT, ACTION, OBSERVATION):
+                    label = {
+                        THOUGHT: "Thought",
+                        ACTION: f"Action ({event.tool})",
+                        OBSERVATION: "Observation"
+                    }[event.type]
+                    text = f"{label}: {event.content}"
+                    thought_process.append(text)
+                    self.step.emit(text)
+                elif event.type in (FINAL_ANSWER, ERROR):
+                    response = event.content
             
-            # Extract thought process if available
-            thought_process = ""
-            if "Thought:" in response:
-                parts = response.split("Final Answer:", 1)
-                if len(parts) == 2:
-                    thought_process = parts[0].strip()
-                    response = parts[1].strip()
-            
-            self.finished.emit(response, thought_process)
+            self.finished.emit(response, "\n".join(thought_process))
         except Exception as e:
             self.finished.emit(f"Error: {str(e)}", "")
 
@@ -541,6 +606,11 @@ class MainWindow(QMainWindow):
         """Initialize AIDA with configuration"""
         try:
             config = AidaConfig()
+            # Record or replay the session's model calls (see cassette_mode in config.example.yaml)
+            config.cassette_path = os.getenv("AIDA_CASSETTE", config.cassette_path)
+            config.cassette_mode = os.getenv("AIDA_CASSETTE_MODE", config.cassette_mode)
+            if hasattr(self, 'aida'):
+                self.aida.close()
             self.aida = Aida(config=config, gui_validator=self.validate_command)
             print("AIDA initialized")
         except ValueError as e:
@@ -549,6 +619,13 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "Error", 
                                    f"Failed to initialize AIDA: {str(e)}")
     
+    def closeEvent(self, event):
+        """Close AIDA and the GUI shell with the window, which completes a cassette being recorded"""
+        if hasattr(self, 'aida'):
+            self.aida.close()
+        close_gui_shell_session()
+        super().closeEvent(event)
+    
     def show_api_key_dialog(self):
         """Show dialog to enter Gemini API key"""
         dialog = ApiKeyDialog(self)
@@ -588,6 +665,8 @@ class MainWindow(QMainWindow):
         
         # Process in background
         self.worker = AidaWorker(self.aida, message)
+        self.worker.token.connect(ai_bubble.append_text)
+        self.worker.step.connect(ai_bubble.append_thought_process)
         self.worker.finished.connect(lambda response, thought: self.handle_response(ai_bubble, response, thought))
         self.worker.start()
     
@@ -0,0 +1,150 @@
+import getpass
+import os
+import platform
+import shutil
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How long collected facts are reused before the host is inspected again
+HOST_FACTS_TTL = 3600.0
+
+# Checked in order, so distributions that ship several pick their native one
+PACKAGE_MANAGERS = ["apt", "dnf", "yum", "zypper", "pacman", "apk", "emerge", "brew"]
+
+_facts_lock = threading.Lock()
+_facts_cache: Optional[Tuple[float, "HostFacts"]] = None
+
+@dataclass
+class HostFacts:
+    """Facts about the host the agent manages, collected without running commands"""
+    hostname: str
+    os_name: str
+    os_id: str
+    kernel: str
+    arch: str
+    package_manager: Optional[str]
+    cpu_count: int
+    cpu_model: Optional[str]
+    memory_total_mb: Optional[int]
+    init_system: str
+    user: str
+    container: Optional[str]
+
+    def format(self) -> str:
+        """Format the facts as a compact block for the agent prompt"""
+        facts = [
+            f"os={self.os_name} ({self.os_id})",
+            f"kernel={self.kernel} {self.arch}",
+            f"package_manager={self.package_manager or 'none found'}",
+            f"init={self.init_system}",
+            f"cpus={self.cpu_count}" + (f" ({self.cpu_model})" if self.cpu_model else ""),
+        ]
+        if self.memory_total_mb is not None:
+            facts.append(f"memory={self.memory_total_mb / 1024:.1f} GiB")
+        facts.append(f"user={self.user}{' (root)' if self.user == 'root' else ''}")
+        facts.append(f"hostname={self.hostname}")
+        if self.container:
+            facts.append(f"container={self.container}")
+        return "Host facts: " + "; ".join(facts)
+
+def _read(path: str) -> str:
+    try:
+        with open(path, errors="replace") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+def parse_os_release(text: str) -> Dict[str, str]:
+    """Parse /etc/os-release into a dict of its KEY=value pairs"""
+    values = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition("=")
+        if sep and not key.startswith("#"):
+            values[key.strip()] = value.strip().strip('"\'')
+    return values
+
+def _meminfo_total_mb(text: str) -> Optional[int]:
+    for line in text.splitlines():
+        if line.startswith("MemTotal:"):
+            return int(line.split()[1]) // 1024
+    return None
+
+def _cpu_model(text: str) -> Optional[str]:
+    for line in text.splitlines():
+        if line.startswith(("model name", "Hardware", "cpu model")):
+            return " ".join(line.split(":", 1)[1].split())
+    return None
+
+def _init_system() -> str:
+    if os.path.isdir("/run/systemd/system"):
+        return "systemd"
+    comm = _read("/proc/1/comm").strip()
+    if comm == "init" and os.path.exists("/sbin/openrc"):
+        return "openrc"
+    return comm or "unknown"
+
+def _container() -> Optional[str]:
+    if os.path.exists("/.dockerenv"):
+        return "docker"
+    if os.path.exists("/run/.containerenv"):
+        return "podman"
+    if os.getenv("KUBERNETES_SERVICE_HOST"):
+        return "kubernetes"
+    cgroup = _read("/proc/1/cgroup")
+    for name in ("docker", "kubepods", "containerd", "lxc"):
+        if name in cgroup:
+            return name
+    return None
+
+def collect_host_facts() -> HostFacts:
+    """Inspect the host by reading files directly, without spawning processes"""
+    os_release = parse_os_release(_read("/etc/os-release") or _read("/usr/lib/os-release"))
+    uname = platform.uname()
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = str(os.getuid())
+    return HostFacts(
+        hostname=socket.gethostname(),
+        os_name=os_release.get("PRETTY_NAME") or os_release.get("NAME") or uname.system,
+        os_id=os_release.get("ID", uname.system.lower()),
+        kernel=uname.release,
+        arch=uname.machine,
+        package_manager=next((pm for pm in PACKAGE_MANAGERS if shutil.which(pm)), None),
+        cpu_count=os.cpu_count() or 1,
+        cpu_model=_cpu_model(_read("/proc/cpuinfo")),
+        memory_total_mb=_meminfo_total_mb(_read("/proc/meminfo")),
+        init_system=_init_system(),
+        user=user,
+        container=_container()
+    )
+
+def get_host_facts(ttl: float = HOST_FACTS_TTL) -> HostFacts:
+    """Get the host facts, collecting them at most once per `ttl` seconds per process
+
+    Args:
+        ttl: Seconds collected facts stay valid
+
+    Returns:
+        HostFacts
+    """
+    global _facts_cache
+    with _facts_lock:
+        if _facts_cache and time.monotonic() - _facts_cache[0] < ttl:
+            return _facts_cache[1]
+        facts = collect_host_facts()
+        logger.debug("Collected host facts: %s", facts)
+        _facts_cache = (time.monotonic(), facts)
+        return facts
+
+def clear_host_facts_cache() -> None:
+    """Forget the cached host facts, e.g. after installing a package manager"""
+    global _facts_cache
+    with _facts_lock:
+        _facts_cache = None
@@ -0,0 +1,260 @@
+import contextvars
+import re
+import shlex
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from langchain.agents import Tool
+from langchain_core.callbacks import BaseCallbackHandler
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tools that only read state, so repeating a call within one query gives the same answer
+READ_ONLY_TOOLS = {
+    "system_load", "cpu_usage", "memory_usage", "disk_usage", "open_ports", "logged_in_users",
+    "log_search", "read_output", "duckduckgo",
+}
+
+# Shell programs that only read state (with the exceptions below)
+READ_ONLY_COMMANDS = {
+    "cat", "head", "tail", "less", "grep", "egrep", "zgrep", "wc", "sort", "uniq", "cut", "tr", "column",
+    "ls", "stat", "file", "find", "du", "df", "tree", "realpath", "readlink", "pwd",
+    "ps", "pgrep", "top", "free", "uptime", "w", "who", "whoami", "id", "groups", "last", "lastlog",
+    "uname", "lsb_release", "lscpu", "lsblk", "lsusb", "lspci", "lsof", "nproc",
+    "ip", "ifconfig", "ss", "netstat", "ping", "dig", "nslookup", "host", "getent",
+    "date", "echo", "printf", "env", "printenv", "which", "type", "whereis", "command",
+    "journalctl", "dmesg", "vmstat", "iostat", "mpstat", "sar", "mount", "findmnt",
+    "dpkg", "rpm", "apt", "dnf", "yum", "pacman", "pip", "pip3", "systemctl", "service", "docker", "crontab",
+}
+
+# Arguments (or argument prefixes) that make an otherwise read-only program change state
+_WRITE_ARGS = {
+    "find": ("-delete", "-exec", "-ok", "-fprint"),
+    "sort": ("-o", "--output"),
+    "date": ("-s", "--set"),
+    "dmesg": ("-c", "-C", "--clear", "--read-clear"),
+    "journalctl": ("--vacuum", "--rotate", "--flush", "--sync"),
+    "dpkg": ("-i", "--install", "-r", "--remove", "-P", "--purge", "--configure", "--unpack"),
+    "rpm": ("-i", "-U", "-F", "-e", "--install", "--upgrade", "--freshen", "--erase"),
+}
+
+# Sub-command words that make a program change state, matched as whole arguments
+# (prefixes would make `ip addr` look like `ip add`)
+_WRITE_WORDS = {
+    "ip": {"add", "set", "del", "delete", "flush", "change", "replace", "append", "prepend", "restore"},
+}
+
+# Programs that also have writing sub-commands: with arguments, the first must be one of these
+_READ_ONLY_SUBCOMMANDS = {
+    "apt": {"list", "show", "search", "policy"},
+    "dnf": {"list", "info", "search", "repolist", "provides"},
+    "yum": {"list", "info", "search", "repolist", "provides"},
+    "pacman": {"-Q", "-Qi", "-Ql", "-Qs", "-Ss", "-Si"},
+    "pip": {"list", "show", "freeze", "--version"},
+    "pip3": {"list", "show", "freeze", "--version"},
+    "systemctl": {"status", "is-active", "is-enabled", "is-failed", "list-units", "list-unit-files",
+                  "list-timers", "show", "cat"},
+    "service": {"--status-all"},
+    "docker": {"ps", "images", "logs", "inspect", "stats", "version", "info", "top"},
+    "crontab": {"-l"},
+    "command": {"-v", "-V"},
+    # Only read state without arguments
+    "env": set(),
+    "mount": set(),
+}
+_SEPARATORS = {"|", "||", "&&", ";"}
+_HARMLESS_REDIRECTS = re.compile(r"\d?>>?\s*/dev/null(?![\w./-])|\d?>&\d")
+
+_current_memo: contextvars.ContextVar[Optional[Dict[Tuple[str, str], str]]] = contextvars.ContextVar(
+    "aida_tool_memo", default=None)
+
+class AgentLoopDetected(Exception):
+    """Raised inside an agent run that keeps repeating the same actions"""
+
+def normalize_action(tool: str, tool_input: Any) -> Tuple[str, str]:
+    """Key for a tool call: the tool name and its input with whitespace and quoting normalized"""
+    if isinstance(tool_input, dict) and len(tool_input) == 1:
+        # Tool calling passes single-input tools their input as {"tool_input": ...}
+        tool_input = next(iter(tool_input.values()))
+    text = str(tool_input).strip().strip("`").rstrip(";").strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+        text = text[1:-1]
+    return tool.strip().lower(), " ".join(text.split()).rstrip(";").strip()
+
+def is_read_only_command(command: str) -> bool:
+    """Return whether every part of a shell command only reads state
+
+    Conservative: redirections, substitutions, subshells, sudo and unknown
+    programs count as changing state.
+    """
+    if re.search(r"\$\(|`", command):
+        return False
+    # Discarding output or merging stderr into stdout writes nothing
+    command = _HARMLESS_REDIRECTS.sub(" ", command).replace("\n", ";")
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return False
+    parts, words = [], []
+    for token in tokens:
+        if token in _SEPARATORS:
+            parts.append(words)
+            words = []
+        elif set(token) <= set("<>&|;()"):
+            # Redirections, background jobs and subshells
+            return False
+        else:
+            words.append(token)
+    parts.append(words)
+
+    for words in parts:
+        if not words:
+            continue
+        program, args = words[0].rsplit("/", 1)[-1], words[1:]
+        if program not in READ_ONLY_COMMANDS:
+            return False
+        if any(arg.startswith(_WRITE_ARGS.get(program, ())) for arg in args):
+            return False
+        if not _WRITE_WORDS.get(program, set()).isdisjoint(args):
+            return False
+        if args and program in _READ_ONLY_SUBCOMMANDS and args[0] not in _READ_ONLY_SUBCOMMANDS[program]:
+            return False
+    return True
+
+class ToolMemo:
+    """Per-run memo table in front of the agent's tools
+
+    Inside `with memo.run():` a repeated read-only call (same tool, same
+    normalized input) returns the earlier observation without running the tool
+    again. A call that may change state clears the table, since later reads
+    could then differ (e.g. `ls` after `cd` in a persistent shell). Outside a
+    run every call goes straight to the tool.
+    """
+
+    REPEAT_NOTE = "[This exact action already ran in this query; repeating its result instead of running it again]"
+
+    def __init__(self, read_only_tools=READ_ONLY_TOOLS, shell_tools=("shell",)):
+        """Initialize the memo
+
+        Args:
+            read_only_tools: Names of tools whose calls never change state
+            shell_tools: Names of tools taking shell commands, memoized when is_read_only_command says so
+        """
+        self.read_only_tools = set(read_only_tools)
+        self.shell_tools = set(shell_tools)
+        self.hits = 0
+
+    @contextmanager
+    def run(self) -> Iterator[None]:
+        """Scope a fresh memo table to one agent run (thread and asyncio task safe)"""
+        token = _current_memo.set({})
+        try:
+            yield
+        finally:
+            _current_memo.reset(token)
+
+    def is_read_only(self, tool: str, tool_input: Any) -> bool:
+        """Return whether a tool call only reads state"""
+        if tool in self.read_only_tools:
+            return True
+        return tool in self.shell_tools and is_read_only_command(str(tool_input))
+
+    def lookup(self, tool: str, tool_input: Any) -> Optional[str]:
+        """Return the memoized observation for a call, or None to run the tool"""
+        table = _current_memo.get()
+        if table is None:
+            return None
+        key = normalize_action(tool, tool_input)
+        if key in table:
+            self.hits += 1
+            logger.info("Reusing the result of %s(%s) from earlier in this run", *key)
+            return f"{self.REPEAT_NOTE}\n{table[key]}"
+        return None
+
+    def store(self, tool: str, tool_input: Any, observation: Any) -> None:
+        """Remember a read-only call's observation, or clear the table after a call that may change state"""
+        table = _current_memo.get()
+        if table is None:
+            return
+        if self.is_read_only(tool, tool_input):
+            table[normalize_action(tool, tool_input)] = observation
+        else:
+            table.clear()
+
+    def wrap(self, tool: Tool) -> Tool:
+        """Wrap a tool so its calls go through the memo"""
+        func, coroutine = tool.func, tool.coroutine
+
+        def tool_input(args, kwargs):
+            return args[0] if args else " ".join(str(value) for value in kwargs.values())
+
+        def run(*args, **kwargs):
+            cached = self.lookup(tool.name, tool_input(args, kwargs))
+            if cached is not None:
+                return cached
+            observation = func(*args, **kwargs)
+            self.store(tool.name, tool_input(args, kwargs), observation)
+            return observation
+
+        async def arun(*args, **kwargs):
+            cached = self.lookup(tool.name, tool_input(args, kwargs))
+            if cached is not None:
+                return cached
+            observation = await coroutine(*args, **kwargs)
+            self.store(tool.name, tool_input(args, kwargs), observation)
+            return observation
+
+        return Tool(
+            name=tool.name,
+            func=run,
+            coroutine=arun if coroutine else None,
+            description=tool.description
+        )
+
+class LoopDetector(BaseCallbackHandler):
+    """Callback handler that stops an agent run caught in a loop
+
+    Raises AgentLoopDetected before an action would be taken for more than
+    `max_repeats` times in the run, or before one that completes a cycle of two or three
+    actions repeated back to back (A B A B, A B C A B C). The steps taken so far
+    are kept in `steps` so the caller can still produce a final answer.
+    """
+
+    raise_error = True
+
+    def __init__(self, max_repeats: int = 3, max_cycle: int = 3):
+        """Initialize the detector
+
+        Args:
+            max_repeats: Times the same action may be taken; the run is stopped at the next one
+            max_cycle: Longest cycle of distinct actions detected
+        """
+        self.max_repeats = max_repeats
+        self.max_cycle = max_cycle
+        self.actions: List[Tuple[str, str]] = []
+        self.steps: List[Tuple[Any, str]] = []
+        self._counts: Dict[Tuple[str, str], int] = {}
+
+    def _cycle_length(self) -> Optional[int]:
+        for length in range(2, self.max_cycle + 1):
+            if len(self.actions) >= 2 * length and self.actions[-length:] == self.actions[-2 * length:-length]:
+                if len(set(self.actions[-length:])) == length:
+                    return length
+        return None
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        key = normalize_action(action.tool, action.tool_input)
+        self.actions.append(key)
+        self._counts[key] = self._counts.get(key, 0) + 1
+        if self._counts[key] > self.max_repeats:
+            raise AgentLoopDetected(f"the action {key[0]}({key[1]}) was repeated {self._counts[key]} times")
+        length = self._cycle_length()
+        if length is not None:
+            raise AgentLoopDetected(f"the last {length} actions were repeated in the same order")
+        self.steps.append((action, ""))
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        if self.steps and not self.steps[-1][1]:
+            self.steps[-1] = (self.steps[-1][0], str(output))
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import Optional, List
 from .providers import LLMProviderFactory
 from .config import AidaConfig
+from .relevance import FastRelevanceChecker, RelevanceDecision
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -13,9 +14,14 @@ class PreprocessorResult:
     is_relevant: bool
     query: str
     response: Optional[str] = None
+    source: str = "llm"  # Tier that decided: "cache", "rules", "classifier" or "llm"
 
 class QueryPreprocessor:
-    """Preprocessor for queries to determine if they're relevant to server management"""
+    """Preprocessor for queries to determine if they're relevant to server management
+    
+    Clear-cut queries are decided locally by cached decisions, keyword rules and
+    a small linear classifier. Only ambiguous queries are sent to the LLM.
+    """
     
     def __init__(self, config: AidaConfig, conversation):
         """Initialize the preprocessor with a config and conversation manager
@@ -29,29 +35,24 @@ class QueryPreprocessor:
         self.llm = LLMProviderFactory.get_provider(
             provider_type=config.preprocessor_provider,
             model=config.preprocessor_model,
-            temperature=0
+            temperature=0,
+            pooled=config.pool_providers,
+            **config.provider_options(config.preprocessor_provider)
         )
+        self.fast_path = FastRelevanceChecker()
     
-    def process_query(self, query: str) -> PreprocessorResult:
-        """Process a query to determine if it's relevant to server management
-        
-        Args:
-            query: The query to process
-            
-        Returns:
-            PreprocessorResult containing relevance check and optional response
-        """
-        if not query:
-            return PreprocessorResult(
-                is_relevant=False,
-                query=query,
-                response="Empty query. Please ask a question."
-            )
-            
+    def _conversation_state(self) -> str:
+        """The summary and the user and assistant messages in the window, which follow-up verdicts depend on"""
+        messages = [f"{message.role}: {message.content}" for message in self.conversation.messages
+                    if message.role != "system"]
+        return "\n".join([self.conversation.summary] + messages)
+    
+    def _build_prompt(self, query: str) -> str:
+        """Build the relevance check prompt for a query using the conversation context"""
         # Get conversation context from the shared conversation manager
-        conversation_context = self.conversation.get_recent_messages()
+        conversation_context = self.conversation.get_recent_messages(query=query)
             
-        prompt = f"""You are a query preprocessor for a server management AI assistant.
+        return f"""You are a query preprocessor for a server management AI assistant.
         Your job is to determine if a query is related to server management or not.
         
 
@@ -83,28 +84,109 @@ class QueryPreprocessor:
         
         Current query: {query}
         Response: """
+    
+    def _parse_response(self, query: str, response: str) -> PreprocessorResult:
+        """Turn the LLM's RELEVANT/NOT RELEVANT reply into a PreprocessorResult"""
+        logger.debug(f"LLM Response: {response}")
+        
+        is_relevant = response.strip().startswith("RELEVANT:")
+        reason = response.split(":", 1)[1].strip() if ":" in response else "No reason provided"
+        
+        # Add preprocessor result to conversation history
+        self.conversation.add_preprocessor_result(is_relevant, reason)
+        self.fast_path.remember(query, RelevanceDecision(is_relevant, reason, "llm"), self._conversation_state())
+        return self._result(query, RelevanceDecision(is_relevant, reason, "llm"))
+    
+    def _result(self, query: str, decision: RelevanceDecision) -> PreprocessorResult:
+        if decision.is_relevant:
+            return PreprocessorResult(
+                is_relevant=True,
+                query=query,
+                source=decision.source
+            )
+        else:
+            return PreprocessorResult(
+                is_relevant=False,
+                query=query,
+                response=f"This query is not related to server management: {decision.reason}",
+                source=decision.source
+            )
+    
+    def check_locally(self, query: str) -> Optional[PreprocessorResult]:
+        """Decide relevance without the LLM if the query is clear-cut
+        
+        Args:
+            query: The query to check
+            
+        Returns:
+            PreprocessorResult, or None if the query needs the LLM
+        """
+        decision = self.fast_path.check(query, self._conversation_state())
+        if decision is None:
+            return None
+        logger.debug(f"Relevance decided by {decision.source}: {decision.reason}")
+        return self._result(query, decision)
+    
+    def process_query(self, query: str) -> PreprocessorResult:
+        """Process a query to determine if it's relevant to server management
+        
+        Args:
+            query: The query to process
+            
+        Returns:
+            PreprocessorResult containing relevance check and optional response
+        """
+        if not query:
+            return PreprocessorResult(
+                is_relevant=False,
+                query=query,
+                response="Empty query. Please ask a question."
+            )
+        
+        local_result = self.check_locally(query)
+        if local_result is not None:
+            return local_result
+            
+        prompt = self._build_prompt(query)
         print("From Preprocessor: ", prompt)
         try:
             response = self.llm.invoke(prompt).content
-            logger.debug(f"LLM Response: {response}")
-            
-            is_relevant = response.strip().startswith("RELEVANT:")
-            reason = response.split(":", 1)[1].strip() if ":" in response else "No reason provided"
+            return self._parse_response(query, response)
+                
+        except Exception as e:
+            logger.error(f"Error processing query: {str(e)}")
+            return PreprocessorResult(
+                is_relevant=False,
+                query=query,
+                response=f"Error processing query: {str(e)}"
+            )
+    
+    async def aprocess_query(self, query: str) -> PreprocessorResult:
+        """Asynchronously process a query to determine if it's relevant to server management
+        
+        Args:
+            query: The query to process
             
-            # Add preprocessor result to conversation history
-            self.conversation.add_preprocessor_result(is_relevant, reason)
+        Returns:
+            PreprocessorResult containing relevance check and optional response
+        """
+        if not query:
+            return PreprocessorResult(
+                is_relevant=False,
+                query=query,
+                response="Empty query. Please ask a question."
+            )
+        
+        local_result = self.check_locally(query)
+        if local_result is not None:
+            return local_result
             
-            if is_relevant:
-                return PreprocessorResult(
-                    is_relevant=True,
-                    query=query
-                )
-            else:
-                return PreprocessorResult(
-                    is_relevant=False,
-                    query=query,
-                    response=f"This query is not related to server management: {reason}"
-                )
+        # Summarize evicted history without blocking the event loop before the prompt reads it
+        await self.conversation.acompact()
+        prompt = self._build_prompt(query)
+        try:
+            response = (await self.llm.ainvoke(prompt)).content
+            return self._parse_response(query, response)
                 
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}")
@@ -112,4 +194,44 @@ class QueryPreprocessor:
                 is_relevant=False,
                 query=query,
                 response=f"Error processing query: {str(e)}"
-            )
\ No newline at end of file
+            )
+    
+    def _summary_prompt(self, summary: str, messages: list) -> str:
+        """Build the prompt asking the LLM to fold messages into the running summary"""
+        transcript = "\n".join(f"{message.role}: {message.content}" for message in messages)
+        prompt = f"""Update the summary of a conversation between a user and a server management assistant.
+        Keep facts that may matter for follow-up questions: hosts, users, services, commands run and their results.
+        Answer with the updated summary only, in at most 120 words.
+        
+        Current summary:
+        {summary or "(empty)"}
+        
+        New messages:
+        {transcript}
+        
+        Updated summary: """
+        return prompt
+    
+    def summarize_history(self, summary: str, messages: list) -> str:
+        """Fold messages that left the conversation window into the running summary
+        
+        Args:
+            summary: The current summary, possibly empty
+            messages: Messages (with role and content) to add to the summary
+            
+        Returns:
+            The updated summary
+        """
+        return self.llm.invoke(self._summary_prompt(summary, messages)).content
+    
+    async def asummarize_history(self, summary: str, messages: list) -> str:
+        """Asynchronously fold messages that left the conversation window into the running summary
+        
+        Args:
+            summary: The current summary, possibly empty
+            messages: Messages (with role and content) to add to the summary
+            
+        Returns:
+            The updated summary
+        """
+        return (await self.llm.ainvoke(self._summary_prompt(summary, messages))).content
@@ -1,11 +1,32 @@
 from .base import LLMProvider
 from .factory import LLMProviderFactory
-from .ollama import OllamaProvider
-from .gemini import GeminiProvider
 
 __all__ = [
     "LLMProvider",
     "LLMProviderFactory",
     "OllamaProvider",
-    "GeminiProvider"
-] 
\ No newline at end of file
+    "GeminiProvider",
+    "ScriptedProvider",
+    "ResponseCache",
+    "CachedProvider",
+    "Cassette",
+    "CassetteProvider"
+]
+
+# Provider SDKs are heavy, so provider classes are imported on first access
+_lazy_imports = {
+    "OllamaProvider": ".ollama",
+    "GeminiProvider": ".gemini",
+    "ScriptedProvider": ".scripted",
+    "ResponseCache": ".cache",
+    "CachedProvider": ".cache",
+    "Cassette": ".cassette",
+    "CassetteProvider": ".cassette"
+}
+
+def __getattr__(name):
+    if name in _lazy_imports:
+        import importlib
+        module = importlib.import_module(_lazy_imports[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
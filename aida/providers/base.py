@@ -1,9 +1,34 @@
+import asyncio
+import logging
 from abc import ABC, abstractmethod
-from typing import Optional, Any
+from typing import Optional, Any, Awaitable, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+def close_async_client(aclose: Callable[[], Awaitable[Any]]) -> None:
+    """Run an async client's close coroutine from synchronous code
+
+    On a thread with a running event loop the close is scheduled on that loop;
+    otherwise it runs to completion on a new one.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    try:
+        if loop is not None:
+            loop.create_task(aclose())
+        else:
+            asyncio.run(aclose())
+    except Exception as e:
+        logger.debug("Failed to close an async client: %s", str(e))
 
 class LLMProvider(ABC):
     """Base class for LLM providers"""
     
+    # Prompt cache measurements, for providers whose server reuses prompt prefixes
+    prompt_stats = None
+    
     @abstractmethod
     def __init__(self, model: str, temperature: float = 0):
         """Initialize the LLM provider with a model and temperature"""
@@ -14,6 +39,16 @@ class LLMProvider(ABC):
         """Invoke the LLM with a prompt and return the response"""
         pass
     
+    @abstractmethod
+    async def ainvoke(self, prompt: str) -> Any:
+        """Asynchronously invoke the LLM with a prompt and return the response"""
+        pass
+    
+    @abstractmethod
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Invoke the LLM with a prompt and yield the response text as it is generated"""
+        pass
+    
     @abstractmethod
     def validate_model(self, model: str) -> bool:
         """Validate if the specified model is available"""
@@ -22,4 +57,12 @@ class LLMProvider(ABC):
     @abstractmethod
     def is_strong(self) -> bool:
         """Return whether this model is considered strong enough to skip validation steps"""
-        pass 
\ No newline at end of file
+        pass
+    
+    def close(self) -> None:
+        """Release resources held by the provider. The provider must not be used afterwards"""
+        pass
+    
+    def supports_tool_calling(self) -> bool:
+        """Return whether the model takes tool definitions and returns structured tool calls"""
+        return False
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+from langchain_core.messages import AIMessage
+from .base import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """Two-tier cache for LLM responses: an in-memory LRU and an optional SQLite file
+
+    Entries expire after `ttl` seconds. Each tier holds at most `max_entries`
+    responses and evicts the least recently used ones beyond that.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: Optional[float] = 24 * 60 * 60,
+                 path: Optional[Union[str, Path]] = None):
+        """Initialize the cache
+
+        Args:
+            max_entries: Maximum number of responses kept in each tier
+            ttl: Seconds before an entry expires. None means entries never expire
+            path: SQLite file for the persistent tier. None keeps the cache in memory only
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            Path(path).expanduser().parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(Path(path).expanduser()), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: float, prompt: str) -> str:
+        """Build the cache key for a prompt sent to a provider and model"""
+        raw = json.dumps([provider, model, temperature, prompt])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = row
+                    if not self._expired(created, now):
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._put_memory(key, created, value)
+                        self.hits += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response in every tier"""
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed DESC, rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self._db.commit()
+
+    def _put_memory(self, key: str, created: float, value: str) -> None:
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self) -> None:
+        """Close the SQLite tier"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the number of in-memory entries"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._memory)}
+
+class CachedProvider(LLMProvider):
+    """Provider wrapper that answers repeated prompts from a ResponseCache
+
+    Only direct prompt calls (invoke, ainvoke, stream) are cached. The wrapped
+    LangChain model is exposed unchanged as `llm`, so agent runs, whose prompts
+    contain live tool output, always go to the model.
+    """
+
+    def __init__(self, provider: LLMProvider, cache: ResponseCache, provider_type: str):
+        """Wrap a provider with a cache
+
+        Args:
+            provider: The provider to wrap
+            cache: ResponseCache shared between providers
+            provider_type: Provider name used as part of the cache key
+        """
+        self.provider = provider
+        self.cache = cache
+        self.provider_type = provider_type
+        self.model = provider.model
+        self.temperature = provider.temperature
+        self.llm = provider.llm
+        self.prompt_stats = provider.prompt_stats
+
+    def _key(self, prompt: str) -> str:
+        return self.cache.make_key(self.provider_type, self.model, self.temperature, prompt)
+
+    def invoke(self, prompt: str) -> Any:
+        """Return the cached response for a prompt, invoking the provider on a miss"""
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        response = self.provider.invoke(prompt)
+        self.cache.set(key, response.content)
+        return response
+
+    async def ainvoke(self, prompt: str) -> Any:
+        """Asynchronously return the cached response for a prompt, invoking the provider on a miss"""
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        response = await self.provider.ainvoke(prompt)
+        self.cache.set(key, response.content)
+        return response
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the cached response in one chunk, or stream from the provider and cache the result"""
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        chunks = []
+        for chunk in self.provider.stream(prompt):
+            chunks.append(chunk)
+            yield chunk
+        self.cache.set(key, "".join(chunks))
+
+    def close(self) -> None:
+        """Close the wrapped provider. The shared cache stays open"""
+        self.provider.close()
+    
+    def validate_model(self, model: str) -> bool:
+        """Validate the model with the wrapped provider"""
+        return self.provider.validate_model(model)
+
+    def is_strong(self) -> bool:
+        """Return whether the wrapped model is considered strong"""
+        return self.provider.is_strong()
+
+    def supports_tool_calling(self) -> bool:
+        """Return whether the wrapped model supports structured tool calls"""
+        return self.provider.supports_tool_calling()
@@ -0,0 +1,378 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from .base import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+CASSETTE_MODES = [RECORD, REPLAY]
+
+class CassetteMiss(LookupError):
+    """Raised when a replayed model call has no recorded response left"""
+
+def message_key(messages: Sequence[BaseMessage]) -> str:
+    """Key of a model request: a short hash of its messages
+
+    Tool call ids are left out, so a request matches its recording even when the
+    server numbered the calls differently.
+    """
+    normalized = [
+        [message.type, message.content,
+         [[call["name"], call["args"]] for call in getattr(message, "tool_calls", None) or []]]
+        for message in messages
+    ]
+    raw = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def _read_text(path: Path) -> str:
+    """Read a cassette file, up to where it was cut off if it was never closed
+
+    A gzip stream only gets its trailer when it is closed, and gzip.open refuses
+    a stream without one. Every recorded entry is flushed, so decompressing the
+    raw stream recovers all of them.
+    """
+    data = path.read_bytes()
+    if path.suffix != ".gz":
+        return data.decode("utf-8", errors="replace")
+    text = b""
+    while data:
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        try:
+            text += decompressor.decompress(data)
+        except zlib.error:
+            break
+        data = decompressor.unused_data if decompressor.eof else b""
+    return text.decode("utf-8", errors="replace")
+
+class Cassette:
+    """JSON Lines file of model requests and responses, recorded once and replayed offline
+
+    Every line is one entry: a provider that was created, a fact about its model
+    (e.g. is_strong), or a model call with the key of its request, the response
+    message, its duration in milliseconds and, for streamed calls, the chunks
+    with their offsets. Prompts are stored as keys only; a path ending in .gz is
+    gzip-compressed.
+
+    On replay a request gets the recorded response with the same key, in the
+    order they were recorded. A request that was not recorded verbatim (e.g. its
+    prompt holds a different time or host) gets the next unused response of the
+    same provider and model, unless the cassette is strict.
+    """
+
+    def __init__(self, path: str, mode: str, timing: bool = False, strict: bool = False):
+        """Open a cassette
+
+        Args:
+            path: Cassette file
+            mode: "record" (overwrites the file) or "replay"
+            timing: On replay, take as long as the recorded calls did
+            strict: On replay, raise CassetteMiss for requests that were not recorded verbatim
+
+        Raises:
+            ValueError: If the mode is unknown
+            FileNotFoundError: If a cassette to replay does not exist
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}'. Available modes: {CASSETTE_MODES}")
+        self.path = Path(path).expanduser()
+        self.mode = mode
+        self.timing = timing
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._file = None
+        self._entries: List[dict] = []
+        self._by_key: Dict[Tuple[str, str], Deque[int]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._used = set()
+        if mode == RECORD:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = _open(self.path, "w")
+        else:
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def _load(self) -> None:
+        lines = [line for line in _read_text(self.path).splitlines() if line.strip()]
+        for number, line in enumerate(lines, 1):
+            try:
+                self._entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                if number < len(lines):
+                    raise
+                # The recording was interrupted while this entry was being written
+                logger.warning("Ignoring the truncated last entry of %s", self.path)
+        for i, entry in enumerate(self._entries):
+            if entry["type"] == "call":
+                self._by_key.setdefault((entry["source"], entry["key"]), deque()).append(i)
+
+    def record(self, entry: dict) -> None:
+        """Append an entry to a cassette being recorded"""
+        line = json.dumps(entry, separators=(",", ":"), default=str)
+        with self._lock:
+            if self._file is not None:
+                # Written as they happen, so an interrupted session keeps its calls
+                self._file.write(line + "\n")
+                self._file.flush()
+
+    def sources(self) -> List[str]:
+        """Providers ("provider:model") with a recording"""
+        return sorted({entry["source"] for entry in self._entries if entry["type"] == "provider"})
+
+    def fact(self, source: str, name: str, default: Any = None) -> Any:
+        """The last recorded value of a fact about a provider's model"""
+        for entry in reversed(self._entries):
+            if entry["type"] == "fact" and entry["source"] == source and entry["name"] == name:
+                return entry["value"]
+        return default
+
+    def take(self, source: str, key: str) -> dict:
+        """Get the recorded call answering a request
+
+        Raises:
+            CassetteMiss: If no recorded call is left for the request
+        """
+        with self._lock:
+            matches = self._by_key.get((source, key), deque())
+            while matches:
+                i = matches.popleft()
+                if i not in self._used:
+                    self._used.add(i)
+                    return self._entries[i]
+            if not self.strict:
+                cursor = self._cursor.get(source, 0)
+                while cursor < len(self._entries):
+                    entry = self._entries[cursor]
+                    cursor += 1
+                    if entry["type"] == "call" and entry["source"] == source and cursor - 1 not in self._used:
+                        self._used.add(cursor - 1)
+                        self._cursor[source] = cursor
+                        logger.warning("Request to %s was not recorded verbatim, replaying the next recorded call", source)
+                        return entry
+                self._cursor[source] = cursor
+        raise CassetteMiss(f"No recorded response left for a request to {source} in {self.path}")
+
+    def close(self) -> None:
+        """Close the file of a cassette being recorded"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def _response(generation: Any) -> dict:
+    message = getattr(generation, "message", None)
+    if message is None:
+        return {"content": generation.text}
+    response = {"content": message.content}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        response["tool_calls"] = [{"name": call["name"], "args": call["args"], "id": call.get("id")}
+                                  for call in tool_calls]
+    return response
+
+class CassetteRecorder(BaseCallbackHandler):
+    """Callback handler recording every call of the model it is attached to"""
+
+    def __init__(self, cassette: Cassette, source: str):
+        self.cassette = cassette
+        self.source = source
+        self._lock = threading.Lock()
+        self._pending: Dict[Any, Tuple[List[str], float, List[Tuple[str, float]]]] = {}
+
+    def _started(self, run_id, keys: List[str]) -> None:
+        with self._lock:
+            self._pending[run_id] = (keys, time.perf_counter(), [])
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._started(run_id, [message_key(batch) for batch in messages])
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._started(run_id, [message_key([HumanMessage(content=prompt)]) for prompt in prompts])
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs) -> None:
+        with self._lock:
+            pending = self._pending.get(run_id)
+            if pending is not None:
+                pending[2].append((token, time.perf_counter() - pending[1]))
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        keys, started, chunks = pending
+        elapsed = round((time.perf_counter() - started) * 1000)
+        for key, generations in zip(keys, response.generations):
+            entry = {"source": self.source, "type": "call", "key": key,
+                     "response": _response(generations[0]), "ms": elapsed}
+            if chunks and len(keys) == 1:
+                entry["chunks"] = [token for token, _ in chunks]
+                entry["offsets"] = [round(offset * 1000) for _, offset in chunks]
+            self.cassette.record(entry)
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        with self._lock:
+            self._pending.pop(run_id, None)
+
+def _message(response: dict) -> AIMessage:
+    return AIMessage(content=response["content"], tool_calls=[
+        {"name": call["name"], "args": call["args"], "id": call.get("id"), "type": "tool_call"}
+        for call in response.get("tool_calls", [])
+    ])
+
+class CassetteChatModel(BaseChatModel):
+    """LangChain chat model answering from a cassette instead of a model server"""
+
+    cassette: Any
+    source: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "CassetteChatModel":
+        # The recorded responses already hold the tool calls
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        entry = self.cassette.take(self.source, message_key(messages))
+        if self.cassette.timing:
+            time.sleep(entry.get("ms", 0) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=_message(entry["response"]))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        entry = self.cassette.take(self.source, message_key(messages))
+        if self.cassette.timing:
+            await asyncio.sleep(entry.get("ms", 0) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=_message(entry["response"]))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        entry = self.cassette.take(self.source, message_key(messages))
+        response = entry["response"]
+        chunks = entry.get("chunks") or [response["content"]]
+        offsets = entry.get("offsets") or [entry.get("ms", 0)]
+        started = time.perf_counter()
+        for chunk, offset in zip(chunks, offsets):
+            if self.cassette.timing:
+                time.sleep(max(0.0, offset / 1000 - (time.perf_counter() - started)))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+        if response.get("tool_calls"):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call.get("id"), "index": i}
+                for i, call in enumerate(response["tool_calls"])
+            ]))
+
+class CassetteProvider(LLMProvider):
+    """Provider wrapper that records a provider's model calls to a cassette, or replays them
+
+    Recording attaches a CassetteRecorder to the wrapped provider's LangChain
+    model, so agent steps are recorded along with invoke, ainvoke and stream.
+    Replaying needs no wrapped provider and no network: `llm` is a
+    CassetteChatModel answering from the cassette.
+    """
+
+    def __init__(self, cassette: Cassette, provider_type: str, model: str, temperature: float = 0,
+                 provider: Optional[LLMProvider] = None):
+        """Wrap a provider for recording, or stand in for one on replay
+
+        Args:
+            cassette: Cassette to record to or replay from
+            provider_type: Provider name, e.g. "ollama"
+            model: Name of the model
+            temperature: Temperature parameter for the model
+            provider: Provider to record. None replays
+
+        Raises:
+            ValueError: On replay, if the cassette has no recording of this provider and model
+        """
+        self.cassette = cassette
+        self.provider = provider
+        self.model = model
+        self.temperature = temperature
+        self.source = f"{provider_type}:{model}"
+        self._facts: Dict[str, Any] = {}
+        if provider is None:
+            if self.source not in cassette.sources():
+                raise ValueError(f"Cassette {cassette.path} has no recording of '{self.source}'. "
+                                 f"Recorded: {cassette.sources()}")
+            self.llm = CassetteChatModel(cassette=cassette, source=self.source)
+        else:
+            self.llm = provider.llm
+            self.llm.callbacks = [*(self.llm.callbacks or []), CassetteRecorder(cassette, self.source)]
+            self.prompt_stats = provider.prompt_stats
+            cassette.record({"source": self.source, "type": "provider"})
+
+    def _fact(self, name: str) -> Any:
+        """Answer a question about the model from the cassette, or ask the wrapped provider and record it"""
+        if self.provider is None:
+            return self.cassette.fact(self.source, name, False)
+        if name not in self._facts:
+            self._facts[name] = getattr(self.provider, name)()
+            self.cassette.record({"source": self.source, "type": "fact", "name": name, "value": self._facts[name]})
+        return self._facts[name]
+
+    def invoke(self, prompt: str) -> Any:
+        """Invoke the model; the call is recorded or replayed"""
+        if self.provider is None:
+            return self.llm.invoke(prompt)
+        return self.provider.invoke(prompt)
+
+    async def ainvoke(self, prompt: str) -> Any:
+        """Asynchronously invoke the model; the call is recorded or replayed"""
+        if self.provider is None:
+            return await self.llm.ainvoke(prompt)
+        return await self.provider.ainvoke(prompt)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Stream the model's response; the chunks are recorded or replayed"""
+        if self.provider is not None:
+            yield from self.provider.stream(prompt)
+            return
+        for chunk in self.llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
+
+    def close(self) -> None:
+        """Close the wrapped provider. The shared cassette stays open"""
+        if self.provider is not None:
+            self.provider.close()
+
+    def validate_model(self, model: str) -> bool:
+        """Validate the model with the wrapped provider; on replay, every recorded model is valid"""
+        if self.provider is None:
+            return f"{self.source.split(':', 1)[0]}:{model}" in self.cassette.sources()
+        return self.provider.validate_model(model)
+
+    def is_strong(self) -> bool:
+        """Return whether the model is considered strong, as recorded"""
+        return self._fact("is_strong")
+
+    def supports_tool_calling(self) -> bool:
+        """Return whether the model supports structured tool calls, as recorded"""
+        return self._fact("supports_tool_calling")
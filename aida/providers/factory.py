@@ -1,38 +1,189 @@
-from typing import Type
+import importlib
+import threading
+from pathlib import Path
+from typing import Dict, Type, Optional, Union, TYPE_CHECKING
 from .base import LLMProvider
-from .ollama import OllamaProvider
-from .gemini import GeminiProvider
+
+if TYPE_CHECKING:
+    from .cache import ResponseCache
+    from .cassette import Cassette
 
 class LLMProviderFactory:
-    """Factory class for creating LLM providers"""
+    """Factory class for creating LLM providers
+    
+    Providers are registered by import path and only imported the first time
+    they are requested, so an Ollama-only session never loads the Gemini SDK.
+    """
     
     _providers = {
-        "ollama": OllamaProvider,
-        "gemini": GeminiProvider
+        "ollama": "aida.providers.ollama:OllamaProvider",
+        "gemini": "aida.providers.gemini:GeminiProvider",
+        # Offline replay of scripted transcripts, for benchmarks and tests
+        "scripted": "aida.providers.scripted:ScriptedProvider"
     }
     
+    _cache: Optional["ResponseCache"] = None
+    _cassette: Optional["Cassette"] = None
+    
+    # Shared provider instances handed out in pooled mode
+    _pool: Dict[tuple, LLMProvider] = {}
+    _pool_lock = threading.Lock()
+    
+    @classmethod
+    def register_provider(cls, provider_type: str, provider: Union[str, Type[LLMProvider]]) -> None:
+        """Register a provider class, or a lazy "module:Class" import path, under a name
+        
+        Args:
+            provider_type: Name used with get_provider
+            provider: LLMProvider subclass or "package.module:ClassName" string
+        """
+        cls._providers[provider_type.lower()] = provider
+    
+    @classmethod
+    def _load_provider_class(cls, provider_type: str) -> Optional[Type[LLMProvider]]:
+        """Resolve a registered provider to its class, importing it on first use"""
+        provider = cls._providers.get(provider_type)
+        if isinstance(provider, str):
+            module_name, class_name = provider.split(":")
+            provider = getattr(importlib.import_module(module_name), class_name)
+            cls._providers[provider_type] = provider
+        return provider
+    
     @classmethod
-    def get_provider(cls, provider_type: str, model: str, temperature: float = 0) -> LLMProvider:
+    def get_provider(cls, provider_type: str, model: str, temperature: float = 0,
+                     pooled: bool = False, **options) -> LLMProvider:
         """Get an instance of the specified LLM provider
         
         Args:
             provider_type: Type of provider ("ollama" or "gemini")
             model: Name of the model to use
             temperature: Temperature parameter for the model
+            pooled: Return a shared instance for this provider, model, temperature
+                and options instead of creating a new one. Shared instances live
+                until close_pool is called
+            **options: Extra provider options, e.g. defer_validation=True
             
         Returns:
-            An instance of the specified LLM provider
+            An instance of the specified LLM provider, wrapped in a CachedProvider
+            when the response cache is enabled, or in a CassetteProvider when a
+            cassette is in use
             
         Raises:
             ValueError: If the provider type is not supported
         """
-        provider_class = cls._providers.get(provider_type.lower())
+        if not pooled:
+            return cls._create_provider(provider_type, model, temperature, **options)
+        
+        key = (provider_type.lower(), model, temperature,
+               tuple(sorted(options.items())), cls._cache is not None, cls._cassette is not None)
+        with cls._pool_lock:
+            provider = cls._pool.get(key)
+            if provider is None:
+                provider = cls._create_provider(provider_type, model, temperature, **options)
+                cls._pool[key] = provider
+            return provider
+    
+    @classmethod
+    def _create_provider(cls, provider_type: str, model: str, temperature: float, **options) -> LLMProvider:
+        """Create a new provider instance, wrapped in the response cache or cassette if enabled"""
+        if cls._cassette is not None and cls._cassette.replaying:
+            from .cassette import CassetteProvider
+            # A replayed provider never loads the real one, so it works without its server or SDK
+            return CassetteProvider(cls._cassette, provider_type.lower(), model, temperature)
+        
+        provider_class = cls._load_provider_class(provider_type.lower())
         if not provider_class:
             raise ValueError(f"Unsupported provider type: {provider_type}. Available providers: {list(cls._providers.keys())}")
+        
+        if cls._cassette is not None:
+            from .cassette import CassetteProvider
+            # Recorded calls bypass the response cache, so a replay sees every call
+            provider = provider_class(model=model, temperature=temperature, **options)
+            return CassetteProvider(cls._cassette, provider_type.lower(), model, temperature, provider=provider)
+            
+        provider = provider_class(model=model, temperature=temperature, **options)
+        if cls._cache is not None:
+            from .cache import CachedProvider
+            return CachedProvider(provider, cls._cache, provider_type.lower())
+        return provider
+    
+    @classmethod
+    def close_pool(cls) -> None:
+        """Close and forget every pooled provider instance"""
+        with cls._pool_lock:
+            providers = list(cls._pool.values())
+            cls._pool.clear()
+        for provider in providers:
+            provider.close()
+    
+    @classmethod
+    def enable_cache(cls, max_entries: int = 1000, ttl: Optional[float] = 24 * 60 * 60,
+                     path: Optional[str] = None) -> "ResponseCache":
+        """Wrap every provider returned from now on in a shared response cache
+        
+        If the cache is already enabled the existing cache is returned unchanged;
+        call disable_cache first to change its settings.
+        
+        Args:
+            max_entries: Maximum number of responses kept in each cache tier
+            ttl: Seconds before a cached response expires
+            path: SQLite file for the persistent tier. None keeps the cache in memory only
             
-        return provider_class(model=model, temperature=temperature)
+        Returns:
+            The shared ResponseCache
+        """
+        if cls._cache is None:
+            from .cache import ResponseCache
+            cls._cache = ResponseCache(max_entries=max_entries, ttl=ttl, path=path)
+        return cls._cache
+    
+    @classmethod
+    def disable_cache(cls) -> None:
+        """Stop caching responses for newly created providers and close the cache"""
+        if cls._cache is not None:
+            cls._cache.close()
+            cls._cache = None
+    
+    @classmethod
+    def use_cassette(cls, path: str, mode: str, timing: bool = False, strict: bool = False) -> "Cassette":
+        """Record the model calls of every provider created from now on to a cassette, or replay them
+        
+        If the same cassette is already in use it is returned unchanged; call
+        stop_cassette first to switch cassettes.
+        
+        Args:
+            path: Cassette file. A .gz suffix compresses it
+            mode: "record" or "replay"
+            timing: On replay, take as long as the recorded calls did
+            strict: On replay, fail on requests that were not recorded verbatim
+            
+        Returns:
+            The shared Cassette
+            
+        Raises:
+            ValueError: If a cassette with a different path or mode is already in use
+        """
+        if cls._cassette is None:
+            from .cassette import Cassette
+            cls._cassette = Cassette(path, mode, timing=timing, strict=strict)
+        elif cls._cassette.path.resolve() != Path(path).expanduser().resolve() or cls._cassette.mode != mode:
+            raise ValueError(f"Cassette {cls._cassette.path} is already in use ({cls._cassette.mode}); "
+                             f"stop it before using {path} ({mode})")
+        return cls._cassette
+    
+    @classmethod
+    def current_cassette(cls) -> Optional["Cassette"]:
+        """The cassette in use, if any"""
+        return cls._cassette
+    
+    @classmethod
+    def stop_cassette(cls) -> None:
+        """Stop recording or replaying for newly created providers and close the cassette"""
+        if cls._cassette is not None:
+            cls._cassette.close()
+            cls._cassette = None
     
     @classmethod
     def get_available_providers(cls) -> list[str]:
         """Get a list of available provider types"""
-        return list(cls._providers.keys()) 
\ No newline at end of file
+        return list(cls._providers.keys()) 
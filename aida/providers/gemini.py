@@ -1,8 +1,8 @@
 import os
 import logging
-from typing import Any
+from typing import Any, Iterator
 from langchain_google_genai import ChatGoogleGenerativeAI
-from .base import LLMProvider
+from .base import LLMProvider, close_async_client
 
 logger = logging.getLogger(__name__)
 
@@ -11,13 +11,20 @@ class GeminiProvider(LLMProvider):
     
     AVAILABLE_MODELS = ["gemini-1.5-flash","gemini-2.0-flash-exp","gemini-2.0-flash-thinking-exp","gemini-2.0-flash-exp"]
     
-    def __init__(self, model: str, temperature: float = 0):
-        """Initialize the Gemini provider with a model and temperature"""
+    def __init__(self, model: str, temperature: float = 0, defer_validation: bool = False):
+        """Initialize the Gemini provider with a model and temperature
+        
+        Args:
+            model: Name of the Gemini model
+            temperature: Temperature parameter for the model
+            defer_validation: Check the model name on first use instead of now
+        """
         self.model = model
         self.temperature = temperature
+        self._validated = False
         
-        if not self.validate_model(model):
-            raise ValueError(f"Model '{model}' is not available in Gemini. Available models: {self.AVAILABLE_MODELS}")
+        if not defer_validation:
+            self._ensure_valid()
             
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
@@ -29,10 +36,37 @@ class GeminiProvider(LLMProvider):
             google_api_key=api_key
         )
     
+    def _ensure_valid(self) -> None:
+        """Validate the model once, raising ValueError if it is not available"""
+        if self._validated:
+            return
+        if not self.validate_model(self.model):
+            raise ValueError(f"Model '{self.model}' is not available in Gemini. Available models: {self.AVAILABLE_MODELS}")
+        self._validated = True
+    
     def invoke(self, prompt: str) -> Any:
         """Invoke the Gemini LLM with a prompt"""
+        self._ensure_valid()
         return self.llm.invoke(prompt)
     
+    async def ainvoke(self, prompt: str) -> Any:
+        """Asynchronously invoke the Gemini LLM with a prompt"""
+        self._ensure_valid()
+        return await self.llm.ainvoke(prompt)
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Stream the Gemini LLM response to a prompt chunk by chunk"""
+        self._ensure_valid()
+        for chunk in self.llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
+    
+    def close(self) -> None:
+        """Close the gRPC transports of the Gemini clients"""
+        self.llm.client.transport.close()
+        if self.llm.async_client_running is not None:
+            close_async_client(self.llm.async_client_running.transport.close)
+    
     def validate_model(self, model: str) -> bool:
         """Validate if the specified model is available in Gemini"""
         return model in self.AVAILABLE_MODELS 
@@ -40,3 +74,7 @@ class GeminiProvider(LLMProvider):
     def is_strong(self) -> bool:
         """Return whether this model is considered strong enough to skip validation steps"""
         return True
+    
+    def supports_tool_calling(self) -> bool:
+        """Return whether the model supports structured tool calls (all Gemini models do)"""
+        return True
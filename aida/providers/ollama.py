@@ -1,40 +1,260 @@
-import subprocess
+import os
+import time
 import logging
-from typing import Any
+import threading
+from typing import Any, Iterator, Dict, List, Optional, Tuple, Union
+import requests
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_ollama import ChatOllama
-from .base import LLMProvider
+from .base import LLMProvider, close_async_client
 
 logger = logging.getLogger(__name__)
 
+# How long the installed model list is reused before asking Ollama again
+MODEL_LIST_TTL = 30.0
+
+# How long Ollama keeps the model (and its KV cache) loaded after a request
+DEFAULT_KEEP_ALIVE = "30m"
+
+# Shared HTTP client and per-host model list cache for the whole process
+_session = requests.Session()
+_model_list_lock = threading.Lock()
+_model_list_cache: Dict[str, Tuple[float, List[str]]] = {}
+_capabilities_cache: Dict[Tuple[str, str], List[str]] = {}
+# When a capabilities lookup last failed, so it is not retried for MODEL_LIST_TTL seconds
+_capabilities_failed: Dict[Tuple[str, str], float] = {}
+
+def _ollama_host() -> str:
+    """Return the Ollama base URL, honouring OLLAMA_HOST like the ollama CLI does"""
+    host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+    if "://" not in host:
+        host = f"http://{host}"
+    return host.rstrip("/")
+
+def list_installed_models(base_url: Optional[str] = None, ttl: float = MODEL_LIST_TTL) -> List[str]:
+    """Get the names of the models installed in Ollama
+    
+    The list comes from Ollama's /api/tags endpoint and is cached for the
+    whole process for `ttl` seconds, so creating many providers costs at most
+    one HTTP request.
+    
+    Args:
+        base_url: Ollama server URL. Defaults to OLLAMA_HOST or http://localhost:11434
+        ttl: Seconds a fetched list stays valid
+        
+    Returns:
+        Installed model names such as "llama3.2:3b", or an empty list if Ollama is unreachable
+    """
+    base_url = base_url or _ollama_host()
+    with _model_list_lock:
+        cached = _model_list_cache.get(base_url)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+        
+        logger.info("Checking available Ollama models...")
+        try:
+            response = _session.get(f"{base_url}/api/tags", timeout=5)
+            response.raise_for_status()
+            models = [entry["name"] for entry in response.json().get("models", [])]
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.error("Failed to list Ollama models from %s: %s", base_url, str(e))
+            return []
+        
+        logger.info("Available models: %s", ", ".join(models))
+        _model_list_cache[base_url] = (time.monotonic(), models)
+        return models
+
+def clear_model_list_cache() -> None:
+    """Forget cached model lists so the next validation asks Ollama again"""
+    with _model_list_lock:
+        _model_list_cache.clear()
+        _capabilities_cache.clear()
+        _capabilities_failed.clear()
+
+def model_capabilities(model: str, base_url: Optional[str] = None) -> List[str]:
+    """Get what an installed Ollama model can do, e.g. ["completion", "tools"]
+    
+    Comes from Ollama's /api/show endpoint and is cached for the whole process;
+    a failed lookup is not retried for MODEL_LIST_TTL seconds. Servers too old
+    to report capabilities are asked for the model's template instead, which
+    mentions .Tools when the model accepts tool definitions.
+    
+    Args:
+        model: Name of the model
+        base_url: Ollama server URL. Defaults to OLLAMA_HOST or http://localhost:11434
+        
+    Returns:
+        Capability names, or an empty list if Ollama is unreachable
+    """
+    base_url = base_url or _ollama_host()
+    key = (base_url, model)
+    with _model_list_lock:
+        cached = _capabilities_cache.get(key)
+        if cached is not None:
+            return cached
+        failed = _capabilities_failed.get(key)
+        if failed is not None and time.monotonic() - failed < MODEL_LIST_TTL:
+            return []
+    
+    # Asked without holding the lock, so a slow server does not hold up model list lookups
+    try:
+        response = _session.post(f"{base_url}/api/show", json={"model": model}, timeout=5)
+        response.raise_for_status()
+        details = response.json()
+    except (requests.RequestException, ValueError) as e:
+        logger.error("Failed to get the capabilities of %s from %s: %s", model, base_url, str(e))
+        with _model_list_lock:
+            _capabilities_failed[key] = time.monotonic()
+        return []
+    capabilities = details.get("capabilities")
+    if capabilities is None:
+        capabilities = ["completion"] + (["tools"] if ".Tools" in details.get("template", "") else [])
+    with _model_list_lock:
+        _capabilities_cache[key] = capabilities
+        _capabilities_failed.pop(key, None)
+    return capabilities
+
+class PromptCacheStats(BaseCallbackHandler):
+    """Measures how much of each prompt Ollama could serve from its KV cache
+    
+    Ollama keeps the KV state of the previous prompt while the model stays
+    loaded and only evaluates the tokens after the longest shared prefix. For
+    every call this records the prefix shared with the previous prompt and the
+    prompt tokens Ollama reports it actually evaluated. A call counts as a
+    cache hit when Ollama evaluated less than half of the prompt.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous = ""
+        self._pending: Dict[Any, Tuple[int, int]] = {}
+        self.reset()
+    
+    def reset(self) -> None:
+        """Zero the counters"""
+        with self._lock:
+            self.calls = 0
+            self.cache_hits = 0
+            self.prompt_chars = 0
+            self.reused_prefix_chars = 0
+            self.prompt_tokens_evaluated = 0
+            self.prompt_eval_seconds = 0.0
+    
+    def _prompt_started(self, run_id, prompt: str) -> None:
+        with self._lock:
+            shared = len(os.path.commonprefix([self._previous, prompt]))
+            self._previous = prompt
+            self._pending[run_id] = (len(prompt), shared)
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._prompt_started(run_id, "".join(str(m.content) for batch in messages for m in batch))
+    
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._prompt_started(run_id, "".join(prompts))
+    
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        with self._lock:
+            prompt_chars, shared = self._pending.pop(run_id, (0, 0))
+            info = {}
+            if response.generations and response.generations[0]:
+                generation = response.generations[0][0]
+                message = getattr(generation, "message", None)
+                info = generation.generation_info or getattr(message, "response_metadata", None) or {}
+            evaluated = info.get("prompt_eval_count") or 0
+            self.calls += 1
+            self.prompt_chars += prompt_chars
+            self.reused_prefix_chars += shared
+            self.prompt_tokens_evaluated += evaluated
+            self.prompt_eval_seconds += (info.get("prompt_eval_duration") or 0) / 1e9
+            # Roughly 4 characters per token
+            if "prompt_eval_count" in info and evaluated < prompt_chars / 8:
+                self.cache_hits += 1
+        logger.debug("Prompt of %d chars, %d shared with the previous one, %d tokens evaluated by Ollama",
+                     prompt_chars, shared, evaluated)
+    
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        with self._lock:
+            self._pending.pop(run_id, None)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Return the counters and the derived reuse and hit rates"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "cache_hits": self.cache_hits,
+                "hit_rate": round(self.cache_hits / self.calls, 3) if self.calls else 0.0,
+                "prefix_reuse": round(self.reused_prefix_chars / self.prompt_chars, 3) if self.prompt_chars else 0.0,
+                "prompt_tokens_evaluated": self.prompt_tokens_evaluated,
+                "prompt_eval_seconds": round(self.prompt_eval_seconds, 3),
+            }
+
 class OllamaProvider(LLMProvider):
     """Ollama LLM provider implementation"""
     
-    def __init__(self, model: str, temperature: float = 0):
-        """Initialize the Ollama provider with a model and temperature"""
+    def __init__(self, model: str, temperature: float = 0, defer_validation: bool = False,
+                 keep_alive: Optional[Union[int, str]] = DEFAULT_KEEP_ALIVE, num_ctx: Optional[int] = None):
+        """Initialize the Ollama provider with a model and temperature
+        
+        Args:
+            model: Name of the Ollama model
+            temperature: Temperature parameter for the model
+            defer_validation: Check that the model is installed on first use instead of now
+            keep_alive: How long Ollama keeps the model loaded after a request, e.g. "30m" or "-1"
+                (forever). Prompt prefixes are only reused while the model stays loaded.
+                None uses the server default (5 minutes)
+            num_ctx: Context window in tokens. A fixed value avoids model reloads, which
+                drop the KV cache, when requests would otherwise ask for different sizes
+        """
         self.model = model
         self.temperature = temperature
-        if not self.validate_model(model):
-            raise ValueError(f"Model '{model}' is not available in Ollama")
-        self.llm = ChatOllama(model=model, temperature=temperature)
+        self._validated = False
+        if not defer_validation:
+            self._ensure_valid()
+        self.prompt_stats = PromptCacheStats()
+        self.llm = ChatOllama(model=model, temperature=temperature, keep_alive=keep_alive, num_ctx=num_ctx,
+                              callbacks=[self.prompt_stats])
+    
+    def _ensure_valid(self) -> None:
+        """Validate the model once, raising ValueError if it is not installed"""
+        if self._validated:
+            return
+        if not self.validate_model(self.model):
+            raise ValueError(f"Model '{self.model}' is not available in Ollama")
+        self._validated = True
     
     def invoke(self, prompt: str) -> Any:
         """Invoke the Ollama LLM with a prompt"""
+        self._ensure_valid()
         return self.llm.invoke(prompt)
     
+    async def ainvoke(self, prompt: str) -> Any:
+        """Asynchronously invoke the Ollama LLM with a prompt"""
+        self._ensure_valid()
+        return await self.llm.ainvoke(prompt)
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Stream the Ollama LLM response to a prompt chunk by chunk"""
+        self._ensure_valid()
+        for chunk in self.llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
+    
+    def close(self) -> None:
+        """Close the HTTP connection pools of the ChatOllama clients"""
+        self.llm._client._client.close()
+        async_client = self.llm._async_client._client
+        if not async_client.is_closed:
+            close_async_client(async_client.aclose)
+    
     def validate_model(self, model: str) -> bool:
         """Validate if the specified model is available in Ollama"""
-        logger.info("Checking available Ollama models...")
-        process = subprocess.Popen(["ollama", "list"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        output, error = process.communicate()
-        
-        if process.returncode != 0:
-            logger.error("Failed to run 'ollama list': %s", error.strip())
-            return False
-            
-        logger.info("Available models:\n%s", output)
-        available_models = [model.split()[0] for model in output.splitlines()[1:] if model.strip()]
-        return model in available_models 
+        available_models = list_installed_models()
+        return model in available_models or f"{model}:latest" in available_models
     
     def is_strong(self) -> bool:
         """Return whether this model is considered strong enough to skip validation steps"""
         return False
+    
+    def supports_tool_calling(self) -> bool:
+        """Return whether the model accepts tool definitions (e.g. llama3.1+, qwen2.5)"""
+        return "tools" in model_capabilities(self.model)
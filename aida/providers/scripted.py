@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+from langchain_core.language_models.llms import LLM
+from langchain_core.messages import AIMessage
+from pydantic import PrivateAttr
+from .base import LLMProvider
+
+# ReAct transcripts replayed by default, one per query. Every transcript ends
+# with a Final Answer, so each query consumes exactly its own steps
+DEFAULT_SCRIPT = [
+    [
+        "Thought: I need to use the shell tool to check the uptime\nAction: shell\nAction Input: uptime",
+        "Thought: I now know the uptime\nFinal Answer: The server has been up for 3 days with a load average of 0.42.",
+    ],
+    [
+        "Thought: I need to use the shell tool with 'ps' sorted by memory usage\nAction: shell\nAction Input: ps aux --sort=-%mem | head -2",
+        "Thought: I now know which process uses the most memory\nFinal Answer: mysqld (PID 1201) is using the most memory: 18.4%.",
+    ],
+    [
+        "Thought: I need to check the disks with the shell tool\nAction: shell\nAction Input: df -h /",
+        "Thought: I need to find the largest directories under /var\nAction: shell\nAction Input: du -sh /var/* | sort -h | tail -3",
+        "Thought: I now know what is using the disk\nFinal Answer: / is 94% full; /var/log (31G) takes most of the space.",
+    ],
+    [
+        "Thought: I need to check who is logged in\nAction: shell\nAction Input: who",
+        "Thought: I now know who is logged in\nFinal Answer: 2 users are logged in: alice and bob.",
+    ],
+]
+
+# Reply to calls made outside the agent (relevance checks, summaries, final answer recovery)
+DEFAULT_REPLY = "RELEVANT: scripted reply"
+
+def load_script(path: str) -> List[List[str]]:
+    """Load transcripts from a JSON file holding a list of lists of model outputs"""
+    with open(path) as f:
+        script = json.load(f)
+    if not script or not all(isinstance(transcript, list) and transcript for transcript in script):
+        raise ValueError(f"{path} must hold a non-empty list of non-empty lists of model outputs")
+    return script
+
+class ScriptedLLM(LLM):
+    """LangChain LLM replaying model outputs in order, with a fixed latency per call
+
+    The outputs repeat from the start once they run out. `calls` and
+    `busy_seconds` count the calls made and the time spent inside them.
+    """
+
+    responses: List[str]
+    latency: float = 0.0
+    calls: int = 0
+    busy_seconds: float = 0.0
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _next(self, started: float) -> str:
+        with self._lock:
+            response = self.responses[self.calls % len(self.responses)]
+            self.calls += 1
+            self.busy_seconds += time.perf_counter() - started
+        return response
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._next(started)
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None,
+                     **kwargs: Any) -> str:
+        started = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._next(started)
+
+class ScriptedProvider(LLMProvider):
+    """Offline provider replaying scripted ReAct transcripts
+
+    Measures AIDA's own overhead without a model server: the agent gets the
+    scripted steps in order, every call takes `latency` seconds, and calls made
+    outside the agent get a fixed reply so they never shift the transcripts.
+    """
+
+    def __init__(self, model: str = "scripted", temperature: float = 0, script: Optional[List[List[str]]] = None,
+                 latency: float = 0.0, reply: str = DEFAULT_REPLY, strong: bool = False, **options):
+        """Initialize the provider
+
+        Args:
+            model: Name reported for the model. A path ending in .json loads the script from that file
+            temperature: Ignored
+            script: Transcripts to replay, each a list of model outputs ending with a Final Answer.
+                Defaults to DEFAULT_SCRIPT
+            latency: Seconds every call takes
+            reply: Response to invoke, ainvoke and stream
+            strong: Value returned by is_strong
+            **options: Options meant for other providers (e.g. defer_validation), ignored
+        """
+        self.model = model
+        self.temperature = temperature
+        if script is None:
+            script = load_script(model) if model.endswith(".json") else DEFAULT_SCRIPT
+        self.script = script
+        self.latency = latency
+        self.reply = reply
+        self.strong = strong
+        self.llm = ScriptedLLM(responses=[step for transcript in script for step in transcript], latency=latency)
+
+    def set_latency(self, latency: float) -> None:
+        """Change the seconds every call takes, including calls of the agent built on self.llm"""
+        self.latency = latency
+        self.llm.latency = latency
+
+    def invoke(self, prompt: str) -> Any:
+        """Return the fixed reply after the configured latency"""
+        if self.latency:
+            time.sleep(self.latency)
+        return AIMessage(content=self.reply)
+
+    async def ainvoke(self, prompt: str) -> Any:
+        """asyncio version of invoke"""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return AIMessage(content=self.reply)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the fixed reply word by word, spreading the latency over the words"""
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                time.sleep(self.latency / len(words))
+            yield word if i == len(words) - 1 else word + " "
+
+    def validate_model(self, model: str) -> bool:
+        """Every model name is valid"""
+        return True
+
+    def is_strong(self) -> bool:
+        return self.strong
@@ -0,0 +1,125 @@
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9_./-]+")
+
+# Longest text kept per snippet, so huge observations do not bloat the index
+MAX_SNIPPET_CHARS = 4000
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms, keeping paths and flags together"""
+    return [token.strip("./-") for token in _TOKEN.findall(text.lower()) if token.strip("./-")]
+
+@dataclass
+class Snippet:
+    """A piece of earlier conversation that can be recalled"""
+    label: str
+    text: str
+
+class RecallIndex:
+    """BM25 index over past conversation turns and tool observations
+
+    Each term keeps a posting list of (snippet, term frequency, snippet length)
+    entries. A search scores only the postings of the query terms, using NumPy
+    over the posting arrays, so cost grows with matches rather than history length.
+    """
+
+    def __init__(self, max_snippets: int = 2000, k1: float = 1.5, b: float = 0.75):
+        """Initialize the index
+
+        Args:
+            max_snippets: Snippets kept before the oldest quarter is dropped
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.max_snippets = max_snippets
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.snippets: List[Snippet] = []
+        self._total_length = 0
+        self._postings: Dict[str, tuple] = {}
+        self._arrays: Dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self.snippets)
+
+    def add(self, label: str, text: str) -> None:
+        """Index a snippet of earlier conversation
+
+        Args:
+            label: Short description shown with the snippet, e.g. "User" or "shell: df -h"
+            text: Snippet text
+        """
+        text = text[:MAX_SNIPPET_CHARS]
+        with self._lock:
+            if len(self.snippets) >= self.max_snippets:
+                kept = self.snippets[len(self.snippets) // 4:]
+                self._reset()
+                for snippet in kept:
+                    self._index(snippet)
+            self._index(Snippet(label=label, text=text))
+
+    def _index(self, snippet: Snippet) -> None:
+        terms = tokenize(f"{snippet.label} {snippet.text}")
+        doc_id = len(self.snippets)
+        self.snippets.append(snippet)
+        self._total_length += len(terms)
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            doc_ids, freqs, lengths = self._postings.setdefault(term, ([], [], []))
+            doc_ids.append(doc_id)
+            freqs.append(count)
+            lengths.append(len(terms))
+            self._arrays.pop(term, None)
+
+    def _posting_arrays(self, term: str) -> Optional[tuple]:
+        if term not in self._postings:
+            return None
+        if term not in self._arrays:
+            doc_ids, freqs, lengths = self._postings[term]
+            self._arrays[term] = (np.asarray(doc_ids, dtype=np.int64), np.asarray(freqs, dtype=np.float64),
+                                  np.asarray(lengths, dtype=np.float64))
+        return self._arrays[term]
+
+    def search(self, query: str, k: int = 3) -> List[Snippet]:
+        """Find the snippets most relevant to a query
+
+        Args:
+            query: Text to search for
+            k: Maximum number of snippets to return
+
+        Returns:
+            Matching snippets, best first
+        """
+        with self._lock:
+            total = len(self.snippets)
+            if not total or k <= 0:
+                return []
+            average_length = max(self._total_length / total, 1.0)
+            matched_ids, matched_scores = [], []
+            for term in set(tokenize(query)):
+                postings = self._posting_arrays(term)
+                if postings is None:
+                    continue
+                doc_ids, freqs, lengths = postings
+                idf = np.log(1 + (total - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths / average_length)
+                matched_ids.append(doc_ids)
+                matched_scores.append(idf * freqs * (self.k1 + 1) / (freqs + norm))
+            if not matched_ids:
+                return []
+
+            # Sum the scores of snippets matching several terms
+            doc_ids, inverse = np.unique(np.concatenate(matched_ids), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+            top = np.argsort(-scores, kind="stable")[:k]
+            return [self.snippets[doc_ids[i]] for i in top if scores[i] > 0]
@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_STORE_PATH = "~/.local/share/aida/sessions.sqlite"
+# Rows iter_turns reads per query
+ITER_PAGE_ROWS = 100
+
+class SessionStore:
+    """SQLite-backed store for conversation sessions
+
+    Keeps every user and assistant turn, the rolling conversation summary and
+    zlib-compressed tool observations. Turns are indexed by session and time so
+    a session can be resumed by reading only its newest turns.
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_SESSION_STORE_PATH):
+        """Open (and create if needed) the session database
+
+        Args:
+            path: SQLite file, or ":memory:" for a throwaway store
+        """
+        if str(path) != ":memory:":
+            path = Path(path).expanduser()
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                summary TEXT NOT NULL DEFAULT ''
+            );
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL REFERENCES sessions(id),
+                created REAL NOT NULL,
+                role TEXT NOT NULL,
+                tool TEXT,
+                compressed INTEGER NOT NULL DEFAULT 0,
+                content BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS turns_session_time ON turns (session_id, created);
+            CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+        """)
+        self._db.commit()
+
+    def create_session(self) -> str:
+        """Create a new session and return its id"""
+        session_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sessions (id, created, updated) VALUES (?, ?, ?)", (session_id, now, now)
+            )
+            self._db.commit()
+        return session_id
+
+    def session_exists(self, session_id: str) -> bool:
+        """Return whether a session with this id exists"""
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row is not None
+
+    def list_sessions(self, limit: int = 20) -> List[Tuple[str, float, int]]:
+        """List the most recently updated sessions
+
+        Returns:
+            (session id, last update time, number of turns) tuples, newest first
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT s.id, s.updated, (SELECT COUNT(*) FROM turns t WHERE t.session_id = s.id) "
+                "FROM sessions s ORDER BY s.updated DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+    def add_turn(self, session_id: str, role: str, content: str) -> None:
+        """Append a user, assistant or system turn to a session"""
+        self._insert(session_id, role, None, False, content.encode())
+
+    def add_observation(self, session_id: str, tool: str, tool_input: str, output: str) -> None:
+        """Append a compressed tool observation to a session"""
+        content = f"{tool_input}\n{output}".encode()
+        self._insert(session_id, "observation", tool, True, zlib.compress(content))
+
+    def _insert(self, session_id: str, role: str, tool: Optional[str], compressed: bool, content: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO turns (session_id, created, role, tool, compressed, content) VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, now, role, tool, int(compressed), content)
+            )
+            self._db.execute("UPDATE sessions SET updated = ? WHERE id = ?", (now, session_id))
+            self._db.commit()
+
+    def save_summary(self, session_id: str, summary: str) -> None:
+        """Store the rolling conversation summary of a session"""
+        with self._lock:
+            self._db.execute("UPDATE sessions SET summary = ? WHERE id = ?", (summary, session_id))
+            self._db.commit()
+
+    def load_summary(self, session_id: str) -> str:
+        """Get the rolling conversation summary of a session"""
+        with self._lock:
+            row = self._db.execute("SELECT summary FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row else ""
+
+    @staticmethod
+    def _decode(compressed: int, content: bytes) -> str:
+        if compressed:
+            content = zlib.decompress(content)
+        return content.decode()
+
+    def iter_turns(self, session_id: str, since: Optional[float] = None,
+                   roles: Optional[Tuple[str, ...]] = None) -> Iterator[Tuple[str, Optional[str], str, float]]:
+        """Iterate over a session's turns in time order without loading them all
+
+        Rows are read ITER_PAGE_ROWS at a time, continuing after the last row
+        read, and the lock is not held while the caller handles them.
+
+        Args:
+            session_id: Session to read
+            since: Only turns created at or after this time
+            roles: Only turns with these roles
+
+        Yields:
+            (role, tool, content, created) tuples
+        """
+        query = "SELECT id, role, tool, compressed, content, created FROM turns WHERE session_id = ?"
+        params: list = [session_id]
+        if since is not None:
+            query += " AND created >= ?"
+            params.append(since)
+        if roles:
+            query += f" AND role IN ({', '.join('?' for _ in roles)})"
+            params.extend(roles)
+        page_query = query + " AND (created > ? OR (created = ? AND id > ?)) ORDER BY created, id LIMIT ?"
+        query += " ORDER BY created, id LIMIT ?"
+        last = None
+        while True:
+            with self._lock:
+                if last is None:
+                    rows = self._db.execute(query, (*params, ITER_PAGE_ROWS)).fetchall()
+                else:
+                    rows = self._db.execute(page_query, (*params, last[1], last[1], last[0], ITER_PAGE_ROWS)).fetchall()
+            for turn_id, role, tool, compressed, content, created in rows:
+                yield role, tool, self._decode(compressed, content), created
+            if len(rows) < ITER_PAGE_ROWS:
+                return
+            last = (rows[-1][0], rows[-1][5])
+
+    def recent_turns(self, session_id: str, token_budget: int,
+                     roles: Tuple[str, ...] = ("user", "assistant", "system")) -> List[Tuple[str, str]]:
+        """Read the newest turns of a session that fit a token budget
+
+        Rows are read newest first and reading stops once the budget is used,
+        so resuming a long session does not load its whole history.
+
+        Returns:
+            (role, content) tuples in time order
+        """
+        placeholders = ", ".join("?" for _ in roles)
+        turns = []
+        used = 0
+        with self._lock:
+            cursor = self._db.execute(
+                f"SELECT role, compressed, content FROM turns WHERE session_id = ? AND role IN ({placeholders}) "
+                "ORDER BY created DESC, id DESC",
+                (session_id, *roles)
+            )
+            for role, compressed, content in cursor:
+                text = self._decode(compressed, content)
+                used += max(1, (len(text) + 3) // 4)
+                if used > token_budget and turns:
+                    break
+                turns.append((role, text))
+            cursor.close()
+        return list(reversed(turns))
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            self._db.close()
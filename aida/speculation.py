@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from typing import Any, Optional
+from langchain_core.callbacks import AsyncCallbackHandler, BaseCallbackHandler
+import logging
+
+logger = logging.getLogger(__name__)
+
+class QueryCancelled(Exception):
+    """Raised inside an agent run that was cancelled because its query is not relevant"""
+
+class SpeculativeGate(BaseCallbackHandler):
+    """Callback handler that lets the agent start before the relevance check finishes
+
+    LLM calls run speculatively. Tool calls wait until the relevance check has
+    decided, so nothing touches the server for a query that is then refused.
+    Once a query is refused, the next agent callback raises QueryCancelled.
+    """
+
+    raise_error = True
+
+    def __init__(self):
+        self._decided = threading.Event()
+        self.relevant: Optional[bool] = None
+
+    def decide(self, relevant: bool) -> None:
+        """Record the relevance check's verdict and release waiting tool calls"""
+        self.relevant = relevant
+        self._decided.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.relevant is False
+
+    def _check(self) -> None:
+        if self.cancelled:
+            raise QueryCancelled("Query is not related to server management")
+
+    def on_llm_start(self, serialized: Any, prompts: Any, **kwargs: Any) -> None:
+        self._check()
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, **kwargs: Any) -> None:
+        self._check()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self._check()
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        self._check()
+
+    def on_tool_start(self, serialized: Any, input_str: str, **kwargs: Any) -> None:
+        self._decided.wait()
+        self._check()
+
+class AsyncSpeculativeGate(AsyncCallbackHandler):
+    """asyncio version of SpeculativeGate
+
+    The caller cancels the agent task once a query is refused; this handler only
+    holds tool calls until the relevance check has decided.
+    """
+
+    raise_error = True
+
+    def __init__(self):
+        self._decided = asyncio.Event()
+        self.relevant: Optional[bool] = None
+
+    def decide(self, relevant: bool) -> None:
+        """Record the relevance check's verdict and release waiting tool calls"""
+        self.relevant = relevant
+        self._decided.set()
+
+    async def on_tool_start(self, serialized: Any, input_str: str, **kwargs: Any) -> None:
+        await self._decided.wait()
+        if self.relevant is False:
+            raise QueryCancelled("Query is not related to server management")
@@ -0,0 +1,96 @@
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Modules that make up AIDA's startup path, in the order the CLI loads them
+PROFILED_MODULES = [
+    "aida.config",
+    "aida.cli",
+    "aida.providers",
+    "aida.providers.ollama",
+    "aida.providers.gemini",
+    "aida.core",
+    "aida.tools.coder_tool",
+    "aida.gui",
+]
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+@dataclass
+class ImportProfile:
+    """Import cost of a single module, measured in a fresh interpreter"""
+    module: str
+    total_ms: float
+    packages_ms: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+def profile_import(module: str) -> ImportProfile:
+    """Measure how long importing a module takes in a fresh interpreter
+
+    Uses `python -X importtime` so already-imported modules in this process
+    do not hide the cost.
+
+    Args:
+        module: Dotted module name to import
+
+    Returns:
+        ImportProfile with the cumulative import time and self time per top-level package
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+
+    total_us = 0
+    packages_us: Dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        package = name.split(".")[0]
+        packages_us[package] = packages_us.get(package, 0) + int(self_us)
+        if len(indent) == 1:
+            total_us += int(cumulative_us)
+
+    error = None
+    if process.returncode != 0:
+        error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "import failed"
+
+    return ImportProfile(
+        module=module,
+        total_ms=total_us / 1000,
+        packages_ms={package: us / 1000 for package, us in packages_us.items()},
+        error=error
+    )
+
+def format_report(profiles: List[ImportProfile], top: int = 5) -> str:
+    """Format import profiles as a human-readable report
+
+    Args:
+        profiles: Profiles to report
+        top: Number of most expensive packages to list per module
+
+    Returns:
+        The report text
+    """
+    lines = ["Startup import profile (fresh interpreter per module):", ""]
+    for profile in profiles:
+        if profile.error:
+            lines.append(f"  {profile.module:<28} failed: {profile.error}")
+            continue
+        lines.append(f"  {profile.module:<28} {profile.total_ms:9.1f} ms")
+        heaviest = sorted(profile.packages_ms.items(), key=lambda item: item[1], reverse=True)[:top]
+        for package, ms in heaviest:
+            lines.append(f"      {package:<24} {ms:9.1f} ms")
+    return "\n".join(lines)
+
+def main(modules: Optional[List[str]] = None) -> None:
+    """Print the import-time breakdown for AIDA's startup path"""
+    print(format_report([profile_import(module) for module in modules or PROFILED_MODULES]))
+
+if __name__ == "__main__":
+    main()
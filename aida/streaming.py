@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+from queue import Queue
+from langchain_core.callbacks import BaseCallbackHandler
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Event types emitted while a query is being processed
+TOKEN = "token"
+THOUGHT = "thought"
+ACTION = "action"
+OBSERVATION = "observation"
+FINAL_ANSWER = "final_answer"
+ERROR = "error"
+
+@dataclass
+class AidaEvent:
+    """A single step of a query run, emitted as soon as it happens"""
+    type: str
+    content: str
+    tool: Optional[str] = None
+
+class StreamingEventHandler(BaseCallbackHandler):
+    """Callback handler that turns agent callbacks into AidaEvents on a queue"""
+
+    def __init__(self, events: Queue):
+        """Initialize the handler with the queue events are pushed to
+
+        Args:
+            events: Queue receiving AidaEvent instances
+        """
+        self.events = events
+        self._streamed = False
+
+    def on_llm_start(self, serialized: Any, prompts: Any, **kwargs: Any) -> None:
+        self._streamed = False
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, **kwargs: Any) -> None:
+        self._streamed = False
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self._streamed = True
+            self.events.put(AidaEvent(TOKEN, token))
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        # Models that do not stream still produce their text in one piece
+        if self._streamed:
+            return
+        for generations in response.generations:
+            for generation in generations:
+                if generation.text:
+                    self.events.put(AidaEvent(TOKEN, generation.text))
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        thought = action.log.split("Action:", 1)[0].strip()
+        if thought.startswith("Thought:"):
+            thought = thought[len("Thought:"):].strip()
+        if thought:
+            self.events.put(AidaEvent(THOUGHT, thought))
+        self.events.put(AidaEvent(ACTION, str(action.tool_input), tool=action.tool))
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        self.events.put(AidaEvent(OBSERVATION, str(output), tool=kwargs.get("name")))
@@ -1,12 +1,21 @@
 from aida.providers.factory import LLMProviderFactory
-from aida.tools.validated_shelltool import shell_tool
+from aida.tools.validated_shelltool import shell_tool as default_shell_tool
+from aida.examples import ExampleLibrary, CODER_EXAMPLES
 import re
 import logging
-from langchain.agents import initialize_agent, AgentType
+from typing import Optional
 from langchain.agents import Tool
+from aida.agents import build_agent, resolve_agent_mode, AUTO, REACT
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CODER_PROMPT_SUFFIX = """{examples}
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
 def write_code_to_file(code: str) -> str:
     """Write the code to a file"""
     if "```python" in code:
@@ -22,35 +31,43 @@ def write_code_to_file(code: str) -> str:
 class PythonCoder:
     """A tool that uses an AI to write and save code into a file based on an input query."""
 
-    def __init__(self, llm, file_path: str = "generated_code.py"):
+    def __init__(self, llm, file_path: str = "generated_code.py", pooled: bool = False, agent_mode: str = AUTO,
+                 provider_options: Optional[dict] = None, shell_tool: Optional[Tool] = None):
         """
         Initializes the WriteCodeAndExecute tool.
 
         Args:
             llm: The AI language model instance.
-            shell_tool: An instance of ValidatedShellTool to execute shell commands.
             file_path: The path where the generated code will be saved.
+            pooled: Share the coder's provider instance through the factory pool.
+            agent_mode: "auto", "react" or "tool_calling" (see aida.agents).
+            provider_options: Extra Gemini provider options (see AidaConfig.provider_options).
+                They are part of the pool key, so they must match the session's to share its provider.
+            shell_tool: The session's "shell" tool, so generated code runs in the agent's shell,
+                with its confirmation and output handling. Defaults to a standalone shell tool.
         """
         self.llm = LLMProviderFactory.get_provider(
             provider_type="gemini",
             model="gemini-1.5-flash",
-            temperature=0
+            temperature=0,
+            pooled=pooled,
+            **(provider_options or {})
         )
-        self.shell_tool = shell_tool
+        self.shell_tool = shell_tool or default_shell_tool
         self.file_path = file_path
 
-        self.agent = initialize_agent(
-            tools=[shell_tool,Tool(name="write_code_to_file", func=write_code_to_file,description="Use this function to write the code to a file")],
+        self.agent, self.agent_mode = build_agent(
+            tools=[self.shell_tool,Tool(name="write_code_to_file", func=write_code_to_file,description="Use this function to write the code to a file")],
             llm=self.llm.llm,  # Access the underlying LangChain LLM
-            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            mode=resolve_agent_mode(agent_mode, self.llm),
+            human_template="Question: {input}",
             verbose=True,
             handle_parsing_errors=True,
                 # Start of Selection
                 max_iterations=20 if self.llm.is_strong() else 10,
             early_stopping_method="force",
             return_intermediate_steps=False,
-            agent_kwargs={
-                "prefix": """You are an AI Software Engineer agent that has 10 years experience in python development.
+            prefix="""You are an AI Software Engineer agent that has 10 years experience in python development.
                 You are given a task to write code, execute and solve the problem. 
                 - You have access to the shell tool to execute commands and get real output.
                 - You can install a new package if required. But always follow these below rlules:
@@ -61,91 +78,34 @@ class PythonCoder:
                 - Don't execute the code directly wit the shell tool. Execute it using python generated_code.py
                 - Use `pip list` to check if the package is installed.
                 Never assume external media files are available, for sound unless specified always generate it.
-                
-                Example interaction:
-                Example 1:
-                    Question: Write the code to print hello world
-                    
-                    Thought: I need to write the code to print hello world
-                    Action: write_code_to_file
-                    Action Input: print("Hello World)
-                    Observation: The code has been written and saved to generated_code.py
-                    
-                    Thought: I need to execute the code to see if it works
-                    Action: shell
-                    Action Input: python generated_code.py
-                    Observation: SyntaxError: unterminated string literal (detected at line 1)
-
-                    Thought: I need to fix the code to print hello world
-                    Action: write_code_to_file
-                    Action Input: print("Hello World")
-                    Observation: The code has been written and saved to generated_code.py
-
-                    Thought: I need to execute the code to see if it works
-                    Action: shell
-                    Action Input: python generated_code.py
-                    Observation: Hello World
-
-                    Final Answer: The code has been written and executed successfully
-
-                Example 2:
-                    Question: Write the code to show the scatterplot for the iris dataset
-                    
-                    Thought: I need to write the code to show the scatterplot for the iris dataset
-                    Action: write_code_to_file
-                    Action Input: import matplotlib.pyplot as plt
-                                import seaborn as sns
-                                sns.scatterplot(x='sepal_length', y='sepal_width', data=iris)
-                                plt.show()
-                    Observation: The code has been written and saved to generated_code.py
-
-                    Thought: I need to execute the code to see if it works
-                    Action: shell
-                    Action Input: python generated_code.py
-                    Observation: No module named 'seaborn'
 
-                    Thought: I need to install the seaborn package
-                    Action: shell
-                    Action Input: pip install seaborn
-                    Observation: The seaborn package has been installed
-
-                    Thought: I need to execute the code to see if it works
-                    Action: shell
-                    Action Input: python generated_code.py
-                    Observation: The scatterplot has been shown
-
-                    Final Answer: The scatterplot has been shown
-
-                Example 3:
-                    Question: Write the code to show a random cat image
-                    Thought: I need to write the code to show a random cat image
-                    Action: write_code_to_file
-                    Action Input:
-                    import requests
-                    response = requests.get('https://api.thecatapi.com/v1/images/search')
-                    image_url = response.json()[0]['url']
-                    # write the image to a file
-                    with open('cat_image.jpg', 'wb') as file:
-                        file.write(requests.get(image_url).content)
-                    # display the image
-                    display(Image(filename='cat_image.jpg'))
-                    Observation: The code has been written and saved to generated_code.py
-                    Thought: I need to execute the code to see if it works
-                    Action: shell
-                    Action Input: python generated_code.py
-                    Observation: The cat image has been shown
-                    Final Answer: The cat image has been shown
-
-                """
+                """,
+            react_kwargs={
+                "suffix": CODER_PROMPT_SUFFIX,
+                "input_variables": ["examples", "input", "agent_scratchpad"]
             }
         )
+        self.examples = ExampleLibrary(CODER_EXAMPLES)
+
+    def _inputs(self, query: str) -> dict:
+        if self.agent_mode == REACT:
+            return {"examples": self.examples.format(query), "input": query}
+        return {"input": query}
 
     def process_query(self, query: str) -> str:
         """Process a user query and return a response"""
         if not query:
             return "Empty query. Please ask a question."
         
-        response = self.agent.invoke({"input": query})
+        response = self.agent.invoke(self._inputs(query))
+        return response
+    
+    async def aprocess_query(self, query: str) -> str:
+        """Asynchronously process a user query and return a response"""
+        if not query:
+            return "Empty query. Please ask a question."
+        
+        response = await self.agent.ainvoke(self._inputs(query))
         return response
 
 if __name__ == "__main__":
@@ -155,5 +115,5 @@ if __name__ == "__main__":
             temperature=0
         ).llm
     print(llm)
-    coder_tool = PythonCoder(llm, shell_tool)
+    coder_tool = PythonCoder(llm)
     coder_tool.process_query("Write the code to show the scatterplot for the iris dataset")
\ No newline at end of file
@@ -0,0 +1,284 @@
+import asyncio
+import os
+import selectors
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMMAND_TIMEOUT = 120.0
+# Output kept in memory and returned to the caller; the rest goes to a spill file
+DEFAULT_MAX_OUTPUT_BYTES = 64 * 1024
+# Spill files kept on disk before the oldest are removed
+MAX_SPILL_FILES = 20
+# Time a command gets to exit after SIGTERM before it is killed
+KILL_GRACE_PERIOD = 2.0
+READ_CHUNK_BYTES = 64 * 1024
+
+@dataclass
+class CommandResult:
+    """Outcome of a command run by CommandExecutor
+
+    Attributes:
+        command: The command that was run
+        output: Combined stdout and stderr, bounded to the executor's output limit.
+            Truncated output keeps its head and tail
+        exit_code: Exit status, or None if the command was killed
+        total_bytes: Size of the complete output
+        truncated: Whether output was left out of `output`
+        timed_out: Whether the command was killed for running too long
+        spill_path: File holding the complete output, if it passed the limit
+        duration: Wall-clock seconds the command ran
+    """
+    command: str
+    output: str
+    exit_code: Optional[int]
+    total_bytes: int = 0
+    truncated: bool = False
+    timed_out: bool = False
+    spill_path: Optional[str] = None
+    duration: float = 0.0
+
+    def status_notes(self) -> List[str]:
+        """Notes on how the command ended, if it did not exit successfully"""
+        if self.timed_out:
+            return [f"[command timed out after {self.duration:.0f}s and was killed]"]
+        if self.exit_code:
+            return [f"[exit code {self.exit_code}]"]
+        return []
+
+    def format(self) -> str:
+        """Format the result for the agent: the output plus notes on anything unusual"""
+        notes = []
+        if self.truncated:
+            notes.append(f"[output truncated: {self.total_bytes} bytes in total, full output in {self.spill_path}]")
+        notes.extend(self.status_notes())
+        if not notes:
+            return self.output
+        return self.output + ("" if self.output.endswith("\n") or not self.output else "\n") + "\n".join(notes)
+
+class _OutputCapture:
+    """Collects output chunks, keeping the head and tail in memory and spilling the rest"""
+
+    def __init__(self, limit: int, spill_dir: Optional[str]):
+        self.limit = limit
+        self.spill_dir = spill_dir
+        self.head = bytearray()
+        self.tail: Deque[bytes] = deque()
+        self.tail_bytes = 0
+        self.total = 0
+        self.spill = None
+
+    def feed(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        if self.spill is None and self.total > self.limit:
+            self.spill = tempfile.NamedTemporaryFile(
+                prefix="aida-output-", suffix=".log", dir=self.spill_dir, delete=False
+            )
+            self.spill.write(bytes(self.head))
+            for part in self.tail:
+                self.spill.write(part)
+        if self.spill is not None:
+            self.spill.write(chunk)
+
+        room = self.limit // 2 - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self.tail.append(chunk)
+            self.tail_bytes += len(chunk)
+            # Keep whole chunks while the tail is within its half of the limit
+            while len(self.tail) > 1 and self.tail_bytes - len(self.tail[0]) >= self.limit - self.limit // 2:
+                self.tail_bytes -= len(self.tail.popleft())
+
+    def close(self) -> Optional[str]:
+        if self.spill is None:
+            return None
+        self.spill.close()
+        return self.spill.name
+
+    def text(self) -> str:
+        tail = b"".join(self.tail)
+        if self.spill is None:
+            return (bytes(self.head) + tail).decode(errors="replace")
+        # Not tail[-n:], which keeps everything when n is 0
+        tail = tail[max(0, len(tail) - (self.limit - self.limit // 2)):]
+        omitted = self.total - len(self.head) - len(tail)
+        return (
+            bytes(self.head).decode(errors="replace")
+            + f"\n... [{omitted} bytes omitted] ...\n"
+            + tail.decode(errors="replace")
+        )
+
+class CommandExecutor:
+    """Runs shell commands with a wall-clock timeout and bounded output
+
+    Commands run in their own process group so a timeout or cancellation kills
+    everything they started. Output is read incrementally; once it passes
+    `max_output_bytes` the complete output is written to a temporary file and
+    only its head and tail are kept in memory.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_COMMAND_TIMEOUT,
+                 max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES,
+                 spill_dir: Optional[str] = None):
+        """Initialize the executor
+
+        Args:
+            timeout: Default wall-clock limit per command, in seconds
+            max_output_bytes: Output kept in memory per command
+            spill_dir: Directory for spill files. Defaults to the system temp directory
+        """
+        self.timeout = timeout
+        self.max_output_bytes = max_output_bytes
+        self.spill_dir = spill_dir
+        self._spill_files: List[str] = []
+        self._lock = threading.Lock()
+
+    def _track_spill(self, path: Optional[str]) -> None:
+        if path is None:
+            return
+        with self._lock:
+            self._spill_files.append(path)
+            while len(self._spill_files) > MAX_SPILL_FILES:
+                old = self._spill_files.pop(0)
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def cleanup(self) -> None:
+        """Remove the spill files this executor created"""
+        with self._lock:
+            paths, self._spill_files = self._spill_files, []
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        """Release the executor's resources, which are only its spill files"""
+        self.cleanup()
+
+    @staticmethod
+    def _kill_group(pid: int, sig: int) -> None:
+        try:
+            os.killpg(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _result(self, command: str, capture: _OutputCapture, exit_code: Optional[int],
+                timed_out: bool, start: float) -> CommandResult:
+        spill_path = capture.close()
+        self._track_spill(spill_path)
+        return CommandResult(
+            command=command,
+            output=capture.text(),
+            exit_code=exit_code,
+            total_bytes=capture.total,
+            truncated=spill_path is not None,
+            timed_out=timed_out,
+            spill_path=spill_path,
+            duration=time.monotonic() - start
+        )
+
+    def run(self, command: str, timeout: Optional[float] = None) -> CommandResult:
+        """Run a command, blocking until it exits or times out
+
+        Args:
+            command: Shell command to run
+            timeout: Wall-clock limit in seconds. Defaults to the executor's timeout
+
+        Returns:
+            CommandResult
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        capture = _OutputCapture(self.max_output_bytes, self.spill_dir)
+        process = subprocess.Popen(
+            command, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, start_new_session=True
+        )
+        timed_out = False
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(process.stdout, selectors.EVENT_READ)
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        timed_out = True
+                        break
+                    if not selector.select(remaining):
+                        continue
+                    chunk = os.read(process.stdout.fileno(), READ_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    capture.feed(chunk)
+            if not timed_out:
+                try:
+                    process.wait(max(0.0, deadline - time.monotonic()))
+                except subprocess.TimeoutExpired:
+                    timed_out = True
+        finally:
+            if timed_out or process.poll() is None:
+                self._kill_group(process.pid, signal.SIGTERM)
+                try:
+                    process.wait(KILL_GRACE_PERIOD)
+                except subprocess.TimeoutExpired:
+                    self._kill_group(process.pid, signal.SIGKILL)
+                    process.wait()
+            process.stdout.close()
+        return self._result(command, capture, None if timed_out else process.returncode, timed_out, start)
+
+    async def arun(self, command: str, timeout: Optional[float] = None) -> CommandResult:
+        """Run a command in an asyncio subprocess
+
+        Cancelling the awaiting task kills the command's process group.
+
+        Args:
+            command: Shell command to run
+            timeout: Wall-clock limit in seconds. Defaults to the executor's timeout
+
+        Returns:
+            CommandResult
+        """
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        deadline = loop.time() + timeout
+        capture = _OutputCapture(self.max_output_bytes, self.spill_dir)
+        process = await asyncio.create_subprocess_shell(
+            command, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT, start_new_session=True
+        )
+        timed_out = False
+        try:
+            while True:
+                chunk = await asyncio.wait_for(process.stdout.read(READ_CHUNK_BYTES), deadline - loop.time())
+                if not chunk:
+                    break
+                capture.feed(chunk)
+            await asyncio.wait_for(process.wait(), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            timed_out = True
+        except asyncio.CancelledError:
+            self._track_spill(capture.close())
+            raise
+        finally:
+            if process.returncode is None:
+                self._kill_group(process.pid, signal.SIGTERM)
+                try:
+                    await asyncio.wait_for(process.wait(), KILL_GRACE_PERIOD)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    self._kill_group(process.pid, signal.SIGKILL)
+        return self._result(command, capture, None if timed_out else process.returncode, timed_out, start)
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional
+from .executor import CommandResult
+
+# Canned outputs for the commands in the scripted provider's default transcripts
+DEFAULT_OUTPUTS = {
+    "uptime": " 10:00:00 up 3 days,  2:14,  2 users,  load average: 0.42, 0.37, 0.30\n",
+    "ps": ("USER  PID %CPU %MEM    VSZ   RSS TTY STAT START TIME COMMAND\n"
+           "mysql 1201  2.1 18.4 2381740 754320 ? Ssl 10:00 5:12 /usr/sbin/mysqld\n"),
+    "df": "Filesystem      Size  Used Avail Use% Mounted on\n/dev/sda1        48G   45G  2.9G  94% /\n",
+    "du": "2.1G\t/var/lib\n4.0G\t/var/cache\n31G\t/var/log\n",
+    "who": "alice    pts/0        2024-01-31 10:00 (10.0.0.5)\nbob      pts/1        2024-01-31 10:05 (10.0.0.7)\n",
+}
+
+class FakeShell:
+    """Stands in for CommandExecutor without spawning processes
+
+    Answers each command with a canned output, looked up by the exact command
+    first and then by its program name, after a fixed latency. Commands run are
+    recorded in `commands`; `busy_seconds` is the time spent answering them.
+    """
+
+    def __init__(self, outputs: Optional[Dict[str, str]] = None, latency: float = 0.0, default_output: str = ""):
+        """Initialize the fake shell
+
+        Args:
+            outputs: Output per command or program name. Defaults to DEFAULT_OUTPUTS
+            latency: Seconds every command takes
+            default_output: Output of commands without a canned output
+        """
+        self.outputs = DEFAULT_OUTPUTS if outputs is None else outputs
+        self.latency = latency
+        self.default_output = default_output
+        self.commands: List[str] = []
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _result(self, command: str, started: float) -> CommandResult:
+        words = command.split()
+        output = self.outputs.get(command.strip())
+        if output is None and words:
+            output = self.outputs.get(words[0], self.default_output)
+        duration = time.perf_counter() - started
+        with self._lock:
+            self.commands.append(command)
+            self.busy_seconds += duration
+        return CommandResult(command=command, output=output or "", exit_code=0,
+                             total_bytes=len(output or ""), duration=duration)
+
+    def run(self, command: str, timeout: Optional[float] = None) -> CommandResult:
+        """Answer a command like CommandExecutor.run"""
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(command, started)
+
+    async def arun(self, command: str, timeout: Optional[float] = None) -> CommandResult:
+        """Answer a command like CommandExecutor.arun"""
+        started = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(command, started)
+
+    def cleanup(self) -> None:
+        """Nothing to clean up; present for CommandExecutor compatibility"""
+
+    def close(self) -> None:
+        """Nothing to close; present for CommandExecutor compatibility"""
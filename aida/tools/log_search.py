@@ -0,0 +1,370 @@
+import calendar
+import json
+import mmap
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bytes between entries of the sparse timestamp index
+INDEX_STRIDE = 64 * 1024
+# Most bytes scanned for one query; larger ranges scan their newest part
+MAX_SCAN_BYTES = 256 * 1024 * 1024
+MAX_SAMPLE_LINES = 8
+MAX_LINE_CHARS = 300
+# Bytes at the start of a line searched for a timestamp
+TIMESTAMP_WINDOW = 100
+DEFAULT_LOG_FILES = ["/var/log/syslog", "/var/log/messages", "/var/log/daemon.log"]
+DEFAULT_PATTERN = r"error|fail|crit|fatal|panic|warn"
+
+LEVELS = {
+    "critical": re.compile(rb"(?i)\b(crit(ical)?|fatal|panic|emerg(ency)?|alert)\b"),
+    "error": re.compile(rb"(?i)\b(err(or)?)\b"),
+    "warning": re.compile(rb"(?i)\b(warn(ing)?)\b"),
+}
+
+MONTHS = {name: index for index, name in enumerate(
+    [b"Jan", b"Feb", b"Mar", b"Apr", b"May", b"Jun", b"Jul", b"Aug", b"Sep", b"Oct", b"Nov", b"Dec"], 1)}
+_MONTH = rb"(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)"
+# Apache/nginx access logs: 31/Jan/2024:10:00:00 +0000
+CLF_TIMESTAMP = re.compile(rb"(\d{2})/" + _MONTH + rb"/(\d{4}):(\d{2}):(\d{2}):(\d{2}) ([+-]\d{4})")
+# ISO 8601 and nginx error logs: 2024-01-31T10:00:00(.123)(Z|+01:00), 2024/01/31 10:00:00
+ISO_TIMESTAMP = re.compile(rb"(\d{4})[-/](\d{2})[-/](\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:[.,]\d+)?(Z|[+-]\d{2}:?\d{2})?")
+# Traditional syslog: Jan 31 10:00:00 (no year)
+SYSLOG_TIMESTAMP = re.compile(rb"\b" + _MONTH + rb" +(\d{1,2}) (\d{2}):(\d{2}):(\d{2})")
+
+_DIGITS = re.compile(r"0x[0-9a-fA-F]+|\d+")
+_ANY_TIMESTAMP = re.compile("|".join(
+    f"(?:{stamp.pattern.decode()})" for stamp in (ISO_TIMESTAMP, CLF_TIMESTAMP, SYSLOG_TIMESTAMP)
+))
+
+def _offset(text: bytes) -> timezone:
+    text = text.replace(b":", b"")
+    sign = -1 if text[:1] == b"-" else 1
+    return timezone(sign * timedelta(hours=int(text[1:3]), minutes=int(text[3:5])))
+
+def parse_timestamp(line: bytes, year: int) -> Optional[float]:
+    """Find a timestamp near the start of a log line and return it as a Unix time
+
+    Times without a zone are taken as local time. Syslog lines carry no year,
+    so `year` is used for them, or the leap year before it for Feb 29. A
+    timestamp with an out-of-range field counts as no timestamp.
+    """
+    try:
+        return _parse_timestamp(line[:TIMESTAMP_WINDOW], year)
+    except (ValueError, OverflowError):
+        return None
+
+def _parse_timestamp(head: bytes, year: int) -> Optional[float]:
+    match = ISO_TIMESTAMP.search(head)
+    if match:
+        y, mo, d, h, mi, s, zone = match.groups()
+        moment = datetime(int(y), int(mo), int(d), int(h), int(mi), int(s))
+        if zone:
+            moment = moment.replace(tzinfo=timezone.utc if zone == b"Z" else _offset(zone))
+        return moment.timestamp()
+    match = CLF_TIMESTAMP.search(head)
+    if match:
+        d, mo, y, h, mi, s, zone = match.groups()
+        return datetime(int(y), MONTHS[mo], int(d), int(h), int(mi), int(s), tzinfo=_offset(zone)).timestamp()
+    match = SYSLOG_TIMESTAMP.search(head)
+    if match:
+        mo, d, h, mi, s = match.groups()
+        if mo == b"Feb" and d == b"29":
+            while not calendar.isleap(year):
+                year -= 1
+        return datetime(year, MONTHS[mo], int(d), int(h), int(mi), int(s)).timestamp()
+    return None
+
+class LogIndex:
+    """Sparse timestamp -> byte offset index over a memory-mapped log file
+
+    Every INDEX_STRIDE bytes the first timestamped line is recorded, so a time
+    range maps to byte offsets with a binary search and at most one stride of
+    line-by-line scanning at each end. The index is extended when the file grows
+    and rebuilt when it is rotated or truncated.
+    """
+
+    def __init__(self, path: str, stride: int = INDEX_STRIDE):
+        self.path = path
+        self.stride = stride
+        self._map: Optional[mmap.mmap] = None
+        self._identity: Optional[Tuple[int, int]] = None
+        self.size = 0
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.times = np.zeros(0, dtype=np.float64)
+        self._indexed_to = 0
+
+    @property
+    def map(self) -> Optional[mmap.mmap]:
+        return self._map
+
+    def refresh(self) -> None:
+        """Map the current file, extending or rebuilding the index as needed"""
+        stat = os.stat(self.path)
+        identity = (stat.st_dev, stat.st_ino)
+        if identity != self._identity or stat.st_size < self.size:
+            # New file or rotated/truncated: start over
+            self._identity = identity
+            self.offsets = np.zeros(0, dtype=np.int64)
+            self.times = np.zeros(0, dtype=np.float64)
+            self._indexed_to = 0
+        elif stat.st_size == self.size:
+            return
+
+        self.close()
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.year = datetime.fromtimestamp(stat.st_mtime).year
+        if self.size:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._extend()
+
+    def _extend(self) -> None:
+        # The last indexed stride may have been partial, so index again from its start
+        resume = self._indexed_to
+        keep = int(np.searchsorted(self.offsets, resume))
+        offsets, times = self.offsets[:keep].tolist(), self.times[:keep].tolist()
+        position = resume
+        while position < self.size:
+            start = self.line_start_after(position)
+            stamped = self._next_timestamp(start, min(self.size, start + self.stride))
+            if stamped is not None and (not offsets or stamped[0] > offsets[-1]):
+                offsets.append(stamped[0])
+                times.append(stamped[1])
+            position += self.stride
+        self._indexed_to = max(resume, position - self.stride)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        # Logs are almost ordered; make the index monotonic so binary search is safe
+        self.times = np.maximum.accumulate(np.asarray(times, dtype=np.float64)) if times else np.zeros(0)
+
+    def line_start_after(self, position: int) -> int:
+        """Offset of the first line starting at or after `position`"""
+        if position <= 0:
+            return 0
+        newline = self._map.find(b"\n", position - 1)
+        return self.size if newline < 0 else newline + 1
+
+    def lines(self, start: int, end: int):
+        """Iterate over (offset, line) pairs between two line-aligned offsets"""
+        position = start
+        while position < end:
+            newline = self._map.find(b"\n", position, end)
+            stop = end if newline < 0 else newline + 1
+            yield position, self._map[position:stop]
+            position = stop
+
+    def stamp(self, line: bytes) -> Optional[float]:
+        """Timestamp of a line, placing year-less syslog times before the file's last write"""
+        moment = parse_timestamp(line, self.year)
+        if moment is not None and moment > self.mtime + 86400:
+            moment = parse_timestamp(line, self.year - 1)
+        return moment
+
+    def _next_timestamp(self, start: int, end: int) -> Optional[Tuple[int, float]]:
+        for offset, line in self.lines(start, end):
+            stamp = self.stamp(line)
+            if stamp is not None:
+                return offset, stamp
+        return None
+
+    def offset_for_time(self, moment: float) -> int:
+        """Offset of the first line stamped at or after `moment`"""
+        if not len(self.times):
+            return 0
+        i = int(np.searchsorted(self.times, moment, side="left")) - 1
+        if i < 0:
+            return 0
+        start = int(self.offsets[i])
+        # Scan at most to the next indexed line past the target
+        j = int(np.searchsorted(self.times, moment, side="right"))
+        end = int(self.offsets[j]) if j < len(self.offsets) else self.size
+        for offset, line in self.lines(start, end):
+            stamp = self.stamp(line)
+            if stamp is not None and stamp >= moment:
+                return offset
+        return end
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+def parse_time_spec(spec: str, now: Optional[float] = None) -> float:
+    """Parse "1h", "30m", "2d", "90s" (ago) or an ISO date/time into a Unix time"""
+    now = time.time() if now is None else now
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*(s|sec|m|min|h|hr|hours?|d|days?)", spec.strip().lower())
+    if match:
+        value, unit = float(match.group(1)), match.group(2)[0]
+        return now - value * {"s": 1, "m": 60, "h": 3600, "d": 86400}[unit]
+    return datetime.fromisoformat(spec.strip()).timestamp()
+
+class LogSearch:
+    """Answers time-range and pattern questions about large log files
+
+    Indexes are kept per file and refreshed incrementally between queries, so
+    repeated questions about a multi-GB log only scan the requested range.
+    """
+
+    def __init__(self, max_scan_bytes: int = MAX_SCAN_BYTES, stride: int = INDEX_STRIDE):
+        """Initialize the searcher
+
+        Args:
+            max_scan_bytes: Most bytes scanned per query; larger ranges scan their newest part
+            stride: Bytes between sparse index entries
+        """
+        self.max_scan_bytes = max_scan_bytes
+        self.stride = stride
+        self._indexes: Dict[str, LogIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, path: str) -> LogIndex:
+        path = os.path.realpath(path)
+        with self._lock:
+            index = self._indexes.get(path)
+            if index is None:
+                index = self._indexes[path] = LogIndex(path, self.stride)
+            index.refresh()
+            return index
+
+    def search(self, path: str, since: Optional[float] = None, until: Optional[float] = None,
+               pattern: Optional[str] = None, samples: int = MAX_SAMPLE_LINES) -> Dict:
+        """Count and sample the lines of a log matching a time range and pattern
+
+        Args:
+            path: Log file
+            since: Only lines stamped at or after this Unix time
+            until: Only lines stamped before this Unix time
+            pattern: Case-insensitive regular expression. Defaults to errors and warnings
+            samples: Number of matching lines returned
+
+        Returns:
+            Dict with the scanned range, match and level counts, the most common
+            messages and sample lines
+        """
+        index = self._index(path)
+        result = {"file": path, "size_bytes": index.size}
+        if index.map is None:
+            return {**result, "matches": 0}
+
+        start = index.offset_for_time(since) if since is not None else 0
+        end = index.offset_for_time(until) if until is not None else index.size
+        if end - start > self.max_scan_bytes:
+            start = index.line_start_after(end - self.max_scan_bytes)
+            result["note"] = f"range larger than {self.max_scan_bytes} bytes; only its newest part was scanned"
+        result["scanned_bytes"] = max(0, end - start)
+
+        try:
+            regex = re.compile((pattern or DEFAULT_PATTERN).encode(), re.IGNORECASE)
+        except re.error:
+            regex = re.compile(re.escape(pattern.encode()), re.IGNORECASE)
+
+        matching: List[Tuple[int, bytes]] = []
+        last_line = -1
+        count = 0
+        for match in regex.finditer(index.map, start, end):
+            line_start = index.map.rfind(b"\n", start, match.start()) + 1 or start
+            if line_start == last_line:
+                continue
+            last_line = line_start
+            count += 1
+            if len(matching) < 10000:
+                line_end = index.map.find(b"\n", match.end(), end)
+                matching.append((line_start, index.map[line_start:line_end if line_end >= 0 else end]))
+
+        levels = Counter()
+        messages = Counter()
+        for _, line in matching:
+            for level, level_regex in LEVELS.items():
+                if level_regex.search(line):
+                    levels[level] += 1
+                    break
+            messages[self._shape(line)] += 1
+
+        shown = matching[:samples // 2] + matching[max(samples // 2, len(matching) - (samples - samples // 2)):]
+        return {
+            **result,
+            "pattern": regex.pattern.decode(errors="replace"),
+            "first_timestamp": self._format_time(index, start, end),
+            "matches": count,
+            "levels": dict(levels),
+            "top_messages": [{"count": n, "message": message} for message, n in messages.most_common(5)],
+            "samples": [self._clip(line) for _, line in shown],
+        }
+
+    @staticmethod
+    def _shape(line: bytes) -> str:
+        """Reduce a line to its message shape: no timestamp, numbers replaced by #"""
+        text = _ANY_TIMESTAMP.sub("", line[:TIMESTAMP_WINDOW * 3].decode(errors="replace"), count=1)
+        return _DIGITS.sub("#", text).strip()[:MAX_LINE_CHARS]
+
+    @staticmethod
+    def _clip(line: bytes) -> str:
+        text = line.decode(errors="replace").rstrip("\n")
+        return text if len(text) <= MAX_LINE_CHARS else text[:MAX_LINE_CHARS] + " ..."
+
+    @staticmethod
+    def _format_time(index: LogIndex, start: int, end: int) -> Optional[str]:
+        for offset, line in index.lines(start, min(end, start + index.stride)):
+            stamp = index.stamp(line)
+            if stamp is not None:
+                return datetime.fromtimestamp(stamp).strftime("%Y-%m-%d %H:%M:%S")
+        return None
+
+    def run(self, tool_input: str) -> str:
+        """Entry point for the log_search tool
+
+        Takes JSON or key=value pairs: path, since, until, pattern. since and
+        until are durations ago ("1h", "30m") or ISO times.
+        """
+        options = self._parse_input(tool_input)
+        path = options.get("path") or next((p for p in DEFAULT_LOG_FILES if os.path.exists(p)), None)
+        if not path:
+            return json.dumps({"error": "no path given and no system log found"})
+        try:
+            since = parse_time_spec(options["since"]) if options.get("since") else None
+            until = parse_time_spec(options["until"]) if options.get("until") else None
+            result = self.search(path, since=since, until=until, pattern=options.get("pattern"))
+        except (OSError, ValueError) as e:
+            return json.dumps({"path": path, "error": str(e)})
+        return json.dumps(result, separators=(",", ":"))
+
+    @staticmethod
+    def _parse_input(tool_input: str) -> Dict[str, str]:
+        tool_input = tool_input.strip()
+        if tool_input.startswith("{"):
+            try:
+                return {k: str(v) for k, v in json.loads(tool_input).items() if v is not None}
+            except ValueError:
+                pass
+        options = {}
+        for key, value in re.findall(r"(\w+)\s*=\s*(\"[^\"]*\"|'[^']*'|\S+)", tool_input):
+            options[key.lower()] = value.strip("\"'")
+        if not options and tool_input.startswith("/"):
+            options["path"] = tool_input.split()[0]
+        return options
+
+    def close(self) -> None:
+        """Unmap every indexed file"""
+        with self._lock:
+            for index in self._indexes.values():
+                index.close()
+            self._indexes = {}
+
+LOG_SEARCH_DESCRIPTION = """Search a large log file by time range and pattern without reading it all.
+            Returns JSON with match counts by level, the most common messages and sample lines.
+            Input: key=value pairs. path (defaults to the system log), since and until ("1h", "30m", "2d" ago,
+            or an ISO time like 2024-01-31T10:00), pattern (case-insensitive regex, defaults to errors and warnings).
+            Example:
+            Action: log_search
+            Action Input: path=/var/log/nginx/error.log since=1h pattern=upstream
+            Observation: JSON with matches, levels (counts by level), top_messages and samples
+            """
@@ -0,0 +1,264 @@
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+import logging
+from .executor import CommandResult
+
+logger = logging.getLogger(__name__)
+
+# Observations larger than this many bytes are stored off-prompt and digested
+DEFAULT_DIGEST_THRESHOLD = 4000
+DIGEST_HEAD_LINES = 15
+DIGEST_TAIL_LINES = 15
+# Longest line shown in a digest or page, so one huge line cannot blow the budget
+MAX_LINE_CHARS = 200
+DEFAULT_READ_LIMIT = 50
+# Stored outputs kept before the oldest are dropped
+MAX_STORED_OUTPUTS = 50
+
+# Counted in every stored output so the agent knows whether paging in more is worthwhile
+MATCH_PATTERNS = {
+    "error": re.compile(rb"(?i)\berror"),
+    "warning": re.compile(rb"(?i)\bwarn"),
+    "failed": re.compile(rb"(?i)\bfail"),
+    "denied": re.compile(rb"(?i)denied|not permitted"),
+}
+
+# Digests and read_output pages start like this; they are already sized for the prompt
+_STORE_OUTPUT = re.compile(r"\[(Output out-\d+ stored off-prompt|out-\d+ lines \d+-)")
+
+READ_OUTPUT_DESCRIPTION = """Read more lines of a large output that was stored off-prompt.
+            Input: the output id, the first line to read (0 is the first line) and the number of lines, separated by spaces.
+            Example:
+            Action: read_output
+            Action Input: out-3 100 50
+            Observation: lines 100-149 of out-3
+            """
+
+@dataclass
+class StoredOutput:
+    """A large output kept on disk and memory-mapped for paging"""
+    id: str
+    label: str
+    path: str
+    owned: bool
+    map: Optional[mmap.mmap]
+    size: int
+    line_starts: np.ndarray = field(repr=False)
+    notes: list = field(default_factory=list)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_starts)
+
+    def line(self, index: int) -> str:
+        start = int(self.line_starts[index])
+        end = int(self.line_starts[index + 1]) if index + 1 < self.line_count else self.size
+        text = self.map[start:end].decode(errors="replace").rstrip("\n")
+        if len(text) > MAX_LINE_CHARS:
+            text = text[:MAX_LINE_CHARS] + f" ... [{len(text) - MAX_LINE_CHARS} more characters]"
+        return text
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.owned:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+class OutputStore:
+    """Keeps large tool outputs off the prompt
+
+    Outputs over the threshold are memory-mapped from a file (the executor's
+    spill file, or one written here) and replaced in the scratchpad by a digest
+    with line and match counts, head and tail. The read_output tool pages in
+    more lines on request, so the tokens spent per agent step stay flat no
+    matter how large an output is.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_DIGEST_THRESHOLD, spill_dir: Optional[str] = None,
+                 max_outputs: int = MAX_STORED_OUTPUTS):
+        """Initialize the store
+
+        Args:
+            threshold: Outputs larger than this many bytes are stored and digested. 0 disables digests
+            spill_dir: Directory for files written by the store. Defaults to the system temp directory
+            max_outputs: Stored outputs kept before the oldest are dropped
+        """
+        self.threshold = threshold
+        self.spill_dir = spill_dir
+        self.max_outputs = max_outputs
+        self._outputs: "OrderedDict[str, StoredOutput]" = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._outputs)
+
+    def _write(self, text: str) -> str:
+        with tempfile.NamedTemporaryFile(prefix="aida-output-", suffix=".log", dir=self.spill_dir,
+                                         delete=False) as f:
+            f.write(text.encode())
+        return f.name
+
+    def observe(self, text: str, label: str = "") -> str:
+        """Return a tool output as is, or a digest if it is over the threshold
+
+        Digests and pages produced by this store are returned as is, so tools
+        that digest their own output (the shell) are never digested twice.
+        """
+        if not isinstance(text, str) or not self.threshold or len(text.encode()) <= self.threshold:
+            return text
+        if _STORE_OUTPUT.match(text):
+            return text
+        return self.digest(self._add(self._write(text), label, owned=True))
+
+    def observe_result(self, result: CommandResult) -> str:
+        """Format a command result for the agent, digesting it if it is over the threshold"""
+        text = result.format()
+        if not self.threshold or (result.total_bytes <= self.threshold and len(text.encode()) <= self.threshold):
+            return text
+        if result.spill_path is not None:
+            # The executor's spill file already holds the complete output
+            stored = self._add(result.spill_path, result.command, owned=False, notes=result.status_notes())
+        else:
+            stored = self._add(self._write(result.output), result.command, owned=True, notes=result.status_notes())
+        return self.digest(stored)
+
+    def _add(self, path: str, label: str, owned: bool, notes: Optional[list] = None) -> StoredOutput:
+        size = os.path.getsize(path)
+        output_map = None
+        line_starts = np.zeros(0, dtype=np.int64)
+        if size:
+            with open(path, "rb") as f:
+                output_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            data = np.frombuffer(output_map, dtype=np.uint8)
+            newlines = np.flatnonzero(data == ord("\n"))
+            del data  # release the buffer so the map can be closed later
+            line_starts = np.concatenate(([0], newlines + 1))
+            if line_starts[-1] >= size:
+                line_starts = line_starts[:-1]
+
+        with self._lock:
+            output_id = f"out-{self._next_id}"
+            self._next_id += 1
+            stored = StoredOutput(id=output_id, label=label, path=path, owned=owned, map=output_map,
+                                  size=size, line_starts=line_starts, notes=notes or [])
+            self._outputs[output_id] = stored
+            while len(self._outputs) > self.max_outputs:
+                _, old = self._outputs.popitem(last=False)
+                old.close()
+        return stored
+
+    def get(self, output_id: str) -> Optional[StoredOutput]:
+        """Get a stored output by id"""
+        with self._lock:
+            return self._outputs.get(output_id)
+
+    def match_counts(self, stored: StoredOutput) -> dict:
+        """Count occurrences of MATCH_PATTERNS in a stored output"""
+        if stored.map is None:
+            return {name: 0 for name in MATCH_PATTERNS}
+        return {name: sum(1 for _ in pattern.finditer(stored.map)) for name, pattern in MATCH_PATTERNS.items()}
+
+    def digest(self, stored: StoredOutput) -> str:
+        """Summarize a stored output: size, match counts, head and tail
+
+        Head and tail lines are cut short to keep the digest under the threshold.
+        """
+        counts = ", ".join(f"{name} {count}" for name, count in self.match_counts(stored).items())
+        header = [f"[Output {stored.id} stored off-prompt: {stored.line_count} lines, {stored.size} bytes. "
+                  f"Matches: {counts}]"]
+        header.extend(stored.notes)
+        footer = f'[Use read_output with "{stored.id} <first line> <number of lines>" to read more]'
+        # 100 bytes are left for the "First/Last n lines:" labels
+        budget = ((self.threshold or DEFAULT_DIGEST_THRESHOLD) - len(footer)
+                  - sum(len(line.encode()) + 1 for line in header) - 100)
+
+        head = self._fit(stored, range(min(DIGEST_HEAD_LINES, stored.line_count)), budget // 2)
+        budget -= sum(len(line.encode()) + 1 for line in head)
+        tail_start = max(len(head), stored.line_count - DIGEST_TAIL_LINES)
+        tail = self._fit(stored, range(stored.line_count - 1, tail_start - 1, -1), budget)[::-1]
+
+        lines = header
+        if head:
+            lines.append(f"First {len(head)} lines:")
+            lines.extend(head)
+        if tail:
+            lines.append(f"Last {len(tail)} lines:")
+            lines.extend(tail)
+        lines.append(footer)
+        return "\n".join(lines)
+
+    def _fit(self, stored: StoredOutput, indexes: range, budget: int) -> list:
+        """Lines at indexes, in that order, until they would take more than budget bytes"""
+        lines = []
+        for index in indexes:
+            text = stored.line(index)
+            budget -= len(text.encode()) + 1
+            if budget < 0:
+                break
+            lines.append(text)
+        return lines
+
+    def read(self, output_id: str, offset: int = 0, limit: int = DEFAULT_READ_LIMIT) -> str:
+        """Read a page of lines from a stored output
+
+        Pages are cut short to stay under the digest threshold.
+
+        Args:
+            output_id: Id from the digest, e.g. "out-3"
+            offset: First line to read, starting at 0
+            limit: Maximum number of lines to read
+
+        Returns:
+            The lines, with a header saying which lines they are
+        """
+        stored = self.get(output_id)
+        if stored is None:
+            return f"Unknown output id '{output_id}'. Stored outputs: {', '.join(self._outputs) or 'none'}"
+        offset = max(0, offset)
+        end = min(stored.line_count, offset + max(1, limit))
+        if offset >= stored.line_count:
+            return f"{output_id} has only {stored.line_count} lines"
+
+        budget = (self.threshold or DEFAULT_DIGEST_THRESHOLD) - 200
+        lines = []
+        used = 0
+        for index in range(offset, end):
+            text = stored.line(index)
+            used += len(text) + 1
+            if used > budget and lines:
+                end = index
+                break
+            lines.append(text)
+        header = f"[{output_id} lines {offset}-{end - 1} of {stored.line_count}]"
+        if end < stored.line_count:
+            header += f" [continue with \"{output_id} {end} {limit}\"]"
+        return "\n".join([header] + lines)
+
+    def read_tool(self, tool_input: str) -> str:
+        """Entry point for the read_output tool, taking "id offset limit" as one string"""
+        match = re.search(r"out-\d+", tool_input)
+        if match is None:
+            return 'Input must start with an output id, e.g. "out-3 0 50"'
+        numbers = [int(n) for n in re.findall(r"\b\d+\b", tool_input[match.end():])]
+        offset = numbers[0] if numbers else 0
+        limit = numbers[1] if len(numbers) > 1 else DEFAULT_READ_LIMIT
+        return self.read(match.group(0), offset, limit)
+
+    def close(self) -> None:
+        """Drop every stored output"""
+        with self._lock:
+            outputs, self._outputs = list(self._outputs.values()), OrderedDict()
+        for stored in outputs:
+            stored.close()
@@ -0,0 +1,138 @@
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Union
+from langchain.agents import Tool
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ToolSpec:
+    """Declaration of a tool whose implementation is built on first use
+
+    Attributes:
+        name: Tool name shown to the agent
+        description: Tool description shown to the agent
+        build: Zero-argument callable returning the tool implementation
+        func_name: Method of the implementation used for synchronous calls
+        coroutine_name: Method used for asynchronous calls, if the implementation has one
+    """
+    name: str
+    description: str
+    build: Callable[[], Any]
+    func_name: str = "run"
+    coroutine_name: Optional[str] = "arun"
+
+class LazyToolLoader:
+    """Builds a tool implementation the first time the agent calls it"""
+
+    def __init__(self, spec: ToolSpec):
+        self.spec = spec
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        """Return the tool implementation, building it if needed"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    logger.info("Loading tool '%s'", self.spec.name)
+                    self._instance = self.spec.build()
+        return self._instance
+
+    def run(self, *args, **kwargs) -> Any:
+        return getattr(self.get(), self.spec.func_name)(*args, **kwargs)
+
+    async def arun(self, *args, **kwargs) -> Any:
+        return await getattr(self.get(), self.spec.coroutine_name)(*args, **kwargs)
+
+class ToolRegistry:
+    """Registry of the tools available to an agent
+
+    Tools are either registered ready-made (cheap tools such as the shell) or
+    declared with a ToolSpec, in which case only their name and description
+    exist until the agent calls them.
+    """
+
+    def __init__(self):
+        self._tools: Dict[str, Union[Tool, ToolSpec]] = {}
+        self._loaders: Dict[str, LazyToolLoader] = {}
+
+    def add(self, tool: Tool) -> None:
+        """Register an already constructed tool"""
+        self._tools[tool.name] = tool
+
+    def register(self, spec: ToolSpec) -> None:
+        """Register a tool to be built on first use"""
+        self._tools[spec.name] = spec
+
+    def names(self) -> List[str]:
+        """Get the names of all registered tools"""
+        return list(self._tools.keys())
+
+    def is_loaded(self, name: str) -> bool:
+        """Return whether a lazily declared tool has been built yet"""
+        loader = self._loaders.get(name)
+        return loader is not None and loader.loaded
+
+    def build_tools(self, enabled: Optional[List[str]] = None, disabled: Optional[List[str]] = None,
+                    output_filter: Optional[Callable[[Any, str], Any]] = None, memo=None) -> List[Tool]:
+        """Create the agent tools, without building lazy tool implementations
+
+        Args:
+            enabled: Names of the tools to include. None includes every registered tool
+            disabled: Names of tools to leave out
+            output_filter: Optional callable applied to every tool output, with the tool name
+            memo: Optional ToolMemo that answers repeated read-only calls within an agent run
+
+        Returns:
+            List of LangChain tools
+
+        Raises:
+            ValueError: If a tool name is not registered
+        """
+        unknown = [name for name in (enabled or []) + (disabled or []) if name not in self._tools]
+        if unknown:
+            raise ValueError(f"Unknown tools: {unknown}. Available tools: {self.names()}")
+
+        tools = []
+        for name, tool in self._tools.items():
+            if enabled is not None and name not in enabled:
+                continue
+            if disabled and name in disabled:
+                continue
+            if isinstance(tool, ToolSpec):
+                loader = self._loaders.setdefault(name, LazyToolLoader(tool))
+                tool = Tool(
+                    name=tool.name,
+                    func=loader.run,
+                    coroutine=loader.arun if tool.coroutine_name else None,
+                    description=tool.description
+                )
+            if output_filter is not None:
+                tool = _filtered(tool, output_filter)
+            if memo is not None:
+                tool = memo.wrap(tool)
+            tools.append(tool)
+        return tools
+
+def _filtered(tool: Tool, output_filter: Callable[[Any, str], Any]) -> Tool:
+    """Wrap a tool so its output passes through output_filter"""
+    func, coroutine = tool.func, tool.coroutine
+
+    def run(*args, **kwargs):
+        return output_filter(func(*args, **kwargs), tool.name)
+
+    async def arun(*args, **kwargs):
+        return output_filter(await coroutine(*args, **kwargs), tool.name)
+
+    return Tool(
+        name=tool.name,
+        func=run,
+        coroutine=arun if coroutine else None,
+        description=tool.description
+    )
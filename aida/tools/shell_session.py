@@ -0,0 +1,186 @@
+import asyncio
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from typing import Optional
+import logging
+from .executor import (CommandExecutor, CommandResult, _OutputCapture, DEFAULT_COMMAND_TIMEOUT,
+                       DEFAULT_MAX_OUTPUT_BYTES, KILL_GRACE_PERIOD, READ_CHUNK_BYTES)
+
+logger = logging.getLogger(__name__)
+
+# Commands run by one bash process before it is replaced, to bound leaked state
+MAX_COMMANDS_PER_SHELL = 500
+RESET_NOTE = "[shell session restarted: working directory and environment were reset]"
+
+class ShellSession(CommandExecutor):
+    """A long-lived bash process that runs commands one at a time
+
+    Each command is sent as `eval '<command>' < /dev/null` followed by a printf
+    of a random sentinel and the command's exit status, so output and exit
+    codes are framed without spawning a shell per command. `cd`, `export` and
+    sudo credential caching persist between commands.
+
+    The shell is started on first use and replaced when it exits (e.g. after
+    `exit`), when a command times out or is cancelled, and after
+    MAX_COMMANDS_PER_SHELL commands. Results after a replacement say so.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_COMMAND_TIMEOUT,
+                 max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES,
+                 spill_dir: Optional[str] = None, max_commands: int = MAX_COMMANDS_PER_SHELL):
+        """Initialize the session; bash itself starts with the first command
+
+        Args:
+            timeout: Default wall-clock limit per command, in seconds
+            max_output_bytes: Output kept in memory per command
+            spill_dir: Directory for spill files. Defaults to the system temp directory
+            max_commands: Commands run before the shell is replaced
+        """
+        super().__init__(timeout=timeout, max_output_bytes=max_output_bytes, spill_dir=spill_dir)
+        self.max_commands = max_commands
+        self._process: Optional[subprocess.Popen] = None
+        self._commands_run = 0
+        self._restarted = False
+        self._run_lock = threading.Lock()
+        self.restarts = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def _start(self) -> None:
+        if self._process is not None:
+            # Any later result must mention that state was lost
+            self._restarted = True
+            self.restarts += 1
+        self._sentinel = f"__AIDA_DONE_{uuid.uuid4().hex}__".encode()
+        self._process = subprocess.Popen(
+            ["bash", "--noprofile", "--norc"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, start_new_session=True
+        )
+        self._commands_run = 0
+
+    def _stop(self) -> None:
+        process = self._process
+        if process is None:
+            return
+        if process.poll() is None:
+            self._kill_group(process.pid, signal.SIGTERM)
+            try:
+                process.wait(KILL_GRACE_PERIOD)
+            except subprocess.TimeoutExpired:
+                self._kill_group(process.pid, signal.SIGKILL)
+                process.wait()
+        for stream in (process.stdin, process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        """Stop the shell and remove its spill files"""
+        with self._run_lock:
+            self._stop()
+            self._process = None
+        super().close()
+
+    def run(self, command: str, timeout: Optional[float] = None) -> CommandResult:
+        """Run a command in the session's shell
+
+        Args:
+            command: Shell command to run
+            timeout: Wall-clock limit in seconds. Defaults to the session's timeout
+
+        Returns:
+            CommandResult
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._run_lock:
+            if not self.alive or self._commands_run >= self.max_commands:
+                self._stop()
+                self._start()
+            self._commands_run += 1
+            start = time.monotonic()
+            capture = _OutputCapture(self.max_output_bytes, self.spill_dir)
+            notes_restart, self._restarted = self._restarted, False
+
+            process = self._process
+            framed = (
+                f"eval {shlex.quote(command)} < /dev/null\n"
+                f"printf '%s %d\\n' '{self._sentinel.decode()}' \"$?\"\n"
+            )
+            exit_code, timed_out = None, False
+            try:
+                process.stdin.write(framed.encode())
+                process.stdin.flush()
+                exit_code, timed_out = self._read_until_sentinel(process, capture, start + timeout)
+            except (BrokenPipeError, OSError) as e:
+                logger.warning("Shell session failed: %s", str(e))
+            if exit_code is None:
+                # Timed out, or the shell exited (e.g. the command ran `exit`)
+                if not timed_out:
+                    try:
+                        exit_code = process.wait(KILL_GRACE_PERIOD)
+                    except subprocess.TimeoutExpired:
+                        pass
+                self._stop()
+
+            result = self._result(command, capture, exit_code, timed_out, start)
+            if notes_restart:
+                result.output = f"{RESET_NOTE}\n{result.output}"
+            return result
+
+    def _read_until_sentinel(self, process: subprocess.Popen, capture: _OutputCapture, deadline: float):
+        """Read output until the sentinel line. Returns (exit code, timed out)"""
+        fd = process.stdout.fileno()
+        held = b""
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    capture.feed(held)
+                    return None, True
+                if not selector.select(remaining):
+                    continue
+                chunk = os.read(fd, READ_CHUNK_BYTES)
+                if not chunk:
+                    capture.feed(held)
+                    return None, False
+                held += chunk
+                index = held.find(self._sentinel)
+                if index >= 0:
+                    end = held.find(b"\n", index)
+                    if end < 0:
+                        continue
+                    capture.feed(held[:index])
+                    return int(held[index + len(self._sentinel):end]), False
+                # Hold back enough bytes to recognize a sentinel split across reads
+                keep = len(self._sentinel)
+                if len(held) > keep:
+                    capture.feed(held[:-keep])
+                    held = held[-keep:]
+
+    async def arun(self, command: str, timeout: Optional[float] = None) -> CommandResult:
+        """Run a command in the session's shell without blocking the event loop
+
+        Commands still run one at a time. Cancelling the awaiting task kills the
+        shell, which is replaced on the next command.
+        """
+        try:
+            return await asyncio.to_thread(self.run, command, timeout)
+        except asyncio.CancelledError:
+            process = self._process
+            if process is not None and process.poll() is None:
+                self._kill_group(process.pid, signal.SIGKILL)
+            raise
+
+    def has_sudo_credentials(self) -> bool:
+        """Return whether sudo can run in this session without asking for a password"""
+        return self.run("sudo -n true", timeout=5).exit_code == 0
@@ -0,0 +1,321 @@
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from langchain.agents import Tool
+import logging
+
+logger = logging.getLogger(__name__)
+
+# CPU usage is measured over this interval when there is no recent sample to compare with
+CPU_SAMPLE_INTERVAL = 0.25
+# A previous /proc/stat sample younger than this is used as the start of the interval
+CPU_SAMPLE_MAX_AGE = 60.0
+
+# Filesystems that never hold user data
+PSEUDO_FILESYSTEMS = {
+    "proc", "sysfs", "devtmpfs", "devpts", "tmpfs", "cgroup", "cgroup2", "securityfs", "pstore",
+    "debugfs", "tracefs", "configfs", "fusectl", "mqueue", "hugetlbfs", "bpf", "autofs", "binfmt_misc",
+    "rpc_pipefs", "nsfs", "ramfs", "efivarfs", "squashfs",
+}
+
+UTMP_PATHS = ["/run/utmp", "/var/run/utmp"]
+# struct utmp from <utmp.h> on Linux
+UTMP_RECORD = struct.Struct("<h2xi32s4s32s256shhiii4i20x")
+USER_PROCESS = 7
+
+TCP_LISTEN = "0A"
+UDP_UNCONNECTED = "07"
+
+_cpu_lock = threading.Lock()
+_last_cpu_sample: Optional[Tuple[float, List[List[int]]]] = None
+
+def _dumps(data) -> str:
+    return json.dumps(data, separators=(",", ":"))
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+def _read_cpu_times() -> List[List[int]]:
+    """Read the aggregate and per-CPU jiffy counters from /proc/stat"""
+    return [
+        [int(value) for value in line.split()[1:]]
+        for line in _read("/proc/stat").splitlines()
+        if line.startswith("cpu")
+    ]
+
+def _busy_percent(before: List[int], after: List[int]) -> Tuple[float, float]:
+    deltas = [b - a for a, b in zip(before, after)]
+    total = sum(deltas[:8])  # guest time is already counted in user time
+    if total <= 0:
+        return 0.0, 0.0
+    idle = deltas[3] + (deltas[4] if len(deltas) > 4 else 0)
+    iowait = deltas[4] if len(deltas) > 4 else 0
+    return round(100 * (total - idle) / total, 1), round(100 * iowait / total, 1)
+
+def _cpu_usage(before: Tuple[float, List[List[int]]], after: Tuple[float, List[List[int]]]) -> Dict:
+    total, iowait = _busy_percent(before[1][0], after[1][0])
+    return {
+        "cpu_percent": total,
+        "iowait_percent": iowait,
+        "per_cpu_percent": [_busy_percent(a, b)[0] for a, b in zip(before[1][1:], after[1][1:])],
+        "cores": len(after[1]) - 1,
+        "interval_seconds": round(after[0] - before[0], 2),
+    }
+
+def _cpu_start_sample(now: float) -> Optional[Tuple[float, List[List[int]]]]:
+    """Get a recent enough sample to measure from, if there is one"""
+    with _cpu_lock:
+        if _last_cpu_sample and CPU_SAMPLE_INTERVAL <= now - _last_cpu_sample[0] <= CPU_SAMPLE_MAX_AGE:
+            return _last_cpu_sample
+    return None
+
+def _remember_cpu_sample(sample: Tuple[float, List[List[int]]]) -> None:
+    global _last_cpu_sample
+    with _cpu_lock:
+        _last_cpu_sample = sample
+
+def cpu_usage(_: str = "") -> str:
+    """CPU utilization since the previous call, or over a short interval if there is none"""
+    start = _cpu_start_sample(time.monotonic())
+    if start is None:
+        start = (time.monotonic(), _read_cpu_times())
+        time.sleep(CPU_SAMPLE_INTERVAL)
+    end = (time.monotonic(), _read_cpu_times())
+    _remember_cpu_sample(end)
+    return _dumps(_cpu_usage(start, end))
+
+async def acpu_usage(_: str = "") -> str:
+    """asyncio version of cpu_usage that does not block the event loop while sampling"""
+    start = _cpu_start_sample(time.monotonic())
+    if start is None:
+        start = (time.monotonic(), _read_cpu_times())
+        await asyncio.sleep(CPU_SAMPLE_INTERVAL)
+    end = (time.monotonic(), _read_cpu_times())
+    _remember_cpu_sample(end)
+    return _dumps(_cpu_usage(start, end))
+
+def parse_meminfo(text: str) -> Dict[str, int]:
+    """Parse /proc/meminfo into kB values"""
+    values = {}
+    for line in text.splitlines():
+        key, _, rest = line.partition(":")
+        fields = rest.split()
+        if fields:
+            values[key] = int(fields[0])
+    return values
+
+def memory_usage(_: str = "") -> str:
+    """Memory and swap usage from /proc/meminfo"""
+    info = parse_meminfo(_read("/proc/meminfo"))
+    total = info.get("MemTotal", 0)
+    available = info.get("MemAvailable", info.get("MemFree", 0) + info.get("Cached", 0))
+    swap_total = info.get("SwapTotal", 0)
+    swap_used = swap_total - info.get("SwapFree", 0)
+    return _dumps({
+        "total_mb": total // 1024,
+        "available_mb": available // 1024,
+        "used_mb": (total - available) // 1024,
+        "used_percent": round(100 * (total - available) / total, 1) if total else 0.0,
+        "buffers_cache_mb": (info.get("Buffers", 0) + info.get("Cached", 0)) // 1024,
+        "swap_total_mb": swap_total // 1024,
+        "swap_used_mb": swap_used // 1024,
+    })
+
+def _format_duration(seconds: float) -> str:
+    days, rest = divmod(int(seconds), 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes = rest // 60
+    return f"{days} days, {hours}:{minutes:02d}" if days else f"{hours}:{minutes:02d}"
+
+def system_load(_: str = "") -> str:
+    """Uptime and load averages from /proc/uptime and /proc/loadavg"""
+    uptime = float(_read("/proc/uptime").split()[0])
+    load1, load5, load15, tasks, _last_pid = _read("/proc/loadavg").split()
+    running, total = tasks.split("/")
+    return _dumps({
+        "uptime_seconds": int(uptime),
+        "uptime": _format_duration(uptime),
+        "booted_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() - uptime)),
+        "load_1m": float(load1),
+        "load_5m": float(load5),
+        "load_15m": float(load15),
+        "cores": os.cpu_count(),
+        "running_tasks": int(running),
+        "total_tasks": int(total),
+    })
+
+def _mounts() -> List[Tuple[str, str, str]]:
+    mounts = []
+    for line in _read("/proc/mounts").splitlines():
+        device, mount_point, fs_type = line.split()[:3]
+        if fs_type not in PSEUDO_FILESYSTEMS:
+            # /proc/mounts escapes spaces and tabs as octal
+            mounts.append((device, mount_point.replace("\\040", " ").replace("\\011", "\t"), fs_type))
+    return mounts
+
+def _usage(path: str) -> Dict:
+    stats = os.statvfs(path)
+    size = stats.f_blocks * stats.f_frsize
+    available = stats.f_bavail * stats.f_frsize
+    used = (stats.f_blocks - stats.f_bfree) * stats.f_frsize
+    gib = 1024 ** 3
+    return {
+        "size_gb": round(size / gib, 2),
+        "used_gb": round(used / gib, 2),
+        "available_gb": round(available / gib, 2),
+        "used_percent": round(100 * used / (used + available), 1) if used + available else 0.0,
+        "inodes_used_percent": round(100 * (stats.f_files - stats.f_ffree) / stats.f_files, 1) if stats.f_files else 0.0,
+    }
+
+def disk_usage(path: str = "") -> str:
+    """Usage of every real mounted filesystem, or of the filesystem holding `path`"""
+    path = path.strip().strip("'\"")
+    if path and path.lower() not in ("all", "none", "*"):
+        try:
+            return _dumps({"path": path, **_usage(path)})
+        except OSError as e:
+            return _dumps({"path": path, "error": str(e)})
+    seen = set()
+    filesystems = []
+    for device, mount_point, fs_type in _mounts():
+        try:
+            stats = os.statvfs(mount_point)
+        except OSError:
+            continue
+        key = (device, stats.f_blocks)
+        if key in seen or not stats.f_blocks:
+            continue
+        seen.add(key)
+        filesystems.append({"mount": mount_point, "device": device, "fs": fs_type, **_usage(mount_point)})
+    return _dumps(filesystems)
+
+def _decode_address(address: str) -> Tuple[str, int]:
+    host, port = address.split(":")
+    raw = bytes.fromhex(host)
+    if len(raw) == 4:
+        ip = socket.inet_ntop(socket.AF_INET, raw[::-1])
+    else:
+        # IPv6 addresses are four host-order 32-bit words
+        ip = socket.inet_ntop(socket.AF_INET6, b"".join(raw[i:i + 4][::-1] for i in range(0, 16, 4)))
+    return ip, int(port, 16)
+
+def _socket_owners() -> Dict[str, Tuple[int, str]]:
+    """Map socket inodes to (pid, process name) for the processes we may inspect"""
+    owners = {}
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            fds = os.listdir(f"/proc/{pid}/fd")
+            name = None
+            for fd in fds:
+                target = os.readlink(f"/proc/{pid}/fd/{fd}")
+                if target.startswith("socket:["):
+                    if name is None:
+                        name = _read(f"/proc/{pid}/comm").strip()
+                    owners[target[8:-1]] = (int(pid), name)
+        except OSError:
+            continue
+    return owners
+
+def open_ports(_: str = "") -> str:
+    """Listening TCP and bound UDP sockets from /proc/net/{tcp,tcp6,udp,udp6}"""
+    sockets = []
+    for proto, state in (("tcp", TCP_LISTEN), ("tcp6", TCP_LISTEN), ("udp", UDP_UNCONNECTED), ("udp6", UDP_UNCONNECTED)):
+        try:
+            lines = _read(f"/proc/net/{proto}").splitlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            if fields[3] != state:
+                continue
+            address, port = _decode_address(fields[1])
+            sockets.append({"proto": proto, "address": address, "port": port, "inode": fields[9]})
+
+    owners = _socket_owners() if sockets else {}
+    ports = []
+    seen = set()
+    for entry in sorted(sockets, key=lambda s: (s["port"], s["proto"])):
+        key = (entry["proto"], entry["address"], entry["port"])
+        if key in seen:
+            continue
+        seen.add(key)
+        owner = owners.get(entry.pop("inode"))
+        if owner:
+            entry["pid"], entry["process"] = owner
+        ports.append(entry)
+    return _dumps(ports)
+
+def _parse_utmp(data: bytes) -> List[Dict]:
+    sessions = []
+    for offset in range(0, len(data) - UTMP_RECORD.size + 1, UTMP_RECORD.size):
+        (ut_type, pid, line, _id, user, host, _term, _exit, _session,
+         seconds, _usec, *_addr) = UTMP_RECORD.unpack_from(data, offset)
+        if ut_type != USER_PROCESS:
+            continue
+        sessions.append({
+            "user": user.rstrip(b"\0").decode(errors="replace"),
+            "tty": line.rstrip(b"\0").decode(errors="replace"),
+            "from": host.rstrip(b"\0").decode(errors="replace") or None,
+            "login_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(seconds)),
+            "pid": pid,
+        })
+    return sessions
+
+def logged_in_users(_: str = "") -> str:
+    """Logged in user sessions from utmp"""
+    for path in UTMP_PATHS:
+        try:
+            with open(path, "rb") as f:
+                sessions = _parse_utmp(f.read())
+        except OSError:
+            continue
+        return _dumps({"count": len(sessions), "users": sorted({s["user"] for s in sessions}), "sessions": sessions})
+    return _dumps({"count": 0, "users": [], "sessions": [], "note": "no utmp file on this host"})
+
+def metrics_tools() -> List[Tool]:
+    """Create the structured metrics tools, which read /proc directly instead of running commands"""
+    return [
+        Tool(
+            name="system_load",
+            func=system_load,
+            description="""Get uptime, boot time and load averages as JSON. Use this instead of running uptime. Input is ignored.
+            Example:
+            Action: system_load
+            Action Input: now
+            Observation: JSON with uptime_seconds, uptime, load_1m, load_5m and load_15m"""
+        ),
+        Tool(
+            name="cpu_usage",
+            func=cpu_usage,
+            coroutine=acpu_usage,
+            description="""Get CPU utilization (total, iowait and per core, in percent) as JSON. Use this instead of top or mpstat. Input is ignored."""
+        ),
+        Tool(
+            name="memory_usage",
+            func=memory_usage,
+            description="""Get memory and swap usage in MB as JSON. Use this instead of free. Input is ignored."""
+        ),
+        Tool(
+            name="disk_usage",
+            func=disk_usage,
+            description="""Get size, used and available space of mounted filesystems as JSON. Use this instead of df.
+            Input: a path to check only the filesystem holding it, or "all"."""
+        ),
+        Tool(
+            name="open_ports",
+            func=open_ports,
+            description="""List listening TCP and bound UDP ports, with the owning process when visible, as JSON.
+            Use this instead of netstat or ss. Input is ignored."""
+        ),
+        Tool(
+            name="logged_in_users",
+            func=logged_in_users,
+            description="""List logged in users with tty, origin and login time as JSON. Use this instead of who or w. Input is ignored."""
+        ),
+    ]
@@ -1,30 +1,70 @@
-from langchain_community.tools import ShellTool
+import asyncio
+from typing import Callable, Optional
 from langchain.agents import Tool
+from .executor import CommandExecutor, CommandResult
+
 class ValidatedShellTool:
-    """A wrapper around ShellTool that requires user validation before execution"""
-    def __init__(self):
-        self.shell_tool = ShellTool()
+    """A shell tool that requires user validation before execution"""
+    def __init__(self, executor: Optional[CommandExecutor] = None, output_store=None,
+                 validator: Optional[Callable[[str], Optional[str]]] = None):
+        """Initialize the tool
+        
+        Args:
+            executor: CommandExecutor running the commands
+            output_store: Optional OutputStore that digests large outputs
+            validator: Callable taking a command and returning the command to run, or None
+                to cancel it. Defaults to asking on the terminal
+        """
+        self.executor = executor or CommandExecutor()
+        self.output_store = output_store
+        self.validator = validator or self._validate
         self.result = None
     
+    def _format(self, result: CommandResult) -> str:
+        if self.output_store is not None:
+            return self.output_store.observe_result(result)
+        return result.format()
+    
+    def _validate(self, command: str):
+        """Ask the user to confirm the command. Returns the command to run or None if cancelled"""
+        print(f"\nCommand to execute: {command}")
+        user_input = input("Do you want to execute this command? (y/n/modify): ").lower().strip()
+    
+        if user_input == 'modify':
+            command = input("Enter the modified command: ").strip()
+            if not command:
+                return None
+        elif user_input != 'y':
+            return None
+        return command
+    
     def run(self, command: str) -> str:
             # Terminal validation
-            print(f"\nCommand to execute: {command}")
-            user_input = input("Do you want to execute this command? (y/n/modify): ").lower().strip()
-            
-            if user_input == 'modify':
-                command = input("Enter the modified command: ").strip()
-                if not command:
-                    return "Command execution cancelled by user"
-            elif user_input != 'y':
+            command = self.validator(command)
+            if command is None:
                 return "Command execution cancelled by user"
-            
-            return self.shell_tool.run(command)
+    
+            try:
+                return self._format(self.executor.run(command))
+            except Exception as e:
+                return f"Error during command execution: {str(e)}"
+    
+    async def arun(self, command: str) -> str:
+        """Validate and run a command in an asyncio subprocess without blocking the event loop
         
+        Cancelling the call (e.g. when the agent run is cancelled) kills the command.
+        """
+        command = await asyncio.to_thread(self.validator, command)
+        if command is None:
+            return "Command execution cancelled by user"
+    
+        try:
+            return self._format(await self.executor.arun(command))
+        except Exception as e:
+            return f"Error during command execution: {str(e)}"
+    
 
-shell_tool= Tool(
-            name="shell",
-            func=ValidatedShellTool().run,
-            description="""Execute shell commands on the server. Use this tool to run commands and get their output.
+SHELL_TOOL_DESCRIPTION = """Execute shell commands on the server. Use this tool to run commands and get their output.
             The command will be shown to the user for validation before execution.
             Example:
             Action: shell
@@ -32,4 +72,16 @@ shell_tool= Tool(
             Observation: user1    pts/0    2024-01-31 10:00 (:0)
             Thought: The 'who' command shows user1 is logged in
             """
-        )
\ No newline at end of file
+
+def make_shell_tool(validated: ValidatedShellTool) -> Tool:
+    """Wrap a ValidatedShellTool as the agent's "shell" tool"""
+    return Tool(
+        name="shell",
+        func=validated.run,
+        coroutine=validated.arun,
+        description=SHELL_TOOL_DESCRIPTION
+    )
+
+validated_shell = ValidatedShellTool()
+
+shell_tool = make_shell_tool(validated_shell)
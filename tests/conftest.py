@@ -0,0 +1,23 @@
+import os
+import pytest
+from aida.providers import LLMProviderFactory
+
+@pytest.fixture(autouse=True, scope="session")
+def model_cassette():
+    """Run the model-backed tests against a cassette when AIDA_CASSETTE is set
+
+    AIDA_CASSETTE_MODE=record records one against live models; the default,
+    replay, needs no model server (e.g. in CI).
+    """
+    path = os.getenv("AIDA_CASSETTE")
+    if not path:
+        yield None
+        return
+    cassette = LLMProviderFactory.use_cassette(path, os.getenv("AIDA_CASSETTE_MODE", "replay"))
+    yield cassette
+    LLMProviderFactory.stop_cassette()
+
+@pytest.fixture
+def no_cassette(monkeypatch):
+    """Set aside the run's cassette for tests that bring their own fake models"""
+    monkeypatch.setattr(LLMProviderFactory, "_cassette", None)
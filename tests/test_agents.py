@@ -0,0 +1,135 @@
+import pytest
+from types import SimpleNamespace
+from langchain.agents import Tool
+from langchain_community.llms.fake import FakeListLLM
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from aida.agents import REACT, TOOL_CALLING, build_agent, resolve_agent_mode
+from aida.benchmark import BenchmarkSettings, make_session
+from aida.core import Aida
+from aida.config import AidaConfig
+from aida.conversation import ConversationManager
+from aida.examples import ExampleLibrary, AGENT_EXAMPLES
+from aida.providers import ollama
+from aida.providers.scripted import ScriptedProvider
+
+class ToolCallingModel(FakeMessagesListChatModel):
+    """Fake chat model that accepts tool definitions and replays scripted messages"""
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+def provider(supported):
+    def supports_tool_calling():
+        if isinstance(supported, Exception):
+            raise supported
+        return supported
+    return SimpleNamespace(model="m", supports_tool_calling=supports_tool_calling)
+
+def test_agent_mode_resolution():
+    """Test that tool calling is used only where the model supports it"""
+    assert resolve_agent_mode("auto", provider(True)) == TOOL_CALLING
+    assert resolve_agent_mode("auto", provider(False)) == REACT
+    assert resolve_agent_mode("tool_calling", provider(False)) == REACT
+    assert resolve_agent_mode("auto", provider(ConnectionError("down"))) == REACT
+    assert resolve_agent_mode("react", provider(True)) == REACT
+    with pytest.raises(ValueError):
+        resolve_agent_mode("json", provider(True))
+
+def test_models_that_cannot_bind_tools_fall_back_to_react():
+    """Test the fallback when the LangChain model has no tool binding"""
+    tools = [Tool(name="shell", func=lambda command: "ok", description="Run a command")]
+    _, mode = build_agent(FakeListLLM(responses=["Final Answer: ok"]), tools, TOOL_CALLING,
+                          prefix="Be helpful.", human_template="{input}")
+    assert mode == REACT
+
+def make_tool_calling_aida(responses):
+    aida = Aida.__new__(Aida)
+    aida.config = AidaConfig(host_facts=False, agent_mode="auto")
+    aida.conversation = ConversationManager()
+    aida.llm = SimpleNamespace(llm=ToolCallingModel(responses=responses), supports_tool_calling=lambda: True,
+                               is_strong=lambda: False, prompt_stats=None)
+    aida.tools = aida._setup_tools()
+    aida.agent = aida._setup_agent()
+    aida.examples = ExampleLibrary(AGENT_EXAMPLES)
+    return aida
+
+def test_tool_calling_run_needs_no_text_parsing():
+    """Test a run where the model calls a tool and then replies with the answer"""
+    aida = make_tool_calling_aida([
+        AIMessage(content="", tool_calls=[{"name": "disk_usage", "args": {"tool_input": "/"}, "id": "1"}]),
+        AIMessage(content="The root filesystem is 18% full."),
+    ])
+    assert aida.agent_mode == TOOL_CALLING
+    inputs = aida._build_inputs("is the disk full?")
+    assert inputs["examples"] == ""
+
+    response = aida._invoke_agent("is the disk full?", inputs, [])
+    assert response["output"] == "The root filesystem is 18% full."
+    [(action, observation)] = response["intermediate_steps"]
+    assert action.tool == "disk_usage" and "used_percent" in observation
+    assert not aida._needs_final_answer_check()
+
+def test_ollama_capabilities(monkeypatch):
+    """Test tool support detection from /api/show, with the template fallback for old servers"""
+    replies = {"llama3.1": {"capabilities": ["completion", "tools"]},
+               "llama2": {"template": "{{ .Prompt }}"},
+               "old-tools": {"template": "{{ if .Tools }}{{ .Tools }}{{ end }}"}}
+
+    class Reply:
+        def __init__(self, body):
+            self.body = body
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return self.body
+    requests = []
+    monkeypatch.setattr(ollama._session, "post",
+                        lambda url, json, timeout: requests.append(json) or Reply(replies[json["model"]]))
+    ollama.clear_model_list_cache()
+    assert "tools" in ollama.model_capabilities("llama3.1")
+    assert "tools" not in ollama.model_capabilities("llama2")
+    assert "tools" in ollama.model_capabilities("old-tools")
+    ollama.model_capabilities("llama3.1")
+    assert len(requests) == 3
+    ollama.clear_model_list_cache()
+
+@pytest.mark.usefixtures("no_cassette")
+def test_deferred_validation_resolves_the_mode_on_first_query(monkeypatch):
+    """Test that startup does not ask the model what it supports when validation is deferred"""
+    checks = []
+    monkeypatch.setattr(ScriptedProvider, "supports_tool_calling", lambda self: checks.append(self.model) or False)
+    aida = make_session(BenchmarkSettings(), agent_mode="auto", defer_model_validation=True)
+    assert aida.agent is None and checks == []
+
+    assert aida.process_query("How long has the server been running?").startswith("The server has been up")
+    assert aida.agent_mode == REACT and checks == ["scripted"]
+    aida.process_query("Which process uses the most memory?")
+    assert checks == ["scripted"]
+
+def test_worked_example_rule_is_only_given_to_react():
+    """Test that the tool calling instructions do not mention examples that are never sent"""
+    aida = make_tool_calling_aida([AIMessage(content="ok")])
+    instructions = aida.agent.agent.runnable.steps[1].messages[0].content
+    assert "Worked examples" not in instructions and "12. To look for errors" in instructions
+
+    react = Aida.__new__(Aida)
+    react.config = AidaConfig(host_facts=False, agent_mode="react")
+    react.llm = SimpleNamespace(llm=FakeListLLM(responses=["Final Answer: ok"]), prompt_stats=None)
+    react.tools = react._setup_tools()
+    assert "13. Worked examples" in react._setup_agent().agent.llm_chain.prompt.template
+
+def test_failed_capability_lookups_are_cached_outside_the_lock(monkeypatch):
+    """Test that an unreachable server is asked once per TTL and never blocks model list lookups"""
+    calls = []
+
+    def post(url, json, timeout):
+        calls.append(ollama._model_list_lock.locked())
+        raise ollama.requests.ConnectionError("refused")
+    monkeypatch.setattr(ollama._session, "post", post)
+    ollama.clear_model_list_cache()
+    assert ollama.model_capabilities("llama3.1") == []
+    assert ollama.model_capabilities("llama3.1") == []
+    assert calls == [False]
+    ollama.clear_model_list_cache()
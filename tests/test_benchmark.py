@@ -0,0 +1,63 @@
+import asyncio
+import json
+import pytest
+from aida.benchmark import BenchmarkSettings, compare, make_session, run_benchmarks, summarize
+from aida.providers import LLMProviderFactory
+from aida.providers.scripted import DEFAULT_SCRIPT, ScriptedProvider
+from aida.tools.fake_shell import FakeShell
+
+pytestmark = pytest.mark.usefixtures("no_cassette")
+
+def test_scripted_provider_replays_transcripts():
+    """Test that the agent model replays the steps in order and direct calls do not consume them"""
+    provider = LLMProviderFactory.get_provider("scripted", model="scripted", defer_validation=True)
+    assert isinstance(provider, ScriptedProvider)
+    assert provider.llm.invoke("q") == DEFAULT_SCRIPT[0][0]
+    assert provider.invoke("summarize").content == provider.reply
+    assert "".join(provider.stream("q")) == provider.reply
+    assert provider.llm.invoke("q") == DEFAULT_SCRIPT[0][1]
+    assert provider.llm.calls == 2
+
+def test_script_loaded_from_file(tmp_path):
+    """Test a model name pointing to a JSON script"""
+    path = tmp_path / "script.json"
+    path.write_text(json.dumps([["Final Answer: one"], ["Final Answer: two"]]))
+    provider = ScriptedProvider(model=str(path))
+    assert [provider.llm.invoke("q") for _ in range(3)] == ["Final Answer: one", "Final Answer: two", "Final Answer: one"]
+
+def test_fake_shell_answers_by_command_then_program():
+    """Test canned outputs, the default output and the async path"""
+    shell = FakeShell(outputs={"df -h": "exact", "df": "program"}, default_output="nothing")
+    assert shell.run("df -h").output == "exact"
+    assert shell.run("df -i").output == "program"
+    assert asyncio.run(shell.arun("reboot")).output == "nothing"
+    assert shell.commands == ["df -h", "df -i", "reboot"]
+
+def test_session_runs_scripted_queries_offline():
+    """Test that benchmark sessions answer from the script and run commands on the fake shell"""
+    aida = make_session(BenchmarkSettings())
+    assert aida.process_query("How long has the server been running?").startswith("The server has been up for 3 days")
+    assert aida.process_query("Which process uses the most memory?").startswith("mysqld (PID 1201)")
+    assert aida.fake_shell.commands == ["uptime", "ps aux --sort=-%mem | head -2"]
+
+def test_benchmarks_emit_json():
+    """Test a small run of every benchmark"""
+    settings = BenchmarkSettings(constructions=2, queries=8, conversation_length=8, sessions=2, queries_per_session=3)
+    results = json.loads(json.dumps(run_benchmarks(settings)))
+    assert results["construction_ms"]["count"] == 2
+    assert results["query_latency_ms"]["count"] == 8
+    assert results["agent_steps"] == 18
+    assert results["step_overhead_ms"] > 0
+    assert results["memory"]["queries"] == 8
+    assert results["concurrency"]["queries"] == 6
+    assert results["concurrency"]["queries_per_second"] > 0
+
+def test_summarize_and_compare():
+    """Test percentiles and regression detection in both directions"""
+    stats = summarize([i / 1000 for i in range(1, 101)])
+    assert round(stats["p50"]) == 51 and round(stats["p99"]) == 99 and stats["max"] == 100
+
+    baseline = {"query_latency_ms": {"p50": 10.0}, "concurrency": {"queries_per_second": 100.0}}
+    assert compare(baseline, {"query_latency_ms": {"p50": 11.0}, "concurrency": {"queries_per_second": 95.0}}) == []
+    regressions = compare(baseline, {"query_latency_ms": {"p50": 15.0}, "concurrency": {"queries_per_second": 50.0}})
+    assert [line.split(":")[0] for line in regressions] == ["query_latency_ms.p50", "concurrency.queries_per_second"]
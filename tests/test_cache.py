@@ -0,0 +1,89 @@
+import pytest
+from langchain_core.messages import AIMessage
+from aida.providers.base import LLMProvider
+from aida.providers.cache import ResponseCache, CachedProvider
+
+class CountingProvider(LLMProvider):
+    """Provider that echoes the prompt and counts calls"""
+    def __init__(self, model: str = "echo", temperature: float = 0):
+        self.model = model
+        self.temperature = temperature
+        self.llm = None
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return AIMessage(content=f"echo: {prompt}")
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+    def stream(self, prompt):
+        self.calls += 1
+        yield "echo: "
+        yield prompt
+
+    def validate_model(self, model):
+        return True
+
+    def is_strong(self):
+        return False
+
+def test_repeated_prompt_hits_cache():
+    """Test that a repeated prompt is answered without calling the provider"""
+    provider = CountingProvider()
+    cached = CachedProvider(provider, ResponseCache(), "echo")
+    
+    assert cached.invoke("uptime").content == "echo: uptime"
+    assert cached.invoke("uptime").content == "echo: uptime"
+    assert "".join(cached.stream("uptime")) == "echo: uptime"
+    assert provider.calls == 1
+    assert cached.cache.stats()["hits"] == 2
+    assert cached.cache.stats()["misses"] == 1
+
+def test_key_includes_model_and_temperature():
+    """Test that the same prompt for a different model or temperature is a miss"""
+    cache = ResponseCache()
+    keys = {
+        cache.make_key("ollama", "llama3.2", 0, "prompt"),
+        cache.make_key("ollama", "qwen2.5", 0, "prompt"),
+        cache.make_key("ollama", "llama3.2", 0.5, "prompt"),
+        cache.make_key("gemini", "llama3.2", 0, "prompt"),
+    }
+    assert len(keys) == 4
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted beyond max_entries"""
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+def test_ttl_expiry(monkeypatch):
+    """Test that expired entries are treated as misses"""
+    now = [1000.0]
+    monkeypatch.setattr("aida.providers.cache.time.time", lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    cache.set("a", "1")
+    now[0] += 11
+    assert cache.get("a") is None
+
+def test_sqlite_tier_persists(tmp_path):
+    """Test that the SQLite tier survives a new cache instance and evicts by size"""
+    path = tmp_path / "responses.sqlite"
+    cache = ResponseCache(max_entries=2, path=path)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.set("c", "3")
+    cache.close()
+    
+    reopened = ResponseCache(max_entries=2, path=path)
+    assert reopened.get("c") == "3"
+    assert reopened.get("a") is None
+    assert reopened.stats()["hits"] == 1
+    reopened.close()
@@ -0,0 +1,160 @@
+import gzip
+import json
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel, GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from aida.benchmark import BenchmarkSettings, make_session
+from aida.providers import LLMProviderFactory
+from aida.providers.base import LLMProvider
+from aida.providers.cassette import Cassette, CassetteMiss, CassetteProvider
+
+class ChatProvider(LLMProvider):
+    """Provider around a fake LangChain chat model, calling it the way OllamaProvider does"""
+
+    def __init__(self, llm, model="fake", temperature=0):
+        self.llm = llm
+        self.model = model
+        self.temperature = temperature
+
+    def invoke(self, prompt):
+        return self.llm.invoke(prompt)
+
+    async def ainvoke(self, prompt):
+        return await self.llm.ainvoke(prompt)
+
+    def stream(self, prompt):
+        for chunk in self.llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
+
+    def validate_model(self, model):
+        return True
+
+    def is_strong(self):
+        return True
+
+@pytest.fixture
+def cassette_path(tmp_path, no_cassette):
+    yield tmp_path / "session.jsonl.gz"
+    LLMProviderFactory.stop_cassette()
+
+def test_session_replays_without_the_model(cassette_path):
+    """Test that a recorded Aida session gives the same answers from the cassette"""
+    queries = ["How long has the server been running?", "Which process uses the most memory?"]
+    LLMProviderFactory.use_cassette(str(cassette_path), "record")
+    recorded = make_session(BenchmarkSettings())
+    answers = [recorded.process_query(query) for query in queries]
+    LLMProviderFactory.stop_cassette()
+
+    LLMProviderFactory.use_cassette(str(cassette_path), "replay")
+    replayed = make_session(BenchmarkSettings())
+    assert isinstance(replayed.llm, CassetteProvider) and replayed.llm.provider is None
+    assert [replayed.process_query(query) for query in queries] == answers
+    assert replayed.fake_shell.commands == recorded.fake_shell.commands
+
+    # Prompts are stored as short keys, not verbatim
+    with gzip.open(cassette_path, "rt") as f:
+        assert "How long has the server" not in f.read()
+
+def test_stream_chunks_and_facts_round_trip(tmp_path):
+    """Test streamed chunks, plain invokes and model facts"""
+    path = tmp_path / "stream.jsonl"
+    cassette = Cassette(str(path), "record")
+    provider = CassetteProvider(cassette, "ollama", "fake", provider=ChatProvider(
+        GenericFakeChatModel(messages=iter([AIMessage(content="up 3 days"), AIMessage(content="ok")]))))
+    assert list(provider.stream("uptime?")) == ["up", " ", "3", " ", "days"]
+    assert provider.invoke("and now?").content == "ok"
+    assert provider.is_strong()
+    cassette.close()
+
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert entries[1]["chunks"] == ["up", " ", "3", " ", "days"] and len(entries[1]["offsets"]) == 5
+
+    replay = CassetteProvider(Cassette(str(path), "replay", timing=True), "ollama", "fake")
+    assert list(replay.stream("uptime?")) == ["up", " ", "3", " ", "days"]
+    assert replay.invoke("and now?").content == "ok"
+    assert replay.is_strong() and not replay.supports_tool_calling()
+
+def test_tool_calls_round_trip(tmp_path):
+    """Test that structured tool calls are replayed, also when streamed"""
+    path = tmp_path / "tools.jsonl"
+    cassette = Cassette(str(path), "record")
+    call = {"name": "disk_usage", "args": {"tool_input": "/"}, "id": "call_1", "type": "tool_call"}
+    provider = CassetteProvider(cassette, "gemini", "fake", provider=ChatProvider(
+        FakeMessagesListChatModel(responses=[AIMessage(content="", tool_calls=[call])])))
+    provider.invoke("is the disk full?")
+    cassette.close()
+
+    replay = CassetteProvider(Cassette(str(path), "replay"), "gemini", "fake")
+    assert replay.invoke("is the disk full?").tool_calls == [call]
+
+    replay = CassetteProvider(Cassette(str(path), "replay"), "gemini", "fake")
+    chunks = list(replay.llm.stream("is the disk full?"))
+    streamed = chunks[0]
+    for chunk in chunks[1:]:
+        streamed += chunk
+    assert streamed.tool_calls == [call]
+
+def test_unrecorded_requests(tmp_path):
+    """Test the in-order fallback, strict mode and models without a recording"""
+    path = tmp_path / "one.jsonl"
+    cassette = Cassette(str(path), "record")
+    provider = CassetteProvider(cassette, "ollama", "fake", provider=ChatProvider(
+        FakeMessagesListChatModel(responses=[AIMessage(content="first"), AIMessage(content="second")])))
+    provider.invoke("at 10:00")
+    provider.invoke("at 10:01")
+    cassette.close()
+
+    replay = CassetteProvider(Cassette(str(path), "replay"), "ollama", "fake")
+    assert replay.invoke("at 12:01").content == "first"
+    assert replay.invoke("at 10:01").content == "second"
+    with pytest.raises(CassetteMiss):
+        replay.invoke("at 12:02")
+
+    strict = CassetteProvider(Cassette(str(path), "replay", strict=True), "ollama", "fake")
+    with pytest.raises(CassetteMiss):
+        strict.invoke("at 12:01")
+
+    with pytest.raises(ValueError):
+        CassetteProvider(Cassette(str(path), "replay"), "ollama", "other")
+
+def test_interrupted_recording_is_replayed(cassette_path):
+    """Test that a gzip cassette whose recording process died keeps every call made before"""
+    script = f"""
+import os
+from aida.providers.cassette import Cassette
+cassette = Cassette({str(cassette_path)!r}, "record")
+cassette.record({{"source": "ollama:fake", "type": "provider"}})
+cassette.record({{"source": "ollama:fake", "type": "call", "key": "k1", "response": {{"content": "first"}}}})
+cassette.record({{"source": "ollama:fake", "type": "call", "key": "k2", "response": {{"content": "second"}}}})
+os._exit(0)
+"""
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=Path(__file__).parent.parent)
+    with pytest.raises(EOFError):
+        gzip.open(cassette_path, "rt").read()
+
+    cassette = Cassette(str(cassette_path), "replay")
+    assert cassette.sources() == ["ollama:fake"]
+    assert cassette.take("ollama:fake", "k2")["response"]["content"] == "second"
+
+def test_session_closes_the_cassette_it_opened(cassette_path, tmp_path):
+    """Test that a session completes its recording on close and a different cassette is refused"""
+    aida = make_session(BenchmarkSettings(), cassette_mode="record", cassette_path=str(cassette_path))
+    answer = aida.process_query("How long has the server been running?")
+    with pytest.raises(ValueError):
+        make_session(BenchmarkSettings(), cassette_mode="record", cassette_path=str(tmp_path / "other.jsonl"))
+    with pytest.raises(ValueError):
+        LLMProviderFactory.use_cassette(str(cassette_path), "replay")
+    assert LLMProviderFactory.use_cassette(str(cassette_path), "record") is aida._cassette
+
+    aida.close()
+    assert LLMProviderFactory.current_cassette() is None
+    with gzip.open(cassette_path, "rt") as f:
+        assert len(f.read().splitlines()) > 2
+
+    replayed = make_session(BenchmarkSettings(), cassette_mode="replay", cassette_path=str(cassette_path))
+    assert replayed.process_query("How long has the server been running?") == answer
+    replayed.close()
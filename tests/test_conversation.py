@@ -0,0 +1,100 @@
+from aida.conversation import ConversationManager, estimate_tokens, history_token_budget, MAX_WINDOW_MESSAGES
+
+def test_window_stays_within_budget():
+    """Test that the history window never exceeds the token budget"""
+    conversation = ConversationManager(token_budget=50)
+    for i in range(20):
+        conversation.add_user_message(f"question number {i} about disk usage")
+        conversation.add_assistant_message(f"answer number {i}: disk is fine")
+    
+    assert sum(message.tokens for message in conversation.messages) <= 50
+    assert conversation.messages[-1].content == "answer number 19: disk is fine"
+
+def test_evicted_messages_are_summarized():
+    """Test that messages leaving the window are passed to the summarizer once"""
+    calls = []
+    def summarizer(summary, messages):
+        calls.append([message.content for message in messages])
+        return "users"
+    
+    conversation = ConversationManager(token_budget=16, summarizer=summarizer)
+    conversation.add_user_message("who is logged in right now?")
+    conversation.add_assistant_message("user1 and user2 are logged in")
+    conversation.add_user_message("when did they log in?")
+    
+    history = conversation.get_recent_messages()
+    assert calls == [["who is logged in right now?"]]
+    assert history == (
+        "Summary of earlier conversation: users\n"
+        "Assistant: user1 and user2 are logged in\n"
+        "User: when did they log in?"
+    )
+    
+    conversation.get_recent_messages()
+    assert len(calls) == 1
+
+def test_huge_message_is_truncated():
+    """Test that one huge message cannot take over the whole window"""
+    conversation = ConversationManager(token_budget=100)
+    conversation.add_user_message("show me the logs")
+    conversation.add_assistant_message("x" * 100000)
+    
+    assert conversation.messages[-1].tokens <= 60
+    assert "[truncated]" in conversation.messages[-1].content
+    assert conversation.messages[0].content == "show me the logs"
+
+def test_message_count_is_bounded():
+    """Test that tiny messages cannot grow the store without bound"""
+    conversation = ConversationManager(token_budget=10**6)
+    for i in range(MAX_WINDOW_MESSAGES * 3):
+        conversation.add_user_message("hi")
+    assert len(conversation.messages) == MAX_WINDOW_MESSAGES
+
+def test_recent_count_and_budgets():
+    """Test the count limit, token estimate and per-model budgets"""
+    conversation = ConversationManager()
+    conversation.add_user_message("first")
+    conversation.add_assistant_message("second")
+    assert conversation.get_recent_messages(count=1) == "Assistant: second"
+    assert estimate_tokens("abcdefgh") == 2
+    assert history_token_budget("qwen2.5-coder:32b") == 4000
+    assert history_token_budget("llama3.2:3b") == 1500
+    assert history_token_budget("unknown-model") == 2000
+
+def test_async_compaction_does_not_block_the_event_loop():
+    """Test that other coroutines keep running while evicted history is summarized"""
+    import asyncio
+    import time
+
+    def slow_summarizer(summary, messages):
+        time.sleep(0.2)
+        return "blocking summary"
+
+    async def asummarizer(summary, messages):
+        await asyncio.sleep(0.2)
+        return "async summary"
+
+    async def compact_while_ticking(conversation):
+        ticks = []
+        async def ticker():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+        task = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        await conversation.acompact()
+        task.cancel()
+        return ticks
+
+    for summarizer, async_summarizer, expected in [(slow_summarizer, asummarizer, "async summary"),
+                                                     (slow_summarizer, None, "blocking summary")]:
+        conversation = ConversationManager(token_budget=16, summarizer=summarizer, asummarizer=async_summarizer)
+        conversation.add_user_message("who is logged in right now?")
+        conversation.add_assistant_message("user1 and user2 are logged in")
+        conversation.add_user_message("when did they log in?")
+
+        ticks = asyncio.run(compact_while_ticking(conversation))
+        assert len(ticks) > 5
+        assert conversation.summary == expected
+        # Nothing is left for the blocking path to summarize
+        assert conversation.get_recent_messages().startswith(f"Summary of earlier conversation: {expected}")
@@ -0,0 +1,34 @@
+from aida.conversation import estimate_tokens
+from aida.examples import AGENT_EXAMPLES, CODER_EXAMPLES, EXAMPLES_HEADER, Example, ExampleLibrary
+
+def test_most_similar_examples_come_first():
+    """Test that examples are ranked by similarity to the query"""
+    library = ExampleLibrary(AGENT_EXAMPLES, k=2, token_budget=10000)
+    assert library.select("who is logged in right now?")[0].question == "How many users are logged in?"
+    assert library.select("how much free disk space is left on /var?")[0].question == "Is the disk getting full?"
+    assert library.select("install nginx")[0].question == "Install htop"
+    assert library.select("write a python script that plots sales")[0].text.count("python_coder") > 0
+
+def test_selection_respects_count_and_token_budget():
+    """Test that at most k examples are returned and they fit in the budget"""
+    library = ExampleLibrary(AGENT_EXAMPLES, k=3, token_budget=10000)
+    assert len(library.select("python code to plot logged in users and disk usage")) == 3
+
+    budget = estimate_tokens(AGENT_EXAMPLES[1].text) + 10
+    library = ExampleLibrary(AGENT_EXAMPLES, k=3, token_budget=budget)
+    selected = library.select("which process uses the most memory and is the disk full?")
+    assert sum(estimate_tokens(example.text) for example in selected) <= budget
+    assert selected
+
+def test_unmatched_query_falls_back_to_the_first_example():
+    """Test the fallback that keeps one format example in the prompt"""
+    library = ExampleLibrary([Example("a", "Question: a"), Example("b", "Question: b")])
+    assert library.select("zzz") == [library.examples[0]]
+    assert ExampleLibrary(library.examples, fallback=False).select("zzz") == []
+    assert ExampleLibrary(library.examples, k=0).format("a") == ""
+
+def test_format_joins_the_selected_examples():
+    """Test the prompt block for the coder examples"""
+    text = ExampleLibrary(CODER_EXAMPLES, k=1).format("plot the iris dataset with seaborn")
+    assert text.startswith(EXAMPLES_HEADER)
+    assert "scatterplot" in text and "hello world" not in text
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import time
+from aida.tools.executor import CommandExecutor
+
+def test_run_captures_output_and_exit_code():
+    """Test that stdout and stderr are combined and a failing exit code is reported"""
+    result = CommandExecutor().run("echo hello; echo oops >&2; exit 3")
+    assert result.output == "hello\noops\n"
+    assert result.exit_code == 3
+    assert result.format() == "hello\noops\n[exit code 3]"
+
+def test_timeout_kills_the_process_group(tmp_path):
+    """Test that a timed out command and its children are killed"""
+    marker = tmp_path / "marker"
+    start = time.monotonic()
+    result = CommandExecutor().run(f"(sleep 1; touch {marker}) & sleep 30", timeout=0.3)
+    assert result.timed_out and result.exit_code is None
+    assert time.monotonic() - start < 3
+    time.sleep(1.2)
+    assert not marker.exists()
+
+def test_large_output_is_bounded_and_spilled(tmp_path):
+    """Test that output past the limit keeps head and tail and goes to a spill file"""
+    executor = CommandExecutor(max_output_bytes=1000, spill_dir=str(tmp_path))
+    result = executor.run("seq 1 20000")
+    assert result.truncated
+    assert result.output.startswith("1\n2\n3\n")
+    assert result.output.endswith("19999\n20000\n")
+    assert len(result.output) < 1200
+    with open(result.spill_path) as f:
+        assert f.read() == "".join(f"{i}\n" for i in range(1, 20001))
+    assert "full output in" in result.format()
+    
+    executor.cleanup()
+    assert not os.path.exists(result.spill_path)
+
+def test_tiny_output_limits(tmp_path):
+    """Test that limits of a few bytes keep at most that much output and still spill the rest"""
+    for limit in (0, 1, 2):
+        executor = CommandExecutor(max_output_bytes=limit, spill_dir=str(tmp_path))
+        result = executor.run("seq 1 1000")
+        assert result.truncated and result.exit_code == 0
+        assert len(result.output.split("\n... [")[0]) + len(result.output.rsplit("] ...\n")[-1]) == limit
+        with open(result.spill_path) as f:
+            assert f.read() == "".join(f"{i}\n" for i in range(1, 1001))
+        executor.cleanup()
+
+def test_small_output_is_not_spilled(tmp_path):
+    """Test that output under the limit stays in memory"""
+    result = CommandExecutor(max_output_bytes=1000, spill_dir=str(tmp_path)).run("seq 1 10")
+    assert not result.truncated and result.spill_path is None
+    assert list(tmp_path.iterdir()) == []
+
+def test_async_timeout_and_spill(tmp_path):
+    """Test that the asyncio path applies the same limits"""
+    executor = CommandExecutor(max_output_bytes=1000, spill_dir=str(tmp_path))
+    result = asyncio.run(executor.arun("seq 1 20000"))
+    assert result.truncated and result.exit_code == 0
+    result = asyncio.run(executor.arun("sleep 30", timeout=0.3))
+    assert result.timed_out
+
+def test_async_cancel_kills_command(tmp_path):
+    """Test that cancelling the awaiting task kills the command"""
+    marker = tmp_path / "marker"
+    
+    async def cancel_soon():
+        task = asyncio.ensure_future(CommandExecutor().arun(f"sleep 1; touch {marker}"))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    
+    asyncio.run(cancel_soon())
+    time.sleep(1.2)
+    assert not marker.exists()
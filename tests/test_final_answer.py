@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+from langchain_community.llms.fake import FakeListLLM
+from aida.core import Aida
+from aida.config import AidaConfig
+from aida.conversation import ConversationManager
+from aida.examples import ExampleLibrary, AGENT_EXAMPLES
+from aida.final_answer import extract_final_answer, format_run, strip_final_answer
+from aida.loop_guard import ToolMemo
+
+def step(tool, log, observation, tool_input="x"):
+    return (SimpleNamespace(tool=tool, tool_input=tool_input, log=log), observation)
+
+def test_strip_final_answer():
+    """Test that only the answer text is kept, not a prefix of characters"""
+    assert strip_final_answer("Final Answer: Fine, 3 users") == "Fine, 3 users"
+    assert strip_final_answer("Thought: done\nFinal Answer: 42\nQuestion: next?") == "42"
+    # str.lstrip("Final Answer:") would also eat the "e" and "A" here
+    assert strip_final_answer("eAll good") == "eAll good"
+
+def test_output_is_used_when_present():
+    """Test that a normal run needs no extraction"""
+    assert extract_final_answer({"output": "Up 3 days.", "intermediate_steps": []}) == "Up 3 days."
+
+def test_final_answer_inside_an_unparsable_step():
+    """Test a reply with both an action and a final answer"""
+    log = ("Parsing LLM output produced both a final answer and a parse-able action:: "
+           "Thought: done\nAction: shell\nAction Input: df -h\nFinal Answer: / is 18% full")
+    response = {"output": "Agent stopped due to iteration limit or time limit.",
+                "intermediate_steps": [step("_Exception", log, "Invalid or incomplete response")]}
+    assert extract_final_answer(response) == "/ is 18% full"
+
+def test_last_thought_and_observation_are_formatted():
+    """Test a run whose model answered without the Final Answer label"""
+    steps = [
+        step("disk_usage", "Thought: I need to check the disks\nAction: disk_usage\nAction Input: /", '{"used_percent":18.0}'),
+        step("_Exception", "The root filesystem is 18% full.", "Invalid Format: Missing 'Action:' after 'Thought:'"),
+    ]
+    answer = extract_final_answer({"output": "Agent stopped due to iteration limit or time limit.",
+                                   "intermediate_steps": steps})
+    assert answer == 'The root filesystem is 18% full.\n\nOutput of disk_usage:\n{"used_percent":18.0}'
+
+    # Without a conclusion the thought that led to the last tool call is used
+    memoized = ToolMemo.REPEAT_NOTE + "\nup 3 days"
+    answer = extract_final_answer({"output": "", "intermediate_steps": [step("shell", "Thought: check uptime\nAction: shell", memoized)]})
+    assert answer == "check uptime\n\nOutput of shell:\nup 3 days"
+
+def test_nothing_to_extract():
+    """Test that a run without output or observations falls back to the LLM"""
+    assert extract_final_answer({"output": "Agent stopped due to iteration limit or time limit.",
+                                 "intermediate_steps": []}) is None
+
+def test_format_run_does_not_include_the_inputs():
+    """Test that the fallback prompt gets the steps, not the whole agent input dict"""
+    response = {"context": "Host facts: os=debian", "input": "q", "output": "",
+                "intermediate_steps": [step("shell", "", "up 3 days", tool_input="uptime")]}
+    assert format_run(response) == "Action: shell\nAction Input: uptime\nObservation: up 3 days"
+
+def make_aida(responses):
+    """Aida with a weak ReAct model replaying `responses`; records fallback LLM prompts"""
+    aida = Aida.__new__(Aida)
+    aida.config = AidaConfig(host_facts=False, relevance_check=False, agent_mode="react")
+    aida.conversation = ConversationManager()
+    prompts = []
+
+    def invoke(prompt):
+        prompts.append(prompt)
+        return SimpleNamespace(content="Final Answer: from the LLM")
+    aida.llm = SimpleNamespace(llm=FakeListLLM(responses=responses), invoke=invoke,
+                               is_strong=lambda: False, prompt_stats=None)
+    aida.tools = aida._setup_tools()
+    aida.agent = aida._setup_agent()
+    aida.examples = ExampleLibrary(AGENT_EXAMPLES, k=0)
+    return aida, prompts
+
+def test_weak_model_answer_needs_no_second_call():
+    """Test that a weak model's Final Answer is returned without another LLM call"""
+    aida, prompts = make_aida(["Thought: I know this\nFinal Answer: Up 3 days."])
+    assert aida.process_query("How long has the server been up?") == "Up 3 days."
+    assert not prompts
+    assert aida.conversation.messages[-1].content == "Up 3 days."
+
+def test_unlabelled_answer_is_extracted_locally():
+    """Test a weak model that keeps answering without the Final Answer label"""
+    aida, prompts = make_aida(["Thought: check uptime\nAction: shell\nAction Input: uptime",
+                               "The server has been up for 3 days."] * 10)
+    aida.tools[0].func = lambda command: "up 3 days"
+    aida.agent = aida._setup_agent()
+    aida.agent.max_iterations = 2
+    answer = aida.process_query("How long has the server been up?")
+    assert answer.startswith("The server has been up for 3 days.\n\nOutput of shell:")
+    assert not prompts
+
+def test_llm_is_asked_only_when_nothing_can_be_extracted():
+    """Test the LLM fallback for a run that produced no output and no steps"""
+    aida, prompts = make_aida(["Final Answer: unused"])
+    aida.agent.max_iterations = 0
+    assert aida.process_query("How long has the server been up?") == "from the LLM"
+    assert len(prompts) == 1
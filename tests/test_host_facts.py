@@ -0,0 +1,32 @@
+from aida import host_facts
+from aida.host_facts import HostFacts, parse_os_release, get_host_facts, clear_host_facts_cache
+
+def test_parse_os_release():
+    """Test that quoted and unquoted os-release values are parsed"""
+    values = parse_os_release('NAME="Ubuntu"\nVERSION_ID="22.04"\nID=ubuntu\n# comment\n')
+    assert values == {"NAME": "Ubuntu", "VERSION_ID": "22.04", "ID": "ubuntu"}
+
+def test_collect_host_facts_reads_this_host():
+    """Test that facts are collected without running commands"""
+    facts = host_facts.collect_host_facts()
+    assert facts.cpu_count >= 1
+    assert facts.kernel
+    assert facts.format().startswith("Host facts: os=")
+
+def test_format_is_compact():
+    """Test that the prompt block is one short line"""
+    facts = HostFacts(hostname="web1", os_name="Ubuntu 22.04.3 LTS", os_id="ubuntu", kernel="5.15.0",
+                      arch="x86_64", package_manager="apt", cpu_count=4, cpu_model=None,
+                      memory_total_mb=8192, init_system="systemd", user="deploy", container=None)
+    block = facts.format()
+    assert "package_manager=apt" in block and "memory=8.0 GiB" in block and "init=systemd" in block
+    assert "\n" not in block and len(block) < 250
+
+def test_facts_are_cached_with_ttl(monkeypatch):
+    """Test that facts are collected once per TTL"""
+    calls = []
+    monkeypatch.setattr(host_facts, "collect_host_facts", lambda: calls.append(1) or len(calls))
+    clear_host_facts_cache()
+    assert get_host_facts(ttl=60) == get_host_facts(ttl=60) == 1
+    assert get_host_facts(ttl=0) == 2
+    clear_host_facts_cache()
@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from datetime import datetime
+from aida.tools.log_search import LogIndex, LogSearch, parse_time_spec, parse_timestamp
+
+def iso(moment):
+    return datetime.fromtimestamp(moment).strftime("%Y-%m-%dT%H:%M:%S")
+
+def write_log(path, start, count, step=1.0, mode="w"):
+    """Write `count` lines one `step` apart; every 100th line is an error"""
+    with open(path, mode) as f:
+        for i in range(count):
+            level = "ERROR" if i % 100 == 0 else "INFO"
+            f.write(f"{iso(start + i * step)} {level} worker[{i % 7}] request {i} took {i % 50}ms\n")
+
+def test_parse_timestamp_formats():
+    """Test ISO, syslog and common log format timestamps"""
+    assert parse_timestamp(b"2024-03-01T10:00:00Z ok", 2024) == datetime.fromisoformat("2024-03-01T10:00:00+00:00").timestamp()
+    assert parse_timestamp(b"Mar  1 10:00:00 host sshd[1]: ok", 2024) == datetime(2024, 3, 1, 10, 0, 0).timestamp()
+    clf = b'1.2.3.4 - - [01/Mar/2024:10:00:00 +0000] "GET / HTTP/1.1" 200'
+    assert parse_timestamp(clf, 2000) == datetime.fromisoformat("2024-03-01T10:00:00+00:00").timestamp()
+    assert parse_timestamp(b"no time here", 2024) is None
+
+def test_out_of_range_timestamps(tmp_path):
+    """Test that Feb 29 syslog lines in a non-leap year and impossible dates do not break a file"""
+    assert parse_timestamp(b"Feb 29 10:00:00 host cron[1]: ok", 2025) == datetime(2024, 2, 29, 10, 0, 0).timestamp()
+    assert parse_timestamp(b"2024-13-45T10:00:00 bad date", 2024) is None
+
+    path = tmp_path / "syslog"
+    path.write_text("Feb 29 10:00:00 host cron[1]: error one\nMar  1 10:00:00 host cron[1]: error two\n")
+    mtime = datetime(2025, 3, 2).timestamp()
+    os.utime(path, (mtime, mtime))
+    search = LogSearch()
+    result = json.loads(search.run(f"path={path} pattern=error"))
+    assert result["matches"] == 2
+    result = search.search(str(path), since=datetime(2025, 1, 1).timestamp(), pattern="error")
+    assert result["matches"] == 1
+    search.close()
+
+def test_parse_time_spec():
+    """Test relative durations and ISO times"""
+    assert parse_time_spec("1h", now=10000) == 6400
+    assert parse_time_spec("30m", now=10000) == 8200
+    assert parse_time_spec("2d", now=200000) == 200000 - 2 * 86400
+    assert parse_time_spec("2024-03-01T10:00") == datetime(2024, 3, 1, 10, 0).timestamp()
+
+def test_time_range_search_scans_only_the_range(tmp_path):
+    """Test that a time range is found through the index and counted exactly"""
+    path = str(tmp_path / "app.log")
+    start = time.time() - 20000
+    write_log(path, start, 20000)
+    search = LogSearch(stride=4096)
+
+    result = search.search(path, since=start + 15000, until=start + 16000)
+    assert result["matches"] == 10
+    assert result["levels"] == {"error": 10}
+    assert result["scanned_bytes"] < result["size_bytes"] / 10
+    assert result["top_messages"][0]["message"] == "ERROR worker[#] request # took #ms"
+    assert result["top_messages"][0]["count"] == 10
+
+    everything = search.search(path, pattern="request")
+    assert everything["matches"] == 20000
+    assert len(everything["samples"]) == 8
+    search.close()
+
+def test_index_extends_when_the_file_grows(tmp_path):
+    """Test that appended lines are indexed without rebuilding"""
+    path = str(tmp_path / "app.log")
+    start = time.time() - 5000
+    write_log(path, start, 2000)
+    index = LogIndex(path, stride=4096)
+    index.refresh()
+    entries = len(index.offsets)
+    write_log(path, start + 2000, 2000, mode="a")
+    index.refresh()
+    assert len(index.offsets) > entries
+    assert all(index.times[:-1] <= index.times[1:])
+    assert index.offset_for_time(start + 3000) == index.line_start_after(index.offset_for_time(start + 3000))
+    index.close()
+
+def test_rotation_rebuilds_the_index(tmp_path):
+    """Test that a replaced file is re-indexed from scratch"""
+    path = str(tmp_path / "app.log")
+    start = time.time() - 5000
+    write_log(path, start, 3000)
+    search = LogSearch(stride=4096)
+    assert search.search(path, pattern="ERROR")["matches"] == 30
+
+    os.rename(path, path + ".1")
+    write_log(path, start + 4000, 200)
+    assert search.search(path, pattern="ERROR")["matches"] == 2
+    search.close()
+
+def test_tool_input_parsing(tmp_path):
+    """Test key=value and JSON inputs and errors for the tool entry point"""
+    path = str(tmp_path / "app.log")
+    write_log(path, time.time() - 1000, 500)
+    search = LogSearch()
+    assert json.loads(search.run(f"path={path} since=1h pattern='took 49ms'"))["matches"] == 10
+    assert json.loads(search.run(json.dumps({"path": path, "pattern": "ERROR"})))["matches"] == 5
+    assert "error" in json.loads(search.run(f"path={tmp_path / 'missing.log'}"))
+    assert "error" in json.loads(search.run(f"path={path} since=yesterday"))
+    search.close()
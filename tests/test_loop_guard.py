@@ -0,0 +1,141 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from langchain.agents import Tool
+from langchain_community.llms.fake import FakeListLLM
+from aida.core import Aida
+from aida.config import AidaConfig
+from aida.conversation import ConversationManager
+from aida.examples import ExampleLibrary, AGENT_EXAMPLES
+from aida.loop_guard import (AgentLoopDetected, LoopDetector, ToolMemo, is_read_only_command,
+                             normalize_action)
+
+def counting_tool(name, calls):
+    return Tool(name=name, func=lambda text: calls.append(text) or f"result {len(calls)}", description=name)
+
+def test_read_only_commands():
+    """Test the conservative read-only classification of shell commands"""
+    for command in ["ls -la /var/log", "ps aux --sort=-%mem | head -2", "df -h && free -m",
+                    "systemctl status nginx", "grep 'a|b' /etc/hosts", "journalctl -u ssh 2>&1 | tail"]:
+        assert is_read_only_command(command), command
+    for command in ["cd /tmp", "rm -rf /tmp/x", "cat a > b", "sudo ls", "systemctl restart nginx",
+                    "apt install htop", "find / -name core -delete", "echo $(reboot)", "ls\nreboot"]:
+        assert not is_read_only_command(command), command
+
+def test_ip_sub_commands_are_matched_as_words():
+    """Test that `ip addr` is read-only while `ip ... add` changes state"""
+    for command in ["ip addr", "ip a", "ip address show eth0", "ip route show", "ip -br link"]:
+        assert is_read_only_command(command), command
+    for command in ["ip addr add 10.0.0.1/24 dev eth0", "ip link set eth0 down", "ip route del default",
+                    "ip neigh flush all"]:
+        assert not is_read_only_command(command), command
+
+def test_actions_are_normalized():
+    """Test that whitespace, quotes and trailing semicolons do not change the key"""
+    assert normalize_action("Shell", "  'df   -h';") == ("shell", "df -h")
+
+def test_memo_answers_repeats_within_a_run_only():
+    """Test that a repeated read-only call is answered from the memo inside a run"""
+    calls = []
+    memo = ToolMemo()
+    tool = memo.wrap(counting_tool("shell", calls))
+
+    with memo.run():
+        assert tool.run("df -h") == "result 1"
+        repeated = tool.run(" df  -h ")
+        assert repeated.startswith(ToolMemo.REPEAT_NOTE) and repeated.endswith("result 1")
+    assert len(calls) == 1
+
+    with memo.run():
+        tool.run("df -h")
+    tool.run("df -h")
+    assert len(calls) == 3
+
+def test_state_changing_call_clears_the_memo():
+    """Test that reads after a possible change run again"""
+    calls = []
+    memo = ToolMemo()
+    tool = memo.wrap(counting_tool("shell", calls))
+    with memo.run():
+        tool.run("ls")
+        tool.run("cd /tmp")
+        tool.run("ls")
+        tool.run("cd /tmp")
+    assert calls == ["ls", "cd /tmp", "ls", "cd /tmp"]
+
+def test_memo_works_for_coroutines():
+    """Test the asyncio path of a wrapped tool"""
+    calls = []
+
+    async def arun(text):
+        calls.append(text)
+        return "ok"
+    memo = ToolMemo()
+    tool = memo.wrap(Tool(name="disk_usage", func=None, coroutine=arun, description="disk"))
+
+    async def main():
+        with memo.run():
+            await tool.arun("/")
+            return await tool.arun("/")
+    assert asyncio.run(main()).endswith("ok")
+    assert calls == ["/"]
+
+def action(tool, tool_input):
+    return SimpleNamespace(tool=tool, tool_input=tool_input, log="")
+
+def test_detector_stops_repeated_actions_and_cycles():
+    """Test repeated actions and repeating cycles of actions"""
+    detector = LoopDetector(max_repeats=3)
+    detector.on_agent_action(action("shell", "uptime"))
+    detector.on_tool_end("up 3 days")
+    detector.on_agent_action(action("shell", "uptime "))
+    detector.on_agent_action(action("shell", "'uptime'"))
+    with pytest.raises(AgentLoopDetected):
+        detector.on_agent_action(action("shell", "uptime"))
+    assert detector.steps[0][1] == "up 3 days"
+
+    detector = LoopDetector(max_repeats=5)
+    for tool in ["shell", "disk_usage", "shell"]:
+        detector.on_agent_action(action(tool, "x"))
+    with pytest.raises(AgentLoopDetected):
+        detector.on_agent_action(action("disk_usage", "x"))
+
+    detector = LoopDetector()
+    for command in ["uptime", "who", "df -h", "free -m"]:
+        detector.on_agent_action(action("shell", command))
+
+def make_looping_aida(step, **config):
+    """Aida whose agent model always proposes the same step"""
+    aida = Aida.__new__(Aida)
+    aida.config = AidaConfig(host_facts=False, **config)
+    aida.conversation = ConversationManager()
+    model = FakeListLLM(responses=[step] * 30)
+    answers = []
+
+    def invoke(prompt):
+        answers.append(prompt)
+        return SimpleNamespace(content="Final Answer: The root filesystem is 18% full.")
+    aida.llm = SimpleNamespace(llm=model, invoke=invoke, prompt_stats=None)
+    aida.tools = aida._setup_tools()
+    aida.agent = aida._setup_agent()
+    aida.examples = ExampleLibrary(AGENT_EXAMPLES, k=0)
+    return aida, model, answers
+
+def test_looping_agent_is_stopped_with_a_forced_answer():
+    """Test that a run repeating one action stops early and still gets an answer"""
+    aida, model, answers = make_looping_aida("Thought: check the disk\nAction: disk_usage\nAction Input: /")
+    response = aida._invoke_agent("is the disk full?", aida._build_inputs("is the disk full?"), [])
+    assert response["output"] == "The root filesystem is 18% full."
+    assert model.i == 4
+    assert len(response["intermediate_steps"]) == 3
+    assert aida.tool_memo.hits == 2
+    assert "used_percent" in answers[0]
+
+def test_loop_detection_can_be_disabled():
+    """Test that loop_max_repeats=0 leaves the run to max_iterations"""
+    aida, model, answers = make_looping_aida("Thought: check the disk\nAction: disk_usage\nAction Input: /",
+                                             loop_max_repeats=0)
+    response = aida._invoke_agent("is the disk full?", aida._build_inputs("is the disk full?"), [])
+    assert model.i == 20
+    assert not answers
+    assert "iteration limit" in response["output"]
@@ -0,0 +1,81 @@
+import pytest
+from aida.providers import ollama
+from aida.providers.ollama import OllamaProvider, list_installed_models, clear_model_list_cache
+
+class FakeTagsResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"models": [{"name": "llama3.2:3b"}, {"name": "qwen2.5-coder:latest"}]}
+
+@pytest.fixture
+def tags_requests(monkeypatch):
+    """Fixture that fakes Ollama's /api/tags endpoint and records requested URLs"""
+    urls = []
+    def fake_get(url, timeout=None):
+        urls.append(url)
+        return FakeTagsResponse()
+    monkeypatch.setattr(ollama._session, "get", fake_get)
+    clear_model_list_cache()
+    yield urls
+    clear_model_list_cache()
+
+def test_model_list_is_cached_across_providers(tags_requests):
+    """Test that building several providers asks Ollama for the model list once"""
+    OllamaProvider(model="llama3.2:3b")
+    OllamaProvider(model="llama3.2:3b")
+    OllamaProvider(model="qwen2.5-coder")
+    assert len(tags_requests) == 1
+    assert tags_requests[0].endswith("/api/tags")
+
+def test_model_list_ttl_expiry(tags_requests):
+    """Test that an expired model list is fetched again"""
+    list_installed_models()
+    list_installed_models(ttl=0)
+    assert len(tags_requests) == 2
+
+def test_unavailable_model_raises(tags_requests):
+    """Test that an uninstalled model is rejected at construction"""
+    with pytest.raises(ValueError):
+        OllamaProvider(model="nonexistent_model")
+
+def test_deferred_validation(tags_requests):
+    """Test that deferred validation skips the lookup until first use"""
+    provider = OllamaProvider(model="nonexistent_model", defer_validation=True)
+    assert tags_requests == []
+    with pytest.raises(ValueError):
+        provider.invoke("hello")
+
+def test_keep_alive_and_context_size_are_passed_to_ollama():
+    """Test that the model is kept loaded and the context size fixed when configured"""
+    provider = OllamaProvider(model="llama3.2:3b", defer_validation=True, keep_alive="-1", num_ctx=8192)
+    assert provider.llm.keep_alive == "-1"
+    assert provider.llm.num_ctx == 8192
+    assert provider.prompt_stats in provider.llm.callbacks
+
+def test_prompt_cache_stats_measure_prefix_reuse():
+    """Test that shared prefixes and Ollama's evaluated token counts are recorded"""
+    from uuid import uuid4
+    from langchain_core.messages import HumanMessage
+    from langchain_core.outputs import ChatGeneration, LLMResult
+    from langchain_core.messages import AIMessage
+    stats = ollama.PromptCacheStats()
+    static = "You are AIDA. " * 100
+
+    def call(prompt, evaluated):
+        run_id = uuid4()
+        stats.on_chat_model_start({}, [[HumanMessage(content=prompt)]], run_id=run_id)
+        generation = ChatGeneration(message=AIMessage(content="ok"),
+                                    generation_info={"prompt_eval_count": evaluated,
+                                                     "prompt_eval_duration": 5 * 10**8})
+        stats.on_llm_end(LLMResult(generations=[[generation]]), run_id=run_id)
+
+    call(static + "Question: uptime?", 360)
+    call(static + "Question: who is logged in?", 8)
+    summary = stats.summary()
+    assert summary["calls"] == 2
+    assert summary["cache_hits"] == 1
+    assert summary["prefix_reuse"] > 0.45
+    assert summary["prompt_tokens_evaluated"] == 368
+    assert summary["prompt_eval_seconds"] == 1.0
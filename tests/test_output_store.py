@@ -0,0 +1,85 @@
+from aida.tools.executor import CommandExecutor
+from aida.tools.output_store import OutputStore
+from aida.tools.registry import ToolRegistry
+from aida.tools.validated_shelltool import ValidatedShellTool, make_shell_tool
+from langchain.agents import Tool
+
+def log_lines(count):
+    return "".join(f"line {i}: {'ERROR disk full' if i % 100 == 0 else 'ok'}\n" for i in range(count))
+
+def test_small_outputs_pass_through(tmp_path):
+    """Test that outputs under the threshold are returned verbatim"""
+    store = OutputStore(threshold=1000, spill_dir=str(tmp_path))
+    assert store.observe("short output") == "short output"
+    assert len(store) == 0
+
+def test_large_output_becomes_digest(tmp_path):
+    """Test that a large output is replaced by a bounded digest with counts, head and tail"""
+    store = OutputStore(threshold=1000, spill_dir=str(tmp_path))
+    digest = store.observe(log_lines(5000), label="cat app.log")
+    
+    assert "out-1" in digest
+    assert "5000 lines" in digest
+    assert "error 50" in digest
+    assert "line 0: ERROR disk full" in digest
+    assert "line 4999: ok" in digest
+    assert "line 2500" not in digest
+    
+    small = store.observe(log_lines(50000))
+    assert abs(len(small) - len(digest)) < 200
+
+def test_read_output_pages_lines(tmp_path):
+    """Test that read_output returns the requested lines and where to continue"""
+    store = OutputStore(threshold=1000, spill_dir=str(tmp_path))
+    store.observe(log_lines(5000))
+    
+    page = store.read_tool("out-1 200 3")
+    assert page.splitlines()[1:] == ["line 200: ERROR disk full", "line 201: ok", "line 202: ok"]
+    assert '"out-1 203 3"' in page
+    # Pages are cut to stay under the threshold
+    assert len(store.read("out-1", 0, 10000)) < 1000
+    assert "Unknown output id" in store.read("out-9")
+
+def test_command_spill_file_is_reused(tmp_path):
+    """Test that a command that spilled is digested from the executor's spill file"""
+    executor = CommandExecutor(max_output_bytes=2000, spill_dir=str(tmp_path))
+    store = OutputStore(threshold=1000, spill_dir=str(tmp_path))
+    result = executor.run("seq 1 10000; exit 2")
+    digest = store.observe_result(result)
+    
+    assert "10000 lines" in digest
+    assert "[exit code 2]" in digest
+    assert store.get("out-1").path == result.spill_path
+    assert store.read("out-1", 4999, 1).splitlines()[1] == "5000"
+
+def test_store_drops_oldest_outputs(tmp_path):
+    """Test that stored outputs are bounded and their files removed"""
+    store = OutputStore(threshold=100, spill_dir=str(tmp_path), max_outputs=2)
+    for _ in range(3):
+        store.observe(log_lines(100))
+    assert store.get("out-1") is None
+    assert len(list(tmp_path.iterdir())) == 2
+    store.close()
+    assert list(tmp_path.iterdir()) == []
+
+def test_registry_filters_tool_outputs(tmp_path):
+    """Test that registry tools pass their outputs through the digest filter"""
+    store = OutputStore(threshold=100, spill_dir=str(tmp_path))
+    registry = ToolRegistry()
+    registry.add(Tool(name="dump", func=lambda _: log_lines(100), description="Dump a log"))
+    (tool,) = registry.build_tools(output_filter=store.observe)
+    assert tool.run("x").startswith("[Output out-1")
+
+def test_shell_digest_is_not_digested_again(tmp_path):
+    """Test that the shell's own digest and read_output pages pass the registry filter unchanged"""
+    store = OutputStore(spill_dir=str(tmp_path))
+    registry = ToolRegistry()
+    registry.add(make_shell_tool(ValidatedShellTool(CommandExecutor(), store, validator=lambda command: command)))
+    registry.add(Tool(name="read_output", func=store.read_tool, description="Page a stored output"))
+    shell, read_output = registry.build_tools(output_filter=store.observe)
+
+    digest = shell.run("for i in $(seq 30); do printf 'error warning %0190d\\n' $i; done")
+    assert digest.startswith("[Output out-1 ") and "Matches: error 30, warning 30" in digest
+    assert len(digest.encode()) <= store.threshold
+    assert read_output.run("out-1 0 30").startswith("[out-1 lines 0-")
+    assert len(store) == 1
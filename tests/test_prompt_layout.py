@@ -0,0 +1,54 @@
+from langchain_community.llms.fake import FakeListLLM
+from types import SimpleNamespace
+from aida.core import Aida
+from aida.config import AidaConfig
+from aida.conversation import ConversationManager
+from aida.examples import ExampleLibrary, AGENT_EXAMPLES, EXAMPLES_HEADER
+
+def make_aida(**config):
+    aida = Aida.__new__(Aida)
+    aida.config = AidaConfig(**config)
+    aida.conversation = ConversationManager()
+    aida.llm = SimpleNamespace(llm=FakeListLLM(responses=["Final Answer: ok"]), prompt_stats=None)
+    aida.tools = aida._setup_tools()
+    aida.agent = aida._setup_agent()
+    aida.examples = ExampleLibrary(AGENT_EXAMPLES, k=aida.config.example_count)
+    return aida
+
+def render(aida, query):
+    aida.conversation.add_user_message(query)
+    prompt = aida.agent.agent.llm_chain.prompt
+    return prompt.format(agent_scratchpad="", **aida._build_inputs(query))
+
+def test_static_instructions_are_an_identical_prompt_prefix():
+    """Test that instructions and tools come first and never change between queries"""
+    aida = make_aida(host_facts=True)
+    first = render(aida, "How long has the server been running?")
+    aida.conversation.add_assistant_message("Up 3 days.")
+    second = render(aida, "Which process uses the most memory?")
+
+    static = first[:first.index("Begin!")]
+    assert second.startswith(static)
+    assert "Host facts: os=" not in static and "How long" not in static
+    assert second.index("Host facts: os=") > second.index("Begin!")
+    assert second.rstrip().endswith("Question: Which process uses the most memory?\nThought:")
+
+def test_history_is_appended_after_the_previous_prompt():
+    """Test that the context of the next query extends the previous one"""
+    aida = make_aida(host_facts=False)
+    first = render(aida, "check disk usage")
+    aida.conversation.add_assistant_message("The root filesystem is 40% full.")
+    second = render(aida, "and memory?")
+    shared = first[:first.index(EXAMPLES_HEADER)].rstrip("\n")
+    assert second.startswith(shared)
+    assert aida.prompt_cache_stats() is None
+
+def test_only_examples_similar_to_the_query_are_sent():
+    """Test that the examples in the prompt are picked per query"""
+    aida = make_aida(host_facts=False, example_count=1)
+    prompt = render(aida, "any errors in the syslog today?")
+    assert "Action: log_search" in prompt
+    assert "Action: python_coder" not in prompt and "Action: logged_in_users" not in prompt
+
+    aida = make_aida(host_facts=False, example_count=0)
+    assert EXAMPLES_HEADER not in render(aida, "any errors in the syslog today?")
@@ -0,0 +1,113 @@
+import threading
+import pytest
+from aida.providers import LLMProviderFactory
+from aida.providers.base import LLMProvider
+from aida.config import AidaConfig
+from aida.core import Aida
+
+pytestmark = pytest.mark.usefixtures("no_cassette")
+
+class RecordingProvider(LLMProvider):
+    """Provider that records construction and close calls"""
+    created = 0
+
+    def __init__(self, model, temperature=0, **options):
+        RecordingProvider.created += 1
+        self.model = model
+        self.temperature = temperature
+        self.options = options
+        self.llm = None
+        self.closed = False
+
+    def invoke(self, prompt):
+        return prompt
+
+    async def ainvoke(self, prompt):
+        return prompt
+
+    def stream(self, prompt):
+        yield prompt
+
+    def validate_model(self, model):
+        return True
+
+    def is_strong(self):
+        return False
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture(autouse=True)
+def recording_provider(monkeypatch):
+    """Fixture that registers the recording provider and empties the pool afterwards"""
+    RecordingProvider.created = 0
+    monkeypatch.setitem(LLMProviderFactory._providers, "recording", RecordingProvider)
+    yield
+    LLMProviderFactory.close_pool()
+
+def test_pooled_instances_are_shared():
+    """Test that identical pooled requests return the same instance"""
+    first = LLMProviderFactory.get_provider("recording", "model-a", pooled=True)
+    second = LLMProviderFactory.get_provider("recording", "model-a", pooled=True)
+    assert first is second
+    assert RecordingProvider.created == 1
+
+def test_pool_key_includes_model_temperature_and_options():
+    """Test that different models, temperatures or options get separate instances"""
+    base = LLMProviderFactory.get_provider("recording", "model-a", pooled=True)
+    assert LLMProviderFactory.get_provider("recording", "model-b", pooled=True) is not base
+    assert LLMProviderFactory.get_provider("recording", "model-a", temperature=0.7, pooled=True) is not base
+    assert LLMProviderFactory.get_provider("recording", "model-a", pooled=True, defer_validation=True) is not base
+
+def test_unpooled_instances_are_separate():
+    """Test that the default mode still creates a new provider per call"""
+    first = LLMProviderFactory.get_provider("recording", "model-a")
+    second = LLMProviderFactory.get_provider("recording", "model-a")
+    assert first is not second
+
+def test_concurrent_requests_create_one_instance():
+    """Test that concurrent pooled requests construct the provider once"""
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(LLMProviderFactory.get_provider("recording", "model-a", pooled=True)))
+        for _ in range(16)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert RecordingProvider.created == 1
+    assert all(provider is results[0] for provider in results)
+
+def test_close_pool():
+    """Test that closing the pool closes providers and later requests get new ones"""
+    provider = LLMProviderFactory.get_provider("recording", "model-a", pooled=True)
+    LLMProviderFactory.close_pool()
+    assert provider.closed
+    assert LLMProviderFactory.get_provider("recording", "model-a", pooled=True) is not provider
+
+def test_close_pool_closes_model_clients(monkeypatch):
+    """Test that closing the pool closes the Ollama HTTP clients and the Gemini transport"""
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    ollama = LLMProviderFactory.get_provider("ollama", "llama3.2:3b", pooled=True, defer_validation=True)
+    gemini = LLMProviderFactory.get_provider("gemini", "gemini-1.5-flash", pooled=True, defer_validation=True)
+    transport_closed = []
+    monkeypatch.setattr(gemini.llm.client.transport, "close", lambda: transport_closed.append(True))
+
+    LLMProviderFactory.close_pool()
+    assert ollama.llm._client._client.is_closed
+    assert ollama.llm._async_client._client.is_closed
+    assert transport_closed == [True]
+
+def test_session_and_coder_share_the_gemini_provider(monkeypatch):
+    """Test that a pooled session's coder tool reuses the preprocessor's Gemini provider"""
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    config = AidaConfig(core_provider="scripted", core_model="scripted", preprocessor_provider="gemini",
+                        preprocessor_model="gemini-1.5-flash", pool_providers=True, defer_model_validation=True,
+                        agent_mode="react", host_facts=False, persist_sessions=False, cache_enabled=False)
+    aida = Aida(config=config)
+    try:
+        coder = aida._build_coder_tool()
+        assert coder.llm is aida.preprocessor.llm
+    finally:
+        aida.close()
@@ -0,0 +1,66 @@
+from aida.recall import RecallIndex, tokenize
+from aida.conversation import ConversationManager
+from aida.session_store import SessionStore
+
+def test_search_ranks_relevant_snippets():
+    """Test that BM25 search returns the snippets sharing rare query terms first"""
+    index = RecallIndex()
+    index.add("User", "how much disk space is left on /var?")
+    index.add("User", "who is logged in right now?")
+    index.add("shell: systemctl status nginx", "nginx.service - active (running) since Mon")
+    index.add("Assistant", "the nginx service is running")
+    
+    results = index.search("is nginx still running?", k=2)
+    assert {snippet.label for snippet in results} == {"shell: systemctl status nginx", "Assistant"}
+    assert index.search("kubernetes", k=3) == []
+
+def test_index_drops_oldest_when_full():
+    """Test that the index stays bounded"""
+    index = RecallIndex(max_snippets=8)
+    for i in range(20):
+        index.add("User", f"message {i} about topic{i}")
+    assert len(index) <= 8
+    assert index.search("topic0") == []
+    assert index.search("topic19")[0].text == "message 19 about topic19"
+
+def test_tokenize_keeps_paths():
+    """Test that paths and service names survive tokenization"""
+    assert tokenize("Check /var/log/syslog for nginx.service") == ["check", "var/log/syslog", "for", "nginx.service"]
+
+def test_conversation_recalls_evicted_turns_and_observations():
+    """Test that turns outside the window and tool output are recalled for a related query"""
+    conversation = ConversationManager(token_budget=40, recall_snippets=2)
+    conversation.add_user_message("which service listens on port 5432?")
+    conversation.add_observation("shell", "ss -ltnp", "LISTEN 0 244 127.0.0.1:5432 users:((postgres,pid=812))")
+    conversation.add_assistant_message("postgres listens on port 5432")
+    for i in range(6):
+        conversation.add_user_message(f"unrelated question {i}")
+    
+    history = conversation.get_recent_messages(query="restart the service on port 5432")
+    assert "Relevant earlier context:" in history
+    assert "- shell: ss -ltnp:" in history
+    assert "postgres listens on port 5432" in history
+    assert "unrelated question 5" in history
+
+def test_restored_conversation_indexes_history_on_first_search(tmp_path, monkeypatch):
+    """Test that resuming reads no history for recall until a query needs it"""
+    store = SessionStore(tmp_path / "sessions.sqlite")
+    session_id = store.create_session()
+    conversation = ConversationManager(token_budget=40, store=store, session_id=session_id, recall_snippets=2)
+    conversation.add_observation("shell", "ss -ltnp", "LISTEN 0 244 127.0.0.1:5432 users:((postgres,pid=812))")
+    for i in range(6):
+        conversation.add_user_message(f"unrelated question {i}")
+
+    reads = []
+    iter_turns = store.iter_turns
+    monkeypatch.setattr(store, "iter_turns", lambda *args, **kwargs: reads.append(args) or iter_turns(*args, **kwargs))
+    resumed = ConversationManager(token_budget=40, store=store, session_id=session_id, recall_snippets=2)
+    resumed.restore()
+    resumed.add_observation("shell", "systemctl status postgresql", "active (running) since Mon")
+    assert reads == [] and len(resumed.recall) == 0
+
+    history = resumed.get_recent_messages(query="is the service on port 5432 running?")
+    assert "- shell: ss -ltnp:" in history and "- shell: systemctl status postgresql:" in history
+    resumed.get_recent_messages(query="port 5432")
+    assert len(reads) == 1
+    store.close()
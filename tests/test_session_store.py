@@ -0,0 +1,73 @@
+import pytest
+from aida.session_store import SessionStore
+from aida.conversation import ConversationManager
+
+@pytest.fixture
+def store(tmp_path):
+    """Fixture that provides a session store in a temporary directory"""
+    store = SessionStore(tmp_path / "sessions.sqlite")
+    yield store
+    store.close()
+
+def test_turns_and_observations_round_trip(store):
+    """Test that turns and compressed observations are stored in order"""
+    session_id = store.create_session()
+    store.add_turn(session_id, "user", "what is using the disk?")
+    store.add_observation(session_id, "shell", "du -sh /var/*", "4.0G /var/log\n" * 1000)
+    store.add_turn(session_id, "assistant", "/var/log uses 4GB")
+    
+    turns = list(store.iter_turns(session_id))
+    assert [(role, tool) for role, tool, _, _ in turns] == [("user", None), ("observation", "shell"), ("assistant", None)]
+    assert turns[1][2] == "du -sh /var/*\n" + "4.0G /var/log\n" * 1000
+    assert [content for _, _, content, _ in store.iter_turns(session_id, roles=("assistant",))] == ["/var/log uses 4GB"]
+
+def test_recent_turns_respect_budget(store):
+    """Test that resuming reads only the newest turns that fit the budget"""
+    session_id = store.create_session()
+    for i in range(100):
+        store.add_turn(session_id, "user", f"question {i:03d}")
+    
+    turns = store.recent_turns(session_id, token_budget=9)
+    assert turns == [("user", "question 097"), ("user", "question 098"), ("user", "question 099")]
+
+def test_conversation_resume(tmp_path):
+    """Test that a conversation can be restored from a new store instance"""
+    path = tmp_path / "sessions.sqlite"
+    store = SessionStore(path)
+    session_id = store.create_session()
+    conversation = ConversationManager(store=store, session_id=session_id)
+    conversation.add_user_message("How many users are logged in?")
+    conversation.add_assistant_message("There are 3 users logged in.")
+    conversation.add_observation("shell", "who", "user1 pts/0")
+    store.save_summary(session_id, "Checked the uptime earlier.")
+    store.close()
+    
+    reopened = SessionStore(path)
+    assert reopened.session_exists(session_id)
+    assert reopened.list_sessions()[0][0] == session_id
+    resumed = ConversationManager(store=reopened, session_id=session_id)
+    resumed.restore()
+    assert resumed.get_recent_messages() == (
+        "Summary of earlier conversation: Checked the uptime earlier.\n"
+        "User: How many users are logged in?\n"
+        "Assistant: There are 3 users logged in."
+    )
+    
+    # Restoring must not write the restored turns again
+    assert len(list(reopened.iter_turns(session_id))) == 3
+    reopened.close()
+
+def test_iter_turns_reads_in_pages(store, monkeypatch):
+    """Test that iterating a long session yields every turn in order, one page of rows at a time"""
+    monkeypatch.setattr("aida.session_store.ITER_PAGE_ROWS", 4)
+    session_id = store.create_session()
+    for i in range(10):
+        store.add_turn(session_id, "user" if i % 2 else "assistant", f"turn {i}")
+
+    turns = store.iter_turns(session_id)
+    assert next(turns)[2] == "turn 0"
+    # The rest of the session is not read until the first page is used up
+    store.add_turn(session_id, "user", "turn 10")
+    assert [content for _, _, content, _ in turns] == [f"turn {i}" for i in range(1, 11)]
+    assert [content for _, _, content, _ in store.iter_turns(session_id, roles=("user",))] == [
+        "turn 1", "turn 3", "turn 5", "turn 7", "turn 9", "turn 10"]
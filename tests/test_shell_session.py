@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+import pytest
+from aida.tools.shell_session import ShellSession, RESET_NOTE
+
+@pytest.fixture
+def session():
+    shell = ShellSession()
+    yield shell
+    shell.close()
+
+def test_state_persists_between_commands(session, tmp_path):
+    """Test that cd and export carry over to the next command"""
+    session.run(f"cd {tmp_path}; export AIDA_TEST=42")
+    result = session.run("pwd; echo $AIDA_TEST")
+    assert result.output == f"{tmp_path}\n42\n"
+    assert result.exit_code == 0
+
+def test_exit_codes_and_unterminated_output(session):
+    """Test that each command reports its own exit code and output without a trailing newline survives"""
+    assert session.run("false").exit_code == 1
+    result = session.run("printf 'no newline'; exit_status=3; (exit $exit_status)")
+    assert result.output == "no newline"
+    assert result.exit_code == 3
+    assert session.run("if then").exit_code == 2
+
+def test_commands_do_not_read_the_shell_input(session):
+    """Test that a command reading stdin cannot swallow the framing"""
+    assert session.run("cat").exit_code == 0
+    assert session.run("echo still here").output == "still here\n"
+
+def test_shell_is_recycled_after_exit(session):
+    """Test that a command that exits the shell gets a fresh shell next time"""
+    session.run("export AIDA_TEST=1")
+    assert session.run("exit 7").exit_code == 7
+    result = session.run("echo ${AIDA_TEST:-unset}")
+    assert result.output == f"{RESET_NOTE}\nunset\n"
+    assert session.restarts == 1
+
+def test_timeout_kills_and_recycles(session):
+    """Test that a timed out command is killed and the next command still runs"""
+    start = time.monotonic()
+    assert session.run("sleep 30", timeout=0.3).timed_out
+    assert time.monotonic() - start < 3
+    assert session.run("echo ok").output.endswith("ok\n")
+
+def test_shell_is_recycled_after_max_commands():
+    """Test that the shell is replaced after a fixed number of commands"""
+    shell = ShellSession(max_commands=2)
+    pids = [shell.run("echo $$").output.strip().splitlines()[-1] for _ in range(4)]
+    shell.close()
+    assert pids[0] == pids[1] != pids[2] == pids[3]
+
+def test_async_run(session):
+    """Test that the asyncio path uses the same shell"""
+    session.run("export AIDA_TEST=async")
+    assert asyncio.run(session.arun("echo $AIDA_TEST")).output == "async\n"
+
+def test_closing_aida_stops_its_shell_and_removes_spill_files():
+    """Test that Aida.close leaves no bash process or spill file behind"""
+    from aida.benchmark import benchmark_config
+    from aida.core import Aida
+    aida = Aida(config=benchmark_config(command_output_limit=64))
+    result = aida.executor.run("seq 1000")
+    process = aida.executor._process
+    assert process.poll() is None
+    assert result.spill_path and os.path.exists(result.spill_path)
+
+    aida.close()
+    assert process.poll() is not None
+    assert not os.path.exists(result.spill_path)
@@ -0,0 +1,44 @@
+import asyncio
+from aida.tools.validated_shelltool import ValidatedShellTool
+
+def test_async_run_executes_accepted_command(monkeypatch):
+    """Test that an accepted command runs in an asyncio subprocess"""
+    monkeypatch.setattr("builtins.input", lambda prompt: "y")
+    output = asyncio.run(ValidatedShellTool().arun("echo hello; echo oops >&2"))
+    assert output == "hello\noops\n"
+
+def test_async_run_cancelled(monkeypatch):
+    """Test that a rejected command is not executed"""
+    monkeypatch.setattr("builtins.input", lambda prompt: "n")
+    output = asyncio.run(ValidatedShellTool().arun("echo hello"))
+    assert output == "Command execution cancelled by user"
+
+def test_async_runs_are_concurrent(monkeypatch):
+    """Test that several commands share one event loop without serializing"""
+    monkeypatch.setattr("builtins.input", lambda prompt: "y")
+    tool = ValidatedShellTool()
+    
+    async def run_all():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        outputs = await asyncio.gather(*(tool.arun("sleep 0.3; echo done") for _ in range(5)))
+        return outputs, loop.time() - start
+    
+    outputs, elapsed = asyncio.run(run_all())
+    assert outputs == ["done\n"] * 5
+    assert elapsed < 1.2
+
+def test_coder_runs_commands_in_the_session_shell(monkeypatch, tmp_path):
+    """Test that the coder tool uses the agent's shell tool, so both share the shell and its confirmation"""
+    from aida.benchmark import benchmark_config
+    from aida.core import Aida
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr("builtins.input", lambda prompt: "y")
+    aida = Aida(config=benchmark_config(defer_model_validation=True))
+    try:
+        coder = aida._build_coder_tool()
+        assert coder.shell_tool in aida.tools
+        coder.shell_tool.run(f"cd {tmp_path}")
+        assert aida.executor.run("pwd").output == f"{tmp_path}\n"
+    finally:
+        aida.close()
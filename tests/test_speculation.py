@@ -0,0 +1,99 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from langchain.agents import Tool
+from aida.core import Aida
+from aida.config import AidaConfig
+from aida.conversation import ConversationManager
+from aida.preprocessor import QueryPreprocessor
+
+AMBIGUOUS_QUERY = "Explain quantum physics"
+
+class SlowLLM:
+    """Preprocessor LLM stand-in that takes a while to answer"""
+    def __init__(self, reply, delay=0.2):
+        self.reply = reply
+        self.delay = delay
+
+    def invoke(self, prompt):
+        time.sleep(self.delay)
+        return SimpleNamespace(content=self.reply)
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(content=self.reply)
+
+def make_aida(reply, speculative=True):
+    aida = Aida.__new__(Aida)
+    aida.config = AidaConfig(preprocessor_provider="ollama", preprocessor_model="llama3.2:3b",
+                             defer_model_validation=True, speculative_relevance_check=speculative)
+    aida.conversation = ConversationManager()
+    aida.preprocessor = QueryPreprocessor(config=aida.config, conversation=aida.conversation)
+    aida.preprocessor.llm = SlowLLM(reply)
+    aida._relevance_executor = ThreadPoolExecutor(max_workers=2)
+    return aida
+
+def agent_with_tool(calls, think=0.2):
+    """Fake agent that thinks for a while, then runs a tool through LangChain callbacks"""
+    tool = Tool(name="shell", func=lambda command: calls.append((command, time.monotonic())) or "ok",
+                description="Run a command")
+
+    def run(callbacks):
+        time.sleep(think)
+        return {"output": tool.run("who", callbacks=callbacks)}
+    return run
+
+def test_relevant_query_runs_agent_and_check_in_parallel():
+    """Test that an ambiguous relevant query costs max(agent, check) rather than the sum"""
+    aida = make_aida("RELEVANT: about the server")
+    calls = []
+    start = time.monotonic()
+    response, refusal = aida._run_gated(AMBIGUOUS_QUERY, agent_with_tool(calls))
+    elapsed = time.monotonic() - start
+
+    assert refusal is None
+    assert response == {"output": "ok"}
+    assert len(calls) == 1
+    assert elapsed < 0.35
+
+def test_refused_query_never_runs_tools():
+    """Test that tool calls wait for the verdict and are cancelled on refusal"""
+    aida = make_aida("NOT RELEVANT: physics")
+    calls = []
+    response, refusal = aida._run_gated(AMBIGUOUS_QUERY, agent_with_tool(calls, think=0.0))
+
+    assert response is None
+    assert "not related to server management" in refusal
+    assert calls == []
+
+def test_sequential_mode_checks_before_the_agent():
+    """Test that disabling speculation never starts the agent for a refused query"""
+    aida = make_aida("NOT RELEVANT: physics", speculative=False)
+    started = []
+    response, refusal = aida._run_gated(AMBIGUOUS_QUERY, lambda callbacks: started.append(True))
+
+    assert refusal is not None
+    assert started == []
+
+def test_clear_queries_skip_the_llm():
+    """Test that locally decided queries never wait for the preprocessor LLM"""
+    aida = make_aida("NOT RELEVANT: should not be asked")
+    response, refusal = aida._run_gated("Check server uptime", lambda callbacks: {"output": "up 3 days"})
+    assert refusal is None and response == {"output": "up 3 days"}
+
+def test_async_refusal_cancels_agent_task():
+    """Test that the async path cancels a running agent when the query is refused"""
+    aida = make_aida("NOT RELEVANT: physics")
+    cancelled = []
+
+    async def agent(callbacks):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    response, refusal = asyncio.run(aida._arun_gated(AMBIGUOUS_QUERY, agent))
+    assert response is None and refusal is not None
+    assert cancelled == [True]
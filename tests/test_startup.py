@@ -0,0 +1,33 @@
+import subprocess
+import sys
+from aida.startup_profile import profile_import, format_report
+
+def loaded_modules(code):
+    """Run code in a fresh interpreter and return the names of loaded modules"""
+    result = subprocess.run(
+        [sys.executable, "-c", code + "\nimport sys; print('\\n'.join(sys.modules))"],
+        capture_output=True, text=True, check=True
+    )
+    return set(result.stdout.split())
+
+def test_cli_import_is_lazy():
+    """Test that importing the CLI does not load the GUI, agent stack or provider SDKs"""
+    modules = loaded_modules("import aida.cli")
+    assert "PyQt6" not in modules
+    assert "langchain.agents" not in modules
+    assert "langchain_google_genai" not in modules
+    assert "langchain_ollama" not in modules
+
+def test_factory_import_does_not_load_providers():
+    """Test that provider modules are imported only when requested"""
+    modules = loaded_modules("from aida.providers import LLMProviderFactory\nLLMProviderFactory.get_available_providers()")
+    assert "aida.providers.ollama" not in modules
+    assert "aida.providers.gemini" not in modules
+
+def test_profile_import_reports_packages():
+    """Test that the import profiler measures a module and its packages"""
+    profile = profile_import("json")
+    assert profile.error is None
+    assert profile.total_ms > 0
+    assert "json" in profile.packages_ms
+    assert "json" in format_report([profile])
@@ -0,0 +1,47 @@
+from queue import Queue
+from langchain_core.agents import AgentAction
+from langchain_core.outputs import LLMResult, Generation
+from aida.streaming import StreamingEventHandler, TOKEN, THOUGHT, ACTION, OBSERVATION
+
+def drain(events):
+    items = []
+    while not events.empty():
+        items.append(events.get())
+    return items
+
+def test_tokens_are_forwarded():
+    """Test that streamed tokens become token events"""
+    events = Queue()
+    handler = StreamingEventHandler(events)
+    handler.on_llm_start({}, ["prompt"])
+    handler.on_llm_new_token("Thought")
+    handler.on_llm_new_token(": ")
+    handler.on_llm_end(LLMResult(generations=[[Generation(text="Thought: ")]]))
+    
+    assert [(e.type, e.content) for e in drain(events)] == [(TOKEN, "Thought"), (TOKEN, ": ")]
+
+def test_non_streaming_llm_emits_full_text():
+    """Test that a model that never streams still produces its text once"""
+    events = Queue()
+    handler = StreamingEventHandler(events)
+    handler.on_llm_start({}, ["prompt"])
+    handler.on_llm_end(LLMResult(generations=[[Generation(text="Final Answer: done")]]))
+    
+    assert [(e.type, e.content) for e in drain(events)] == [(TOKEN, "Final Answer: done")]
+
+def test_agent_steps_are_emitted():
+    """Test that agent actions and tool output become thought/action/observation events"""
+    events = Queue()
+    handler = StreamingEventHandler(events)
+    action = AgentAction(tool="shell", tool_input="who",
+                         log="Thought: I need to check logged in users\nAction: shell\nAction Input: who")
+    handler.on_agent_action(action)
+    handler.on_tool_end("user1 pts/0", name="shell")
+    
+    emitted = drain(events)
+    assert [(e.type, e.content) for e in emitted] == [
+        (THOUGHT, "I need to check logged in users"),
+        (ACTION, "who"),
+        (OBSERVATION, "user1 pts/0"),
+    ]
+    assert emitted[1].tool == "shell"
@@ -0,0 +1,72 @@
+import json
+import time
+from types import SimpleNamespace
+from langchain_community.llms.fake import FakeListLLM
+from aida.config import AidaConfig
+from aida.conversation import ConversationManager
+from aida.core import Aida
+from aida.examples import ExampleLibrary, AGENT_EXAMPLES
+from aida.tools import system_metrics
+from aida.tools.system_metrics import (UTMP_RECORD, USER_PROCESS, _busy_percent, _decode_address, _parse_utmp,
+                                       disk_usage, memory_usage, metrics_tools, open_ports, system_load)
+
+def utmp_record(ut_type, user, line="pts/0", host="", seconds=0):
+    return UTMP_RECORD.pack(ut_type, 100, line.encode(), b"ts/0", user.encode(), host.encode(),
+                            0, 0, 0, seconds, 0, 0, 0, 0, 0)
+
+def test_utmp_parsing_keeps_user_sessions():
+    """Test that only USER_PROCESS records are reported"""
+    data = utmp_record(2, "reboot") + utmp_record(USER_PROCESS, "alice", host="10.0.0.5", seconds=1700000000)
+    sessions = _parse_utmp(data)
+    assert len(sessions) == 1
+    assert sessions[0]["user"] == "alice" and sessions[0]["from"] == "10.0.0.5" and sessions[0]["tty"] == "pts/0"
+
+def test_proc_net_addresses_are_decoded():
+    """Test that the little-endian hex addresses of /proc/net/tcp* are decoded"""
+    assert _decode_address("0100007F:0050") == ("127.0.0.1", 80)
+    assert _decode_address("00000000000000000000000001000000:01BB") == ("::1", 443)
+
+def test_cpu_busy_percent_from_deltas():
+    """Test CPU utilization from two /proc/stat samples"""
+    before = [100, 0, 100, 700, 100, 0, 0, 0]
+    after = [200, 0, 200, 800, 200, 0, 0, 0]
+    assert _busy_percent(before, after) == (50.0, 25.0)
+
+def test_cpu_usage_reuses_recent_sample(monkeypatch):
+    """Test that a recent sample is reused instead of sleeping again"""
+    monkeypatch.setattr(system_metrics, "CPU_SAMPLE_INTERVAL", 0.05)
+    system_metrics.cpu_usage()
+    time.sleep(0.06)
+    start = time.monotonic()
+    usage = json.loads(system_metrics.cpu_usage())
+    assert time.monotonic() - start < 0.04
+    assert 0 <= usage["cpu_percent"] <= 100
+
+def test_tools_return_compact_json():
+    """Test that the /proc readers work on this host and return JSON"""
+    assert json.loads(system_load())["uptime_seconds"] > 0
+    assert json.loads(memory_usage())["total_mb"] > 0
+    assert isinstance(json.loads(disk_usage("all")), list)
+    assert "used_percent" in json.loads(disk_usage("/"))
+    assert isinstance(json.loads(open_ports()), list)
+    assert " " not in memory_usage()
+
+def test_metrics_tools_names():
+    """Test the tool names the agent prompt refers to"""
+    assert [tool.name for tool in metrics_tools()] == [
+        "system_load", "cpu_usage", "memory_usage", "disk_usage", "open_ports", "logged_in_users"
+    ]
+
+def test_agent_is_built_with_the_metrics_tools():
+    """Test that the agent prompt, with its rules and worked examples, builds and renders"""
+    aida = Aida.__new__(Aida)
+    aida.config = AidaConfig(agent_mode="react", host_facts=False)
+    aida.conversation = ConversationManager()
+    aida.llm = SimpleNamespace(llm=FakeListLLM(responses=["Final Answer: ok"]), prompt_stats=None)
+    aida.tools = aida._setup_tools()
+    aida.agent = aida._setup_agent()
+    aida.examples = ExampleLibrary(AGENT_EXAMPLES, k=aida.config.example_count)
+
+    prompt = aida.agent.agent.llm_chain.prompt.format(agent_scratchpad="", **aida._build_inputs("who is logged in?"))
+    assert "logged_in_users tools instead of the shell" in prompt
+    assert {tool.name for tool in metrics_tools()} <= {tool.name for tool in aida.agent.tools}
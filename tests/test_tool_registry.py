@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from langchain.agents import Tool
+from aida.tools.registry import ToolRegistry, ToolSpec
+
+class EchoTool:
+    builds = 0
+
+    def __init__(self):
+        EchoTool.builds += 1
+
+    def run(self, text):
+        return f"echo {text}"
+
+    async def arun(self, text):
+        return f"async echo {text}"
+
+@pytest.fixture
+def registry():
+    """Fixture that provides a registry with one eager and one lazy tool"""
+    EchoTool.builds = 0
+    registry = ToolRegistry()
+    registry.add(Tool(name="noop", func=lambda text: text, description="Returns its input"))
+    registry.register(ToolSpec(name="echo", description="Echoes its input", build=EchoTool))
+    return registry
+
+def test_lazy_tool_built_on_first_call(registry):
+    """Test that a declared tool is only built when the agent calls it, and only once"""
+    tools = {tool.name: tool for tool in registry.build_tools()}
+    assert EchoTool.builds == 0
+    assert not registry.is_loaded("echo")
+    
+    assert tools["echo"].run("hi") == "echo hi"
+    assert asyncio.run(tools["echo"].arun("hi")) == "async echo hi"
+    assert EchoTool.builds == 1
+    assert registry.is_loaded("echo")
+
+def test_enabled_and_disabled_tools(registry):
+    """Test that tools can be selected or left out by name"""
+    assert [tool.name for tool in registry.build_tools(enabled=["noop"])] == ["noop"]
+    assert [tool.name for tool in registry.build_tools(disabled=["noop"])] == ["echo"]
+
+def test_unknown_tool_name(registry):
+    """Test that configuring an unregistered tool is an error"""
+    with pytest.raises(ValueError):
+        registry.build_tools(enabled=["shell", "nonexistent"])